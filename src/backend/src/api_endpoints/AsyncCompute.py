@@ -1,47 +1,145 @@
-from flask import jsonify, session, Blueprint
-from ortools.sat.python import cp_model
-from ..utils.utils import get_db_connection
+from flask import request, jsonify, session, Blueprint, Response
+from ..utils.school_loader import load_school
+from ..utils.result_cache import get_cached_result, store_result, served_result
+from ..utils.last_solutions import get_last_solution, store_last_solution
+from ..utils.job_store import create_job_store
+from ..utils.scheduler import SolveScheduler, QueueFull
+from ..utils.budget import allocate_budget
+from ..utils.solver_pool import run_solve, set_progress_handler, cancel_solve, forget_cancel
+from ..utils.metrics import jobs_started, jobs_finished, jobs_failed, job_queue_seconds, job_solve_seconds
+from ..solver.model import MODEL_BACKENDS
+from ..solver.school import school_problems
+from ..solver.model_cache import school_fingerprint
 import traceback
-import ast
-import threading, uuid
+import json
+import time
+import uuid
 
 """
 This module implements asynchronous school timetable generation using the CP-SAT
 solver from Google OR-Tools within a Flask backend.
 
 Available Routes:
-- GET /start_computing:
-  Starts the background timetable computation and returns a unique job ID.
-- GET /status/<job_id>:
+- GET /start_computing[?model=integer|onehot][&strategy=monolithic|two_phase|incremental|portfolio][&alternatives=3][&min_difference=10][&symmetry_breaking=true][&warm_start=false][&reuse_feasible=true][&stop_gap=0.01][&stagnation_seconds=30]:
+  Queues the background timetable computation and returns a unique job ID.
+  If the user already has a queued job with the same parameters, its ID is returned instead,
+  any other queued or running job of the user is superseded (cancelled) by the new one.
+  Returns 401 without a logged-in user and 429 if the queue is full.
+  The optional `model` parameter selects the model formulation (default: integer),
+  the optional `strategy` parameter selects the solve strategy (default: monolithic;
+  incremental falls back to monolithic if the user has no earlier timetable),
+  the portfolio strategy returns the `alternatives` best timetables that differ in at least `min_difference` lessons,
+  `symmetry_breaking` enables symmetry breaking for identical classes and teachers (default: false),
+  `warm_start` uses the last timetable of the user as solution hints (default: true),
+  `reuse_feasible` also returns cached results that are not proven optimal (default: false),
+  `stop_gap` stops the search once the timetable is proven within this relative gap of the optimum,
+  `stagnation_seconds` stops it when the objective has not improved for that many seconds (default: off).
+- POST /cancel/<job_id>:
+  Cancels a queued or running job of the user. A running job stops its search and keeps the best
+  timetable found so far as its result.
+- GET /status/<job_id>[?format=full|compact]:
   Returns the current status and (if finished) the result of a specific computation job.
+  Running jobs report their progress (solutions, objective, bound, gap, elapsed time) and,
+  once the solver found one, the best timetable so far as provisional result.
+  `format=compact` returns the timetables dictionary-encoded (see `utils/result_format.py`).
+  The response carries an ETag, a repeated poll with `If-None-Match` of an unchanged job is answered with 304.
+- GET /status/<job_id>/stream[?format=full|compact]:
+  Server-Sent Events stream of the same status, pushed whenever it changes.
 
 Functionality:
-- When the `/start_computing` route is called, a separate background thread is launched.
+- When the `/start_computing` route is called, the computation is queued in the solve scheduler
+  (see `utils/scheduler.py`), which runs a bounded number of computations at the same time.
 - This thread loads all user-specific data (e.g., classes, teachers, subjects, settings)
-  from the database and constructs a constraint optimization model.
+  from the database into a plain snapshot of the school (see `utils/school_loader.py`),
+  from which a constraint optimization model is built. The solver itself does not need the
+  database (see `solver/school.py`).
+- Before the model is built, the data is checked for obvious contradictions (see
+  `utils/feasibility.py`). Over-constrained schools finish immediately with status
+  "infeasible" and a list of problems.
 - The model considers hard constraints (e.g., subject hours, teacher availability, room
   restrictions) and soft preferences (e.g., block scheduling, early hours).
+- The number of search workers and the time limit are allocated per job from the size of
+  the school and the server load (see `utils/budget.py`). Small schools and jobs with others
+  waiting in the queue stop once their objective has stalled.
+- The model is built and solved in a worker process of the solver pool (see `utils/solver_pool.py`
+  and `solver/worker.py`), so the API stays responsive while solving and survives solver crashes.
+- The model itself is built by `solver/model.py` from a plain snapshot of the loaded data.
+  Built models are cached on disk by a fingerprint of that data (see `solver/model_cache.py`).
+  Two model formulations are available (integer and onehot), selected per job.
 - Upon successful solving, an optimized timetable is generated for each class and
   teacher and stored in memory.
+- Successful results are cached by a fingerprint of the loaded data (see `utils/result_cache.py`).
+  If an optimal result exists for identical data, the job finishes immediately with it
+  (marked with "cached": true, the statistics of the earlier solve are left out). Cached feasible results
+  are used as a warm start instead.
+- The last timetable of every user is kept as a snapshot (see `solver/hints.py` and
+  `utils/last_solutions.py`) and passed to the solver as hints on the next run, so small
+  changes of the data do not start the search from scratch.
+- Running jobs stop early when they are cancelled, superseded by a newer job of the user, or reach the
+  optional gap or stagnation criterion; the workers are then free for the next job.
+- Every result records the time of the job phases (queue, load, feasibility, model build, solve,
+  extraction), the size of the model and the CP-SAT statistics in its statistics
+  (see `solver/instrumentation.py`). Aggregate job metrics are exported by `/metrics` (see `utils/metrics.py`).
 - The progress and result of the computation can be queried via the `/status/<job_id>`
-  endpoint.
+  endpoint. Jobs are kept in a bounded job store, in memory or in the database
+  (see `utils/job_store.py`), with the timetables in the compact format.
+- Responses are compressed with gzip or brotli (see `utils/compression.py`).
 
 Technologies:
 - Flask Blueprint for route definition
 - MariaDB
 - OR-Tools (cp_model) for constraint solving
-- Multithreading for concurrent computation
-- In-memory storage (dicts) for job tracking
+- Multithreading (bounded scheduler) and worker processes for concurrent computation
+- Job store (in-memory LRU or MariaDB) for job tracking
 """
 
 
 # Blueprint for the AsyncCompute area
 AsyncCompute = Blueprint("AsyncCompute", __name__)
 
-# in-memory storage for job status and results
-job_status = {}
-job_results = {}
+# storage for job status and results (backend selected by the JOB_STORE environment variable)
+job_store = create_job_store()
 
+# queue and worker threads for all computations of this process, cancelled running jobs stop their search
+scheduler = SolveScheduler(stop=cancel_solve)
+
+
+def store_progress(job_id, progress):
+    """
+    Stores a progress report of the solver (see solver/worker.py) with the job. A provisional timetable
+    of the report becomes the result of the running job until the final result replaces it.
+    """
+    timetable = progress.pop("timetable", None)
+    if timetable is not None:
+        # the timetable comes in the compact format (see solver/model.py), stored as it is
+        job_store.set_provisional(job_id, {
+            "status": "success",
+            "provisional": True,
+            **timetable,
+            "objective": progress["objective"]
+        })
+    job_store.set_progress(job_id, progress)
+
+
+# progress reports of the solver are stored with the job
+set_progress_handler(store_progress)
+
+# seconds between two checks of the job in the status stream, and between two keep-alive comments
+STREAM_INTERVAL = 0.5
+STREAM_KEEP_ALIVE = 15
+
+# available solve strategies, the first one is the default
+# - monolithic: teachers and time slots are decided in one model
+# - two_phase: teachers are assigned first, then the lessons are placed with fixed teachers
+# - incremental: only the classes affected by changes since the last run are re-optimized
+# - portfolio: the k best distinct timetables from parallel searches
+SOLVE_STRATEGIES = ('monolithic', 'two_phase', 'incremental', 'portfolio')
+
+# maximum number of timetables of the portfolio strategy
+MAX_ALTERNATIVES = 10
+
+# formats of the timetables in `/status/<job_id>`, the first one is the default (see utils/result_format.py)
+RESULT_FORMATS = ('full', 'compact')
 
 # route to start the computation
 @AsyncCompute.route('/start_computing', methods=['GET'])
@@ -50,620 +148,278 @@ def start_computing():
     """
     Starts asynchronous school timetable generation in a background thread.
 
+    Query Parameters:
+        model (str, optional): Model formulation to use, one of MODEL_BACKENDS (default: "integer").
+        strategy (str, optional): Solve strategy, one of SOLVE_STRATEGIES (default: "monolithic").
+        alternatives (int, optional): Number of timetables of the portfolio strategy, 1 to MAX_ALTERNATIVES (default: 3).
+        min_difference (int, optional): Minimum number of lessons placed differently between two timetables
+            of the portfolio strategy (default: 10 % of the lessons).
+        symmetry_breaking (str, optional): "true" or "1" to break symmetries between identical
+            classes and teachers (default: false).
+        warm_start (str, optional): "false" or "0" to ignore the last timetable of the user
+            (default: true).
+        reuse_feasible (str, optional): "true" or "1" to also return a cached result for identical
+            data that is not proven optimal (default: false).
+        stop_gap (float, optional): Stop once the timetable is proven within this relative gap
+            of the optimum, e.g. 0.01 (default: 0, solve until optimal or out of time).
+        stagnation_seconds (float, optional): Stop when the objective has not improved for this
+            many seconds (default: 0, disabled).
+
     Returns:
         JSON containing:
         - 'job_id': Unique identifier for tracking the computation
         - 'status': Initial status ("started")
+        - 'reused': True if the ID belongs to an already queued job of the user
+        - 'superseded': ID of the job of the user that was cancelled in favour of this one, or None
+        or 401 without a logged-in user, 400 for invalid parameters, or 429 if too many computations are waiting.
 
     The job's progress and result can be checked via `/status/<job_id>`.
     """
+    # jobs are queued, coalesced and superseded per user, so an anonymous request never reaches the scheduler
+    Uid = session.get('Uid')
+    if Uid is None:
+        return jsonify({"error": "No user ID found in session."}), 401
+
+    model_backend = request.args.get('model', MODEL_BACKENDS[0])
+    if model_backend not in MODEL_BACKENDS:
+        return jsonify({"error": f"Unknown model '{model_backend}', expected one of {list(MODEL_BACKENDS)}"}), 400
+
+    strategy = request.args.get('strategy', SOLVE_STRATEGIES[0])
+    if strategy not in SOLVE_STRATEGIES:
+        return jsonify({"error": f"Unknown strategy '{strategy}', expected one of {list(SOLVE_STRATEGIES)}"}), 400
+
+    try:
+        alternatives = int(request.args.get('alternatives', 3))
+        min_difference = int(request.args['min_difference']) if 'min_difference' in request.args else None
+    except ValueError:
+        return jsonify({"error": "alternatives and min_difference must be integers"}), 400
+    if not 1 <= alternatives <= MAX_ALTERNATIVES or (min_difference is not None and min_difference < 1):
+        return jsonify({"error": f"alternatives must be 1 to {MAX_ALTERNATIVES}, min_difference at least 1"}), 400
+
+    symmetry_breaking = request.args.get('symmetry_breaking', 'false').lower() in ('true', '1')
+    warm_start = request.args.get('warm_start', 'true').lower() not in ('false', '0')
+    reuse_feasible = request.args.get('reuse_feasible', 'false').lower() in ('true', '1')
+
+    try:
+        stop_gap = float(request.args.get('stop_gap', 0))
+        stagnation_seconds = float(request.args.get('stagnation_seconds', 0))
+    except ValueError:
+        return jsonify({"error": "stop_gap and stagnation_seconds must be numbers"}), 400
+    if stop_gap < 0 or stagnation_seconds < 0:
+        return jsonify({"error": "stop_gap and stagnation_seconds must not be negative"}), 400
+
     job_id = str(uuid.uuid4())  # unique ID
-    job_status[job_id] = 'running'
-    job_results[job_id] = None
+    submitted = time.monotonic()  # start of the queue time of the job
+
+    def finish(Uid, status, result):
+        # release the user in the scheduler first, a new request of the user then starts a new job
+        scheduler.release(Uid, job_id)
+        # the job can no longer be cancelled, drop its cancellation request
+        forget_cancel(job_id)
+        # a cancelled job keeps its result (the best timetable found so far) under the status 'cancelled'
+        if status == 'finished' and scheduler.cancellation(job_id):
+            status = 'cancelled'
+        job_store.update(job_id, status, result)
+
+        # metrics of the API process (see utils/metrics.py)
+        if status == 'error':
+            jobs_failed.inc()
+        else:
+            jobs_finished.inc(status='cancelled' if status == 'cancelled' else result.get("status", status))
 
     def background_computing(Uid):
+        # time per phase of the job, the solver adds its phases (see solver/instrumentation.py)
+        timings = {"queue": round(time.monotonic() - submitted, 4)}
+        jobs_started.inc()
+        job_queue_seconds.observe(timings["queue"])
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-
-            # Fetch scheduling preferences for the current user
-            cursor.execute("""
-                SELECT 
-                    prefer_early_hours,
-                    allow_block_scheduling,
-                    max_hours_per_day,
-                    global_break,
-                    weight_block_scheduling,
-                    weight_time_of_hours,
-                    max_time_for_solving
-                FROM Settings
-                WHERE Uid = %s""", (Uid,))
-
-            settings = cursor.fetchone()
-            if not settings:
-                job_results[job_id] = {"error": "No settings found for this user."}
-
-            # Fetch restricted parallel subjects (e.g. lab subjects, gym)
-            cursor.execute("""
-                SELECT subject_name, max_parallel
-                FROM SubjectParallelLimits
-                WHERE Uid = %s
-            """, (Uid,))
-            restricted_parallel_subjects = cursor.fetchall()
-
-            # Apply settings
-            # activate certain pats of the code based on the settings
-            PREFER_EARLY_HOURS = settings[0]
-            ALLOW_BLOCK_SCHEDULING = settings[1]
-
-            # Set scheduling parameters
-            MAX_HOURS_PER_DAY = settings[2]
-            GLOBAL_BREAK = settings[3] -1 # Adjust for zero-based indexing (e.g. 8 hours per day means indices 0-7)
-
-
-            # Set weights for the soft restrictions
-            WEIGHT_BLOCK_SCHEDULING = settings[4]
-            WEIGHT_TIME_OF_HOURS = settings[5]
-
-            # Set maximum time for solving the problem
-            MAX_TIME_FOR_SOLVING = settings[6]
-
-            # Fetch subjects that strongly prefer block periods
-            cursor.execute("""
-                SELECT subject_name, weight 
-                FROM PreferBlockSubjects
-                WHERE Uid = %s
-            """, (Uid,))
-            PREFER_BLOCK_SUBJECTS = {row[0]: row[1] for row in cursor.fetchall()}
-
-            # Fetch class and subject list from the school data
-            cursor.execute("""
-                SELECT 
-                    classes,
-                    subjects,
-                    hours_per_day
-                FROM School
-                WHERE Uid = %s
-            """, (Uid,))
-            school_data = cursor.fetchone()
-            if not school_data:
-                job_results[job_id] = {"error": "No school data found for this user."}
-            
-            # Apply settings
-            classes = ast.literal_eval(school_data[0])    # List of classes e.g. ['C1', 'C2', 'C3'] >> converted from string to list
-            subjects = ast.literal_eval(school_data[1])   # List of subjects e.g. ['Math', 'English', 'History']    
-            hours_per_day = school_data[2] - 1  # -1 bacause of the additional break period
-            days = ['Mo', 'Tu', 'We', 'Th', 'Fr'] 
-
-            school_id = Uid  # Each user manages exactly one school dataset, so Uid == school_id
-            subject_indices = {subject: i for i, subject in enumerate(subjects)}
-
-            # Fetch all teachers that belong to the current school
-            cursor.execute("SELECT Tid, name, max_hours FROM Teachers WHERE Uid = %s", (school_id,))
-            teachers_info = {
-                row[0]: {"name": row[1], "max_hours": row[2], "subjects": []}
-                for row in cursor.fetchall()
+            job_store.update(job_id, 'running')
+
+            # Load the data of the user into a plain snapshot of the school (see utils/school_loader.py),
+            # everything after this point works on the snapshot only (see solver/school.py)
+            started = time.perf_counter()
+            school, MAX_TIME_FOR_SOLVING = load_school(Uid)
+            timings["load"] = round(time.perf_counter() - started, 4)
+
+            # Static feasibility analysis of the loaded data before any model is built.
+            # Over-constrained schools are rejected within milliseconds with a list of problems,
+            # instead of letting the solver search for the full time limit without a solution.
+            started = time.perf_counter()
+            problems = school_problems(school)
+            timings["feasibility"] = round(time.perf_counter() - started, 4)
+            if problems:
+                finish(Uid, 'finished', {"status": "infeasible", "problems": problems, "statistics": {"timings": timings}})
+                return
+
+            # Identical data was solved before: optimal results (and feasible ones on request) are returned
+            # immediately, without building a model (see utils/result_cache.py).
+            # A cached result holds no alternatives, so the portfolio only uses it as warm start.
+            fingerprint = school_fingerprint(school)
+            cached = get_cached_result(fingerprint)
+            if cached and (cached["optimal"] or reuse_feasible) and strategy != 'portfolio':
+                # the statistics of the cached solve (maybe of another user) are not the ones of this job
+                result = served_result(cached, timings)
+                store_last_solution(Uid, school, cached["snapshot"])
+                finish(Uid, 'finished', result)
+                return
+
+            # last run of this user, its timetable is mapped onto the new model by names
+            previous = get_last_solution(Uid)
+            snapshot = previous["snapshot"] if previous and warm_start else None
+
+            # a cached feasible result for exactly this data is the better starting point
+            if cached and warm_start:
+                snapshot = cached["snapshot"]
+
+            # cancelled while the data was loaded, the workers are not needed anymore
+            reason = scheduler.cancellation(job_id)
+            if reason:
+                finish(Uid, 'cancelled', {"status": reason})
+                return
+
+            # Build and solve the model in a worker process of the solver pool (see solver/worker.py).
+            # Only plain data is passed, the result contains the timetables and the statistics of the run.
+            options = {
+                "model_backend": model_backend,
+                "strategy": strategy,
+                "symmetry_breaking": symmetry_breaking,
+                "stop_gap": stop_gap,
+                "stagnation_seconds": stagnation_seconds,
+                "alternatives": alternatives,
+                "min_difference": min_difference
             }
-            teacher_ids   = sorted(teachers_info.keys())                      # e.g. [1,2,3,4]
-            teacher_names = [teachers_info[tid]["name"] for tid in teacher_ids]  # ["Maier", …]
-            teacher_indices = {tid: i for i, tid in enumerate(teacher_ids)}     # {1:0, 2:1, …}
-
-            # Get all teacher IDs
-            teacher_ids = tuple(teachers_info.keys())
+            # Search workers, time limit and stagnation stop of this job from the instance size and the server load,
+            # max_time_for_solving of the settings is the requested time (see utils/budget.py)
+            num_workers, time_limit, budget_stagnation = scheduler.reserve(
+                job_id, lambda load: allocate_budget(
+                    school, MAX_TIME_FOR_SOLVING, load, alternatives if strategy == 'portfolio' else 1
+                )
+            )
+            # the earlier of the requested and the budget's stagnation stop applies
+            options["stagnation_seconds"] = min(
+                [seconds for seconds in (stagnation_seconds, budget_stagnation) if seconds > 0], default=0.0
+            )
+
+            started = time.perf_counter()
+            solved = run_solve(school, options, time_limit, num_workers, previous, snapshot, job_id)
+            job_solve_seconds.observe(time.perf_counter() - started)
+            result = solved["result"]
+            result["statistics"].update({
+                "num_workers": num_workers,
+                "time_limit": time_limit,
+                "stagnation_seconds": options["stagnation_seconds"],
+                "requested_time": MAX_TIME_FOR_SOLVING,
+                # phases of the API first, then the ones of the solver
+                "timings": {**timings, **result["statistics"]["timings"]}
+            })
+
+            if result["status"] == "success" and not scheduler.cancellation(job_id):
+                # remember the timetable for the next run of this user
+                # (not for cancelled jobs, a superseding job of the user may already have stored a newer one)
+                store_last_solution(Uid, school, solved["snapshot"])
+
+                # and for identical data of later runs
+                store_result(fingerprint, result, result["optimal"], school, solved["snapshot"])
+
+            # safe results
+            finish(Uid, 'finished', result)
 
-            # Fetch and assign subjects to each teacher
-            if teacher_ids:
-                sql = f"""
-                    SELECT Tid, subject 
-                    FROM TeacherSubjects 
-                    WHERE Tid IN ({','.join(['%s'] * len(teacher_ids))})
-                """
-                cursor.execute(sql, teacher_ids)
-                for t_id, subject in cursor.fetchall():
-                    teachers_info[t_id]["subjects"].append(subject)
+        # Handle any exceptions that occur during the computation that wasn't caught by the solver
+        except Exception as e:
+            finish(Uid, 'error', {
+                "error": str(e),
+                "traceback": traceback.format_exc()
+            })
+
+
+    # Queue the function 'background_computing' with the argument 'Uid' in the scheduler.
+    # It is executed by one of the worker threads as soon as one is free, independently from the main thread.
+    # The job is created in the job store before any worker can pick it up.
+    # A queued job of the user with the same parameters is reused, any other job of the user is superseded.
+    try:
+        job_id, reused, superseded = scheduler.submit(
+            job_id, Uid, background_computing, (Uid,),
+            register=lambda: job_store.create(job_id, Uid, 'queued'),
+            key=(model_backend, strategy, symmetry_breaking, warm_start, reuse_feasible, stop_gap, stagnation_seconds,
+                 alternatives, min_difference)
+        )
+    except QueueFull:
+        return jsonify({"error": "Too many timetable computations are waiting, please try again later."}), 429
+
+    # a superseded running job stores its result itself, a queued one never starts
+    if superseded and superseded[1] == 'queued':
+        job_store.update(superseded[0], 'cancelled', {"status": "superseded", "superseded_by": job_id})
 
+    return jsonify({
+        "job_id": job_id,
+        "status": "started",
+        "reused": reused,
+        "superseded": superseded[0] if superseded else None
+    }), 202
 
-            # Fetch subject-hour assignments for each class at the current school
-            cursor.execute("""
-                SELECT class_name, subject, hours_per_week
-                FROM Classes
-                WHERE Uid = %s""", (school_id,))
-
-            # Build a nested dictionary: {class_name: {subject: hours_per_week}}
-            class_subject_hours = {}
-            for class_name, subject, hours in cursor.fetchall():
-                if class_name not in class_subject_hours:
-                    class_subject_hours[class_name] = {}
-                class_subject_hours[class_name][subject] = hours
-
-
-            # Close the database connection
-            cursor.close()
 
+# route to cancel a job
+@AsyncCompute.route('/cancel/<job_id>', methods=['POST'])
+def cancel(job_id):
+    """
+    Cancels a queued or running job of the user. A queued job is removed from the queue, a running
+    job stops its search within a fraction of a second and frees its workers; it keeps the best
+    timetable found so far as its result (status 'cancelled').
 
+    Args:
+        job_id (str): Unique identifier for the computation job.
 
-            # Initialize the model
+    Returns:
+        JSON containing:
+        - 'job_id': The cancelled job
+        - 'status': 'cancelled' (queued job) or 'cancelling' (running job, the result follows in `/status/<job_id>`)
+        or 404 if the job is not queued or running for this user in this process.
+    """
+    Uid = session.get('Uid')
+    state = scheduler.cancel(job_id, 'cancelled', Uid) if Uid else None
+    if state is None:
+        return jsonify({"error": "Kein laufender Job mit dieser ID"}), 404
 
-            model = cp_model.CpModel()  # Create a new CP model
+    if state == 'queued':
+        job_store.update(job_id, 'cancelled', {"status": "cancelled"})
+        return jsonify({"job_id": job_id, "status": "cancelled"})
 
-            # schedule: (class, day, hour) -> subject
-            # is_occupied: (class, day, hour) -> BoolVar
-            schedule = {}
-            is_occupied = {}
-            objective_terms = []  # List to store terms used in the objective function
-
-            # Build the variable structure for the schedule:
-            # For each class, each day, and each hour:
-            # - a subject variable (var) is created, which is either a subject index (>= 0) or -1 (free period),
-            # - a Boolean variable (occupied) indicating if the slot is used,
-            # - both variables are logically linked to ensure consistency.
-            for c in classes: 
-                for d in range(len(days)):
-                    for h in range(hours_per_day): 
-                        var = model.NewIntVar(-1, len(subjects) - 1, f'{c}_{d}_{h}')  # Subject index or -1 for free period
-                        occupied = model.NewBoolVar(f'occupied_{c}_{d}_{h}')  # Occupancy status (True/False)
-                        model.Add(var >= 0).OnlyEnforceIf(occupied)  # If occupied, subject index must be valid
-                        model.Add(var < 0).OnlyEnforceIf(occupied.Not())  # If not occupied, value must be -1
-                        schedule[(c, d, h)] = var  # Store subject variable
-                        is_occupied[(c, d, h)] = occupied  # Store occupancy variable
-
-            # preparing the teacher, class and subject mapping
-            teacher_schedule = {}  # (class, day, hour) -> teacher index or -1 (no teacher assigned)
-            for c in classes:
-                for d in range(len(days)):
-                    for h in range(hours_per_day):
-                        teacher_schedule[(c, d, h)] = model.NewIntVar(-1, len(teachers_info) - 1, f'teacher_{c}_{d}_{h}')
-
-
-
-            # Assign a constant teacher to each subject per class
-            # This variable determines which teacher will consistently teach the subject in that class
-            constant_teacher = {}
-            for c in classes:
-                for subject in class_subject_hours[c]:
-                    constant_teacher[(c, subject)] = model.NewIntVar(0, len(teachers_info) - 1, f'const_teacher_{c}_{subject}')
-
-
-            # For each class, day, and hour:
-            # Check whether a specific subject is scheduled in that slot.
-            # If yes, enforce that the assigned teacher matches the pre-assigned (constant) teacher for that subject in that class.
-            # Goal: A subject should always be taught by the same teacher in a specific class.
+    return jsonify({"job_id": job_id, "status": "cancelling"}), 202
 
-            for c in classes:
-                for d in range(len(days)):
-                    for h in range(hours_per_day):
-                        subject_var = schedule[(c, d, h)]        # The subject scheduled in this time slot
-                        teacher_var = teacher_schedule[(c, d, h)]  # The teacher assigned to this time slot
 
-                        for subject in class_subject_hours[c]:  # Only consider subjects scheduled for this class
-                            subject_index = subject_indices[subject]  # Get the subject index (e.g., Math = 0, English = 1, ...)
-                            is_subject = model.NewBoolVar(f'is_{subject}_{c}_{d}_{h}')  # Bool: Is this subject scheduled here?
-
-                            # If this subject is scheduled here, then is_subject = True
-                            model.Add(subject_var == subject_index).OnlyEnforceIf(is_subject)
-
-                            # If another subject is scheduled, then is_subject = False
-                            model.Add(subject_var != subject_index).OnlyEnforceIf(is_subject.Not())
-
-                            # If this subject is scheduled, enforce that the correct constant teacher is assigned
-                            model.Add(teacher_var == constant_teacher[(c, subject)]).OnlyEnforceIf(is_subject)
-
-
-
-            # This is a hard constraint to ensure that the subject taught before the break is different from the one after the break.
-            # This is important to avoid situations where the same subject is taught immediately before and after the break,
-            # which can be confusing for students and disrupts the flow of the day.
-            prev_hour = GLOBAL_BREAK - 1
-
-            for c in classes:
-                for d in range(len(days)):
-                    subj_prev = schedule[(c, d, prev_hour)]
-                    subj_curr = schedule[(c, d, GLOBAL_BREAK)]
-
-                    # Only check if both slots are occupied. In case of a "free" slot, this constraint is not applied.
-                    both_occupied = model.NewBoolVar(f'{c}_{d}_both_occupied_{prev_hour}_{GLOBAL_BREAK}')
-                    model.AddBoolAnd([
-                        is_occupied[(c, d, prev_hour)],
-                        is_occupied[(c, d, GLOBAL_BREAK)]
-                    ]).OnlyEnforceIf(both_occupied)
-                    model.AddBoolOr([
-                        is_occupied[(c, d, prev_hour)].Not(),
-                        is_occupied[(c, d, GLOBAL_BREAK)].Not()
-                    ]).OnlyEnforceIf(both_occupied.Not())
-
-                    # if both slots are occupied, then the subjects must be different
-                    are_different = model.NewBoolVar(f'{c}_{d}_diff_subj_{prev_hour}_{GLOBAL_BREAK}')
-                    model.Add(subj_prev != subj_curr).OnlyEnforceIf(are_different)
-                    model.Add(subj_prev == subj_curr).OnlyEnforceIf(are_different.Not())
-
-                    model.AddImplication(both_occupied, are_different)
-
-
-
-
-            # HARD CONSTRAINT: Prevent scheduling of subjects that are not assigned to a class
-            # This constraint ensures that each class only gets scheduled the subjects 
-            # that are explicitly assigned to it (based on the 'class_subject_hours' data).
-            # Any subject that is not listed for the class must not appear in its timetable.
-            # Without this, the solver may assign "foreign" subjects (like Physics in a class 
-            # that doesn’t have it) simply because it helps satisfy other constraints.
-            
-            for c in classes:
-                allowed_subjects = set(class_subject_hours[c].keys())
-                disallowed_subjects = set(subjects) - allowed_subjects
-
-                for subject in disallowed_subjects:
-                    subj_idx = subject_indices[subject]
-                    for d in range(len(days)):
-                        for h in range(hours_per_day):
-                            # Only check if the time slot is actually occupied
-                            b = model.NewBoolVar(f'{c}_{subject}_{d}_{h}_not_allowed')
-                            model.Add(schedule[(c, d, h)] == subj_idx).OnlyEnforceIf(b)
-                            model.Add(schedule[(c, d, h)] != subj_idx).OnlyEnforceIf(b.Not())
-                            
-                            # A disallowed subject must never be scheduled during an occupied slot
-                            model.Add(b == 0).OnlyEnforceIf(is_occupied[(c, d, h)])
-
-
-
-            # Hard Constraint: Limit the number of simultaneous lessons for specific subjects.
-            # Background: Some subjects – such as Physical Education or Science – require special rooms
-            # (e.g. gymnasium, chemistry lab). These resources are limited.
-            # Therefore, a subject may only be taught a limited number of times simultaneously across all classes in any time slot.
-
-            for subject, max_parallel in restricted_parallel_subjects:  # For each subject with a parallel limit
-                subject_index = subject_indices[subject]  # Get the index of the subject
-
-                for d in range(len(days)):  
-                    for h in range(hours_per_day):  
-
-                        concurrent_subject_slots = []  # Tracks how many times the subject is taught at the same time
-
-                        for c in classes: 
-                            is_scheduled = model.NewBoolVar(f'{subject}_{c}_{d}_{h}_concurrent')
-                            model.Add(schedule[(c, d, h)] == subject_index).OnlyEnforceIf(is_scheduled)
-                            model.Add(schedule[(c, d, h)] != subject_index).OnlyEnforceIf(is_scheduled.Not())
-                            concurrent_subject_slots.append(is_scheduled)
-
-                        # Enforce the maximum number of times the subject may be taught concurrently in this slot
-                        model.Add(sum(concurrent_subject_slots) <= max_parallel)
-
-
-            # Hard Constraints to ensure that each subject in each class
-            # appears in the schedule exactly as many times as specified in class_subject_hours.
-            # For every time slot, check whether the subject is scheduled.
-            # Store this information in a Boolean variable and count them in the end.
-
-            for c in classes:
-                for subject, required_count in class_subject_hours[c].items():
-                    subject_index = subject_indices[subject]
-                    occurrences = []
-                    for d in range(len(days)):
-                        for h in range(hours_per_day):
-                            is_scheduled = model.NewBoolVar(f'{c}_{subject}_{d}_{h}')  # Bool: is this subject scheduled in this slot?
-                            model.Add(schedule[(c, d, h)] == subject_index).OnlyEnforceIf(is_scheduled)
-                            model.Add(schedule[(c, d, h)] != subject_index).OnlyEnforceIf(is_scheduled.Not())
-                            occurrences.append(is_scheduled)  # Collect for later counting
-                    # The subject must be scheduled exactly 'required_count' times per week
-                    model.Add(sum(occurrences) == required_count)
-
-
-
-            # Hard Constraint: A teacher may only teach subjects they are qualified for.
-            # For each time slot, check if a teacher is assigned.
-            # If so, ensure that the subject assigned in that slot matches the teacher’s allowed subjects.
-            # This is enforced using a Boolean variable `b`, which indicates whether the teacher is teaching in that slot.
-            # If `b=True`, then the subject must be one of the teacher's allowed subjects.
-
-            for c in classes:
-                for d in range(len(days)):
-                    for h in range(hours_per_day):
-                        subj_var  = schedule[(c, d, h)]
-                        teach_var = teacher_schedule[(c, d, h)]
-
-                        # Create an implication for each teacher:
-                        # if teacher t is assigned (b == True) then subj_var must be in t's allowed list.
-                        for teacher, info in teachers_info.items():
-                            t_idx        = teacher_indices[teacher]
-                            allowed_idxs = [subject_indices[s] for s in info["subjects"]]
-
-                            b = model.NewBoolVar(f"{teacher}_{c}_{d}_{h}")
-                            model.Add(teach_var == t_idx).OnlyEnforceIf(b)
-                            model.Add(teach_var != t_idx).OnlyEnforceIf(b.Not())
-
-                            ok_flags = []
-                            for idx in allowed_idxs:
-                                ok = model.NewBoolVar(f"{teacher}_{c}_{d}_{h}_ok_{idx}")
-                                model.Add(subj_var == idx).OnlyEnforceIf(ok)
-                                model.Add(subj_var != idx).OnlyEnforceIf(ok.Not())
-                                ok_flags.append(ok)
-
-                            # At least one allowed subject must be true when b is true
-                            model.Add(sum(ok_flags) == 1).OnlyEnforceIf(b)
-
-
-            # Hard Constraints on teacher workload:
-            # For each teacher we enforce:
-            # - They can teach at most one class in any given time slot,
-            # - Their total weekly teaching hours do not exceed their maximum allowed.
-            # For each time slot and class, a Boolean variable is created to indicate whether
-            # the teacher is teaching there. The sum of these Booleans represents the workload.
-
-            for teacher, t_index in teacher_indices.items():
-                assignments = []  # List of all assignments for this teacher across the week
-
-                for d in range(len(days)):
-                    for h in range(hours_per_day):
-                        for c in classes: 
-                            # Boolean variable: Is this teacher assigned to this class at this time?
-                            b = model.NewBoolVar(f'{teacher}_assigned_{c}_{d}_{h}')
-                            model.Add(teacher_schedule[(c, d, h)] == t_index).OnlyEnforceIf(b)
-                            model.Add(teacher_schedule[(c, d, h)] != t_index).OnlyEnforceIf(b.Not())
-                            assignments.append(b)
-
-                        # A teacher may only be assigned to one class per time slot
-                        model.Add(sum(assignments[-len(classes):]) <= 1)
-
-                # Limit total working hours per week
-                model.Add(sum(assignments) <= teachers_info[teacher]['max_hours'])
-
-
-            # Hard Constraint: If a time slot is not occupied, no teacher should be assigned
-            for c in classes:
-                for d in range(len(days)):
-                    for h in range(hours_per_day):
-                        occupied = is_occupied[(c, d, h)]
-                        teacher_var = teacher_schedule[(c, d, h)]
-                        model.Add(teacher_var == -1).OnlyEnforceIf(occupied.Not())  # No teacher if not occupied
-                        model.Add(teacher_var >= 0).OnlyEnforceIf(occupied)         # Valid teacher index if occupied
-
-
-
-            # Hard Constraint: Limit how often a subject can be taught per day in a single class.
-            # Goal: A subject should appear at most MAX_HOURS_PER_DAY times per day.
-            # Example: If MAX_HOURS_PER_DAY = 2, then Math can occur at most twice per day, regardless of continuity.
-
-            for c in classes:
-                for subject, _ in class_subject_hours[c].items():  # Only consider subjects assigned to this class
-                    subject_index = subject_indices[subject] 
-                    for d in range(len(days)): 
-                        occurrences = []  # List of slots where this subject occurs on this day
-                        for h in range(hours_per_day): 
-                            b = model.NewBoolVar(f'{c}_{subject}_{d}_{h}_daylimit')
-                            # b = True ⇔ this subject is scheduled in this slot
-                            model.Add(schedule[(c, d, h)] == subject_index).OnlyEnforceIf(b)
-                            model.Add(schedule[(c, d, h)] != subject_index).OnlyEnforceIf(b.Not())
-                            occurrences.append(b)
-                        # The total number of scheduled hours for this subject on this day must not exceed the limit
-                        model.Add(sum(occurrences) <= MAX_HOURS_PER_DAY)
-
-
-            # Hard Constrain: a subject may appear in at most one block per day
-            # This means that if a subject is scheduled in a class on a specific day,
-            # it should not be taught as two separated blocks.
-            # This is enforced by the following constraints:
-            for c in classes:
-                for subject, _ in class_subject_hours[c].items():  # only subjects actually taught in this class
-                    subj_idx = subject_indices[subject]
-                    for d in range(len(days)):
-                        # 1. Helper variables: is the subject scheduled in period h?
-                        is_subj = []
-                        for h in range(hours_per_day):
-                            b = model.NewBoolVar(f'{c}_{subject}_{d}_{h}_is')
-                            model.Add(schedule[(c, d, h)] == subj_idx).OnlyEnforceIf(b)
-                            model.Add(schedule[(c, d, h)] != subj_idx).OnlyEnforceIf(b.Not())
-                            is_subj.append(b)
-
-                        # 2. “Start” variables: is period h the beginning of a new block?
-                        starts = []
-                        for h in range(hours_per_day):
-                            if h == 0:
-                                # The first slot of the day is a block start if it contains the subject
-                                starts.append(is_subj[0])
-                            else:
-                                s = model.NewBoolVar(f'{c}_{subject}_{d}_{h}_start')
-                                # Start ⇔ (subject now) ∧ (subject was NOT in the previous slot)
-                                model.AddBoolAnd([is_subj[h], is_subj[h-1].Not()]).OnlyEnforceIf(s)
-                                model.AddBoolOr([is_subj[h].Not(), is_subj[h-1]]).OnlyEnforceIf(s.Not())
-                                starts.append(s)
-
-                        # 3. At most ONE start → at most ONE contiguous block of this subject today
-                        model.Add(sum(starts) <= 1)
-
-
-
-            # All soft contraints follow here:
-            # Soft Constraints are used to guide the solver towards a more desirable solution,
-            # but they do not prevent the solver from finding a solution if they are violated.
-
-            # Soft Constrain: Prefer early hours – a subject should ideally be scheduled in the first hours of the day.
-            # The erlier a subject is scheduled, the higher the reinforcement weight.
-            # The solver trys to maximize the total weight of all scheduled subjects,
-            if PREFER_EARLY_HOURS: # only activated if the user settings allow it
-                for c in classes:
-                    for d in range(len(days)):
-                        for h in range(hours_per_day):
-                            period_weight = (hours_per_day - h) * WEIGHT_TIME_OF_HOURS
-                            objective_terms.append(is_occupied[(c, d, h)] * period_weight)
-
-            # Soft constraint: Prefer double periods – a subject should ideally be scheduled in a choosen amount of consecutive hours.
-            # This encourages "block lessons", which are often desirable for subjects like Math or Physical Education.
-            # This is only applied if the user settings allow it.
-            # This is done by checking pairs of consecutive hours for each class and subject.
-            # If a subject is scheduled in both hours, it is considered a "block" and gets a bonus.
-
-            if ALLOW_BLOCK_SCHEDULING:
-                for c in classes:
-                    for subject, _ in class_subject_hours[c].items():
-                        subj_idx = subject_indices[subject]
-                        # pick weight: global default OR subject-specific bonus
-                        weight = PREFER_BLOCK_SUBJECTS.get(subject, WEIGHT_BLOCK_SCHEDULING)
-                        for d in range(len(days)):
-                            for h in range(hours_per_day - 1):
-                                b1 = model.NewBoolVar(f'{c}_{subject}_{d}_{h}_b1')
-                                b2 = model.NewBoolVar(f'{c}_{subject}_{d}_{h}_b2')
-                                model.Add(schedule[(c, d, h)] == subj_idx).OnlyEnforceIf(b1)
-                                model.Add(schedule[(c, d, h)] != subj_idx).OnlyEnforceIf(b1.Not())
-                                model.Add(schedule[(c, d, h + 1)] == subj_idx).OnlyEnforceIf(b2)
-                                model.Add(schedule[(c, d, h + 1)] != subj_idx).OnlyEnforceIf(b2.Not())
-
-                                both = model.NewBoolVar(f'{c}_{subject}_{d}_{h}_both')
-                                model.AddBoolAnd([b1, b2]).OnlyEnforceIf(both)
-                                model.AddBoolOr([b1.Not(), b2.Not()]).OnlyEnforceIf(both.Not())
-
-                                objective_terms.append(both * weight)
-
-
-            #punish "inner gaps" in the schedule
-            # An "inner gap" is defined as a free period that is followed by more lessons in the same class.
-            # This is done by checking each class, day, and hour for free periods that are followed by occupied periods.
-            # This helps to concentrate lessons and avoid unnecessary breaks in the schedule.
-            for c in classes:
-                for d in range(len(days)):
-                    for h in range(hours_per_day - 1):  # No need to check the last period
-                        current = is_occupied[(c, d, h)]
-
-                        # Check if any upcoming period (after 'h') is still occupied
-                        future_occupied = []
-                        for h2 in range(h + 1, hours_per_day):
-                            future_occupied.append(is_occupied[(c, d, h2)])
-
-                        # Boolean: Is the current period a free period?
-                        is_free_now = model.NewBoolVar(f'{c}_{d}_{h}_free_now')
-                        model.Add(current == 0).OnlyEnforceIf(is_free_now)
-                        model.Add(current == 1).OnlyEnforceIf(is_free_now.Not())
-
-                        # Boolean: Is there any scheduled lesson after the current period?
-                        still_something_later = model.NewBoolVar(f'{c}_{d}_{h}_after')
-                        model.AddMaxEquality(still_something_later, future_occupied)
-
-                        # A free period that is followed by more lessons is considered an "inner gap"
-                        is_inner_gap = model.NewBoolVar(f'{c}_{d}_{h}_inner_gap')
-                        model.AddBoolAnd([is_free_now, still_something_later]).OnlyEnforceIf(is_inner_gap)
-                        model.AddBoolOr([is_free_now.Not(), still_something_later.Not()]).OnlyEnforceIf(is_inner_gap.Not())
-
-                        # Penalize such gaps in the objective function to reduce non-terminal free periods
-                        penalty_weight = 2  # Tune this to influence the importance of avoiding gaps
-                        objective_terms.append(is_inner_gap * -penalty_weight)
-
-
-            # The impact of the soft constraints is defined here.
-            # The objective function is a weighted sum of all terms that were collected during the model building.
-            # by trying to maximize this sum, the solver will try to find a solution that satisfies as many soft constraints as possible.
-            model.Maximize(sum(objective_terms))
-
-
-
-            # Configure and run the solver
-            solver = cp_model.CpSolver()
-            solver.parameters.max_time_in_seconds = MAX_TIME_FOR_SOLVING
-            solver.parameters.num_search_workers = 3  # Number of CPU cores to use 
-            # solver.parameters.linearization_level = 0  # Lower complexity (optional)
-            # solver.parameters.cp_model_presolve = True  # Use presolve (optional)
-
-            status = solver.Solve(model)
-
-            # if solver found a solution that satisfies all constraints as optimal as possible,
-            # then he is done and we can extract the results.
-            # if time runs out, but the solver found a feasible solution, the solver will return it, which is also acceptable.
-
-            if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
-                result = {
-                    "status": "success",
-                    "classes": {},
-                    "teachers": {}
-                }
-
-                # Build the timetable for each class and teacher ready to be returned to the user in a format
-                # that can be easily processed in the frontend.
-
-                # ---------- Timetable per class ---------------------------------
-                for c in classes:
-                    class_timetable = {}
-                    for d_index, day in enumerate(days):
-                        periods = []
-                        for h in range(hours_per_day):
-                            subj_idx = solver.Value(schedule[(c, d_index, h)])
-                            t_idx    = solver.Value(teacher_schedule[(c, d_index, h)])
-                            if subj_idx >= 0 and t_idx >= 0:
-                                subject = subjects[subj_idx]
-                                teacher = teacher_names[t_idx]         
-                                entry   = f"{subject} ({teacher})"
-                            else:
-                                entry = "free"
-                            periods.append(entry)
-
-                        # modified Output: from GLOBAL_BREAK move all periods one step forward
-                        shifted = periods[:GLOBAL_BREAK]
-                        shifted.append("free")  # adding a break
-                        shifted += periods[GLOBAL_BREAK:]
-                        class_timetable[day] = shifted
-
-                    result["classes"][c] = class_timetable
-
-
-                # ---------- Timetable per teacher -------------------------------
-                teacher_timetable = {}
-                for t_idx, teacher in enumerate(teacher_names):
-                    daily = {}
-                    for d_index, day in enumerate(days):
-                        periods = []
-                        for h in range(hours_per_day):
-                            entry = "free"
-                            for c in classes:
-                                if solver.Value(teacher_schedule[(c, d_index, h)]) == t_idx:
-                                    subj_idx = solver.Value(schedule[(c, d_index, h)])
-                                    subject  = subjects[subj_idx]
-                                    entry    = f"{subject} ({c})"
-                                    break
-                            periods.append(entry)
-
-                        # adding a break in GLOBAL_BREAK slot
-                        shifted = periods[:GLOBAL_BREAK]
-                        shifted.append("free")
-                        shifted += periods[GLOBAL_BREAK:]
-                        daily[day] = shifted
-
-                    teacher_timetable[teacher] = daily
-
-                result["teachers"] = teacher_timetable
-
-
-
-                # safe results
-                job_results[job_id] = result
-                job_status[job_id] = 'finished'
-
-            # in case the solver did not find a solution, no timetable has to be returned.
-            else:
-                job_results[job_id] = {"status": "no_solution"}
-                job_status[job_id] = 'finished'
 
-        # Handle any exceptions that occur during the computation that wasn't caught by the solver
-        except Exception as e:
-            job_status[job_id] = 'error'
-            job_results[job_id] = {
-                "error": str(e),
-                "traceback": traceback.format_exc()
-            }
-        finally:
-            cursor.close()
-            conn.close()
+def status_response(job_id, result_format=RESULT_FORMATS[0]):
+    """
+    Returns:
+        The status of a job as returned by `/status/<job_id>` with the timetables in `result_format`,
+        or None if the job is unknown.
+    """
+    # read from the active job store, so any API process can answer (unknown or expired jobs are None)
+    job = job_store.get(job_id, compact=result_format == 'compact')
+    if job is None:
+        return None
 
+    response = {
+        "status": job["status"],
+        # running jobs hold the provisional timetable (marked with "provisional": true) as result
+        "result": job["result"] if job["status"] in ('finished', 'cancelled', 'running') else None,
+        "progress": job["progress"] if job["status"] == 'running' else None
+    }
 
+    # position in the queue of the scheduler
+    if job["status"] == 'queued':
+        response.update(scheduler.queue_info(job_id) or {})
 
-    Uid = session.get('Uid')
-    if not Uid:
-        job_results[job_id] = {"error": "No user ID found in session."}
-        
-    # Create a new thread that will run the function 'background_computing' with the argument 'Uid'.
-    # This allows the function to execute in the background, independently from the main thread.
-    # 'thread.start()' launches the new thread and begins executing the target function.
-    thread = threading.Thread(target=background_computing, args=(Uid,))
-    thread.start()
+    return response
 
-    return jsonify({"job_id": job_id, "status": "started"}), 202
 
+def requested_format():
+    """
+    Returns:
+        The result format of the `format` query parameter, or None if it is unknown.
+    """
+    result_format = request.args.get('format', RESULT_FORMATS[0])
+    return result_format if result_format in RESULT_FORMATS else None
 
 
 # route to check the status of a job
@@ -673,15 +429,84 @@ def status(job_id):
     Args:
         job_id (str): Unique identifier for the computation job.
 
+    Query Parameters:
+        format (str, optional): "full" (default) or "compact" for dictionary-encoded timetables
+            (see utils/result_format.py). Results that cannot be encoded are returned in the full format.
+
     Returns:
         JSON containing:
-        - 'status': One of 'running', 'finished', 'error', or 'no_solution'
-        - 'result': Computation result if finished, otherwise None
+        - 'status': One of 'queued', 'running', 'finished', 'cancelled', 'error', or 'no_solution'
+          (a finished result has the status 'success', 'no_solution' or 'infeasible',
+          statistics.stop_reason tells why a search stopped early, statistics.timings, model_size and
+          solver_response where the time of the job went)
+        - 'result': Computation result if finished or cancelled, the best timetable so far of a running
+          job (marked with 'provisional': true, without statistics) once the solver found one, otherwise None
+        - 'progress': Last progress report of a running job (solutions, objective, best_bound,
+          gap, elapsed), otherwise None
+        - 'queue_position', 'estimated_start_in' (seconds): only for jobs queued in this process
+        or 400 for an unknown format, or 404 if the job is unknown.
+        The response has an ETag; a request with a matching `If-None-Match` header gets 304 without body.
     """
-    if job_id not in job_status:
+    result_format = requested_format()
+    if result_format is None:
+        return jsonify({"error": f"Unknown format, expected one of {list(RESULT_FORMATS)}"}), 400
+
+    response = status_response(job_id, result_format)
+    if response is None:
         return jsonify({"error": "Unbekannte Job-ID"}), 404
 
-    return jsonify({
-        "status": job_status[job_id],
-        "result": job_results[job_id] if job_status[job_id] == 'finished' else None
-    })
+    # Clients poll this route; a finished job does not change anymore, so the ETag of the (uncompressed)
+    # body answers repeated polls with 304. Weak, because the compressed variants share it (see utils/compression.py).
+    response = jsonify(response)
+    response.headers["Cache-Control"] = "no-cache"
+    response.add_etag(weak=True)
+    return response.make_conditional(request)
+
+
+# route to stream the status of a job
+@AsyncCompute.route('/status/<job_id>/stream', methods=['GET'])
+def status_stream(job_id):
+    """
+    Server-Sent Events variant of `/status/<job_id>`: pushes the status (same JSON as `/status/<job_id>`)
+    every time it changes, until the job is no longer queued or running.
+
+    Args:
+        job_id (str): Unique identifier for the computation job.
+
+    Query Parameters:
+        format (str, optional): "full" (default) or "compact", as for `/status/<job_id>`.
+
+    Returns:
+        A `text/event-stream` response, or 400 for an unknown format, or 404 if the job is unknown.
+    """
+    result_format = requested_format()
+    if result_format is None:
+        return jsonify({"error": f"Unknown format, expected one of {list(RESULT_FORMATS)}"}), 400
+
+    if job_store.get(job_id) is None:
+        return jsonify({"error": "Unbekannte Job-ID"}), 404
+
+    def events():
+        last_event = None
+        last_sent = time.monotonic()
+        while True:
+            response = status_response(job_id, result_format)
+            if response is None:
+                yield f'event: error\ndata: {json.dumps({"error": "Unbekannte Job-ID"})}\n\n'
+                return
+
+            event = json.dumps(response)
+            if event != last_event:
+                yield f'data: {event}\n\n'
+                last_event = event
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent > STREAM_KEEP_ALIVE:
+                # comment line, keeps proxies from closing the idle connection
+                yield ': keep-alive\n\n'
+                last_sent = time.monotonic()
+
+            if response["status"] not in ('queued', 'running'):
+                return
+            time.sleep(STREAM_INTERVAL)
+
+    return Response(events(), mimetype='text/event-stream', headers={"Cache-Control": "no-cache"})
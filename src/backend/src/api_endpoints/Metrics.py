@@ -0,0 +1,27 @@
+from flask import Blueprint, Response
+from ..utils.metrics import render_metrics, CONTENT_TYPE
+
+"""
+This module exports the operational metrics of the API process for Prometheus.
+
+Available Routes:
+- GET /metrics:
+  Counters of the started, finished and failed timetable jobs, histograms of their queue and
+  solve time and the latency of the API requests per endpoint (see `utils/metrics.py`).
+
+Technologies:
+- Flask Blueprint for route definition
+- Prometheus text exposition format
+"""
+
+
+Metrics = Blueprint("Metrics", __name__)
+
+
+@Metrics.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Returns:
+        All metrics of this API process in the Prometheus text format.
+    """
+    return Response(render_metrics(), content_type=CONTENT_TYPE)
@@ -3,6 +3,10 @@ from flask_cors import CORS
 from .api_endpoints.User import User
 from .api_endpoints.AsyncCompute import AsyncCompute
 from .api_endpoints.Settings import Settings
+from .api_endpoints.Metrics import Metrics
+from .utils.solver_pool import start_pool
+from .utils.metrics import register_request_metrics
+from .utils.compression import register_compression
 import logging
 import os
 
@@ -32,6 +36,15 @@ logging.basicConfig(level=logging.DEBUG)
 app.register_blueprint(User) 
 app.register_blueprint(Settings)
 app.register_blueprint(AsyncCompute)
+app.register_blueprint(Metrics)
+
+# latency of every request per endpoint, exported by /metrics
+register_request_metrics(app)
+
+# gzip/brotli compression of the responses
+register_compression(app)
 
 if __name__ == '__main__':
+    # start the solver worker processes (and import OR-Tools there) before the first request
+    start_pool()
     app.run(host='0.0.0.0', port=8000)
\ No newline at end of file
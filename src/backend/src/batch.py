@@ -0,0 +1,156 @@
+from .solver.model import MODEL_BACKENDS
+from .solver.school import DEFAULT_TIME_LIMIT, school_from_json, solve_timetable
+from .utils.result_format import expand_result
+from .utils.solver_pool import SolverPool, SolverCrashed, SOLVER_MEMORY_LIMIT_MB, SOLVER_CPU_TIME_FACTOR, CPU_TIME_MARGIN
+from concurrent.futures import wait, FIRST_COMPLETED
+import argparse
+import json
+import os
+import sys
+import time
+
+"""
+This module solves many schools in one run from the command line, without database,
+Flask or HTTP API (e.g. to re-plan all schools at the start of a term).
+
+Every input file holds one school, either as `/Settings/set` payload (see README) or as
+school snapshot (see solver/model.py). The schools are solved in parallel in worker processes,
+each one with its own time limit: `--time-limit`, otherwise `max_time_for_solving` of its settings.
+One JSON line per school is written as soon as it is solved, with the file name, the status, the
+time limit and the result (timetables and statistics, or the problems of an infeasible school).
+
+The workers have the same memory and CPU time limits as the solver pool of the API
+(SOLVER_MEMORY_LIMIT_MB and SOLVER_CPU_TIME_FACTOR, see utils/solver_pool.py). A school that
+crashes its worker process is reported with the status 'error', the other schools keep running.
+
+Usage (from src/backend):
+    python -m src.batch schools/*.json --workers 1 --output timetables.jsonl
+
+Technologies:
+- OR-Tools (cp_model) for constraint solving
+- solver pool of supervised worker processes (see utils/solver_pool.py)
+"""
+
+
+# strategies of the batch mode, the incremental strategy needs the last run of a school
+BATCH_STRATEGIES = ('monolithic', 'two_phase', 'portfolio')
+
+
+def input_files(paths):
+    """
+    Returns:
+        The given files, directories replaced by the JSON files they contain (sorted).
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.endswith(".json")
+            ))
+        else:
+            files.append(path)
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve the timetables of many schools in parallel.")
+    parser.add_argument("inputs", nargs="+", help="school JSON files or directories of them")
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help=f"time limit per school in seconds (default: max_time_for_solving of the school, "
+                             f"otherwise {DEFAULT_TIME_LIMIT})")
+    parser.add_argument("--workers", type=int, default=1, help="search workers per school")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="schools solved at the same time (default: CPU cores / workers)")
+    parser.add_argument("--model", default=MODEL_BACKENDS[0], choices=MODEL_BACKENDS)
+    parser.add_argument("--strategy", default=BATCH_STRATEGIES[0], choices=BATCH_STRATEGIES)
+    parser.add_argument("--symmetry-breaking", action="store_true", help="break symmetries of identical classes")
+    parser.add_argument("--stop-gap", type=float, default=0.0, help="stop within this relative gap of the optimum")
+    parser.add_argument("--stagnation-seconds", type=float, default=0.0,
+                        help="stop when the objective has not improved for this many seconds")
+    parser.add_argument("--alternatives", type=int, default=3, help="timetables per school of the portfolio strategy")
+    parser.add_argument("--min-difference", type=int, default=None,
+                        help="lessons placed differently between two timetables of the portfolio strategy")
+    parser.add_argument("--output", default="-", help="JSON lines file (default: standard output)")
+    args = parser.parse_args(argv)
+
+    workers = max(1, args.workers)
+    jobs = args.jobs or max(1, (os.cpu_count() or 1) // workers)
+    options = {
+        "model_backend": args.model,
+        "strategy": args.strategy,
+        "symmetry_breaking": args.symmetry_breaking,
+        "stop_gap": args.stop_gap,
+        "stagnation_seconds": args.stagnation_seconds,
+        "alternatives": args.alternatives,
+        "min_difference": args.min_difference
+    }
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    pending = input_files(args.inputs)
+    pending.reverse()  # popped from the end, so the schools start in the given order
+    running = {}  # future -> (file, time limit, start)
+    errors = 0
+    started = time.monotonic()
+
+    def write(line):
+        nonlocal errors
+        if line["status"] == "error":
+            errors += 1
+        output.write(json.dumps(line) + "\n")
+        output.flush()
+        # short summary on stderr, the JSON lines stay machine readable
+        result = line.get("result") or {}
+        summary = f'{line["file"]}: {line["status"]}'
+        if "elapsed" in line:
+            summary += f' objective={result.get("statistics", {}).get("objective")} elapsed={line["elapsed"]}s'
+        print(summary, file=sys.stderr)
+
+    # `jobs` worker processes, limited like the solver pool of the API
+    pool = SolverPool(jobs, (SOLVER_MEMORY_LIMIT_MB * 1024 * 1024,))
+    try:
+        while pending or running:
+            # only `jobs` schools are handed to the pool at a time, the files are read when a worker is free
+            while pending and len(running) < jobs:
+                path = pending.pop()
+                try:
+                    with open(path) as file:
+                        school, max_time_for_solving = school_from_json(json.load(file))
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    write({"file": path, "status": "error", "error": f"Invalid school file: {e!r}"})
+                    continue
+
+                time_limit = args.time_limit or max_time_for_solving or DEFAULT_TIME_LIMIT
+                cpu_time_limit = 0
+                if SOLVER_CPU_TIME_FACTOR > 0:
+                    cpu_time_limit = SOLVER_CPU_TIME_FACTOR * time_limit * workers + CPU_TIME_MARGIN
+                future = pool.submit(solve_timetable, school, options, time_limit, workers, None, None, cpu_time_limit)
+                running[future] = (path, time_limit, time.monotonic())
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, time_limit, start = running.pop(future)
+                line = {"file": path, "time_limit": time_limit, "num_workers": workers,
+                        "elapsed": round(time.monotonic() - start, 2)}
+                try:
+                    # the timetables in the full format, like /status/<job_id>
+                    result = expand_result(future.result()["result"])
+                    line.update({"status": result["status"], "result": result})
+                except SolverCrashed as e:
+                    # only this school is lost, its worker process is replaced by the pool
+                    line.update({"status": "error", "error": str(e)})
+                except Exception as e:
+                    line.update({"status": "error", "error": repr(e)})
+                write(line)
+    finally:
+        pool.shutdown(wait=False)
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"{errors} errors, {round(time.monotonic() - started, 1)}s in total", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+from ortools.sat.python import cp_model
+from ortools.sat import cp_model_pb2
+from ..solver.model import MODEL_BACKENDS, build_timetable_model, extract_timetable, unpack_school
+from .generator import generate_school
+import argparse
+import json
+import random
+import sys
+import time
+
+"""
+This module benchmarks the extraction of the timetables from a solution (`extract_timetable()` in
+solver/model.py) against the former implementation, which asked the solver for the value of every
+slot once per class and once per teacher (`extract_per_value()`).
+
+Big schools take minutes to find a first solution, but the extraction only reads values. So the
+model of a generated school is built and filled with a random timetable (`recorded_solution()`),
+which both implementations read through the same evaluation as `CpSolver.Value()`. The results of
+both are compared, the timetables must be identical.
+
+One JSON line per school and model formulation is written with the time of the former extraction,
+of the first extraction (including the extraction plan of the model) and of every further one
+(the provisional timetables of a running job).
+
+Usage (from src/backend):
+    python -m src.benchmarks.extraction --classes 10 20 40 --teachers-per-class 2 --repeat 5
+"""
+
+
+class RecordedSolution:
+    """
+    A solver response without a solve: `Value()` evaluates expressions like `CpSolver.Value()`,
+    `ResponseProto()` returns the response.
+    """
+
+    def __init__(self, response):
+        self.response = response
+
+    def ResponseProto(self):
+        return self.response
+
+    def Value(self, expression):
+        return cp_model.evaluate_linear_expr(expression, self.response)
+
+
+def recorded_solution(school, variables, seed=0, fill_rate=0.8):
+    """
+    Returns:
+        A `RecordedSolution` in which a share `fill_rate` of the slots is occupied by a random subject
+        of the class and a random teacher qualified for it. Only the variables read by the extraction
+        are set consistently, the timetable does not have to satisfy the other constraints.
+    """
+    rng = random.Random(seed)
+    subject_indices, teacher_ids, _, teacher_indices = unpack_school(school)
+    qualified = {
+        subject: [teacher_indices[tid] for tid in teacher_ids if subject in school["teachers_info"][tid]["subjects"]]
+        for subject in school["subjects"]
+    }
+    values = [0] * len(variables["model"].Proto().variables)
+
+    def assign(value, number):
+        # slot variables of the integer formulation, the onehot formulation only has literals
+        if isinstance(value, cp_model.IntVar):
+            values[value.Index()] = number
+
+    for c in school["classes"]:
+        for d in range(len(school["days"])):
+            for h in range(school["hours_per_day"]):
+                subject = rng.choice(list(school["class_subject_hours"][c]))
+                teachers = qualified[subject]
+                if rng.random() >= fill_rate or not teachers:
+                    assign(variables["schedule"][(c, d, h)], -1)
+                    assign(variables["teacher_schedule"][(c, d, h)], -1)
+                    continue
+                s_idx, t_idx = subject_indices[subject], rng.choice(teachers)
+                values[variables["is_occupied"][(c, d, h)].Index()] = 1
+                values[variables["slot_subject"][(c, d, h, s_idx)].Index()] = 1
+                if (c, d, h, t_idx) in variables["slot_teacher"]:
+                    values[variables["slot_teacher"][(c, d, h, t_idx)].Index()] = 1
+                assign(variables["schedule"][(c, d, h)], s_idx)
+                assign(variables["teacher_schedule"][(c, d, h)], t_idx)
+
+    response = cp_model_pb2.CpSolverResponse()
+    response.solution.extend(values)
+    return RecordedSolution(response)
+
+
+def extract_per_value(solver, school, variables):
+    """
+    Former `extract_timetable()`: one `solver.Value()` call per slot for the class timetables and per
+    teacher, slot and class for the teacher timetables. Kept as reference of the benchmark.
+    """
+    classes = school["classes"]
+    subjects = school["subjects"]
+    days = school["days"]
+    hours_per_day = school["hours_per_day"]
+    GLOBAL_BREAK = school["global_break"]
+    schedule = variables["schedule"]
+    teacher_schedule = variables["teacher_schedule"]
+    _, _, teacher_names, _ = unpack_school(school)
+
+    result = {"classes": {}, "teachers": {}}
+
+    for c in classes:
+        class_timetable = {}
+        for d_index, day in enumerate(days):
+            periods = []
+            for h in range(hours_per_day):
+                subj_idx = solver.Value(schedule[(c, d_index, h)])
+                t_idx = solver.Value(teacher_schedule[(c, d_index, h)])
+                if subj_idx >= 0 and t_idx >= 0:
+                    entry = f"{subjects[subj_idx]} ({teacher_names[t_idx]})"
+                else:
+                    entry = "free"
+                periods.append(entry)
+            class_timetable[day] = periods[:GLOBAL_BREAK] + ["free"] + periods[GLOBAL_BREAK:]
+        result["classes"][c] = class_timetable
+
+    for t_idx, teacher in enumerate(teacher_names):
+        daily = {}
+        for d_index, day in enumerate(days):
+            periods = []
+            for h in range(hours_per_day):
+                entry = "free"
+                for c in classes:
+                    subj_idx = solver.Value(schedule[(c, d_index, h)])
+                    # a slot without a subject is free, like in the class view
+                    if solver.Value(teacher_schedule[(c, d_index, h)]) == t_idx and subj_idx >= 0:
+                        entry = f"{subjects[subj_idx]} ({c})"
+                        break
+                periods.append(entry)
+            daily[day] = periods[:GLOBAL_BREAK] + ["free"] + periods[GLOBAL_BREAK:]
+        result["teachers"][teacher] = daily
+
+    return result
+
+
+def best_time(function, repeat):
+    """
+    Returns:
+        (shortest wall time of `repeat` calls of `function()` in seconds, result of the last call).
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - started)
+    return min(times), result
+
+
+def benchmark_extraction(school, model_backend, repeat, seed=0):
+    """
+    Returns:
+        dict with the extraction times of both implementations on a recorded solution of the school.
+    """
+    variables = build_timetable_model(school, model_backend)
+    solution = recorded_solution(school, variables, seed)
+
+    former, expected = best_time(lambda: extract_per_value(solution, school, variables), repeat)
+    # the first extraction of a model computes its extraction plan, later ones reuse it
+    started = time.perf_counter()
+    first_result = extract_timetable(solution, school, variables)
+    first = time.perf_counter() - started
+    repeated, result = best_time(lambda: extract_timetable(solution, school, variables), repeat)
+
+    return {
+        "model": model_backend,
+        "slots": len(variables["schedule"]),
+        "former": round(former, 4),
+        "first": round(first, 4),
+        "repeated": round(repeated, 4),
+        "speedup": round(former / max(repeated, 1e-9), 1),
+        "identical": result == expected and first_result == expected
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the timetable extraction against the former implementation.")
+    parser.add_argument("--classes", type=int, nargs="+", default=[10, 20, 40], help="numbers of classes")
+    parser.add_argument("--teachers-per-class", type=float, default=2.0, help="teachers per class")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_BACKENDS), choices=MODEL_BACKENDS)
+    parser.add_argument("--repeat", type=int, default=3, help="extractions per implementation, the fastest counts")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the school and of the recorded timetable")
+    args = parser.parse_args(argv)
+
+    identical = True
+    for classes in args.classes:
+        teachers = max(1, round(classes * args.teachers_per_class))
+        # every teacher qualified for every subject, so the teacher variables span all teachers
+        school = generate_school(seed=args.seed, classes=classes, teachers=teachers, qualification_density=1.0)
+        for model_backend in args.models:
+            run = {"classes": classes, "teachers": teachers}
+            run.update(benchmark_extraction(school, model_backend, args.repeat, args.seed))
+            identical = identical and run["identical"]
+            print(json.dumps(run), flush=True)
+            print(
+                f'classes={classes} teachers={teachers} model={model_backend}: former={run["former"]}s '
+                f'first={run["first"]}s repeated={run["repeated"]}s identical={run["identical"]}',
+                file=sys.stderr
+            )
+    return 0 if identical else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+from ..solver.model import DAYS
+import math
+import random
+
+"""
+This module generates synthetic schools for the solver benchmarks.
+
+The schools have the same plain data format the API builds from the database (see solver/model.py),
+so they can be passed to the model builder directly. The same seed and parameters always give the
+same school, so benchmark runs can be repeated and compared between versions and model formulations.
+
+Functionality:
+- `generate_school()`:
+  Creates a school with the given number of classes, teachers and subjects, a random share of
+  qualified (teacher, subject) pairs, a number of teaching periods per day and parallel limits.
+  Every class has every subject, the weekly hours fill a share of the available slots.
+  The `max_hours` of the teachers are sized from the generated demand, so the static feasibility
+  analysis (see utils/feasibility.py) finds no problems with the default parameters.
+"""
+
+
+def generate_school(seed=0, classes=10, teachers=None, subjects=6, qualification_density=0.3, hours_per_day=6,
+                    parallel_limits=1, fill_rate=0.65, max_hours_per_day=2, capacity_slack=1.25):
+    """
+    Args:
+        seed (int): Seed of the random generator.
+        classes (int): Number of classes.
+        teachers (int, optional): Number of teachers (default: 1.5 per class).
+        subjects (int): Number of subjects, every class has all of them.
+        qualification_density (float): Probability that a teacher is qualified for a subject
+            (every teacher has at least one subject and every subject at least one teacher).
+        hours_per_day (int): Teaching periods per day (without the break).
+        parallel_limits (int): Number of subjects with a limit of parallel lessons (e.g. gym, labs).
+        fill_rate (float): Share of the slots of a week that every class spends in lessons.
+        max_hours_per_day (int): Maximum hours of one subject per day in a class.
+        capacity_slack (float): Reserve of the teachers' `max_hours` over the hours a feasible teacher
+            assignment gives them (1.0: no reserve).
+
+    Returns:
+        School data dict as expected by `build_timetable_model()`.
+
+    Raises:
+        ValueError: If the teachers together have fewer slots than the classes have lessons.
+    """
+    rng = random.Random(seed)
+    teachers = teachers if teachers is not None else max(1, round(classes * 1.5))
+    days = list(DAYS)
+    slots = len(days) * hours_per_day
+
+    class_names = [f"C{i + 1:02d}" for i in range(classes)]
+    subject_names = [f"S{i + 1:02d}" for i in range(subjects)]
+
+    # Curriculum: every subject at least one hour, the remaining hours at random,
+    # but never more than the subject can get with max_hours_per_day
+    lessons = min(round(slots * fill_rate), subjects * max_hours_per_day * len(days))
+    class_subject_hours = {}
+    for c in class_names:
+        hours = {subject: 1 for subject in subject_names}
+        open_subjects = [subject for subject in subject_names if hours[subject] < max_hours_per_day * len(days)]
+        for _ in range(lessons - subjects):
+            subject = rng.choice(open_subjects)
+            hours[subject] += 1
+            if hours[subject] >= max_hours_per_day * len(days):
+                open_subjects.remove(subject)
+        class_subject_hours[c] = hours
+
+    # Qualifications: random pairs, then every subject without a teacher gets one
+    qualified = {tid: [s for s in subject_names if rng.random() < qualification_density] for tid in range(1, teachers + 1)}
+    for tid, subjects_of_teacher in qualified.items():
+        if not subjects_of_teacher:
+            subjects_of_teacher.append(rng.choice(subject_names))
+    for subject in subject_names:
+        if not any(subject in subjects_of_teacher for subjects_of_teacher in qualified.values()):
+            qualified[rng.randint(1, teachers)].append(subject)
+
+    # Workload: every (class, subject) goes to the least loaded qualified teacher, biggest first, and
+    # every teacher can teach the hours assigned that way with `capacity_slack` reserve. A subject whose
+    # teachers are full qualifies one more teacher, so every generated school has a teacher assignment.
+    load = {tid: 0 for tid in qualified}
+    pairs = sorted(
+        ((hours, c, subject) for c, subject_hours in class_subject_hours.items() for subject, hours in subject_hours.items()),
+        key=lambda pair: (-pair[0], pair[1], pair[2])
+    )
+    for hours, c, subject in pairs:
+        options = [tid for tid in qualified if subject in qualified[tid] and load[tid] + hours <= slots]
+        if not options:
+            tid = min((tid for tid in qualified if load[tid] + hours <= slots), key=lambda tid: (load[tid], tid), default=None)
+            if tid is None:
+                raise ValueError(f"{teachers} teachers cannot teach the {lessons * classes} lessons of {classes} classes.")
+            qualified[tid].append(subject)
+            options = [tid]
+        load[min(options, key=lambda tid: (load[tid], tid))] += hours
+
+    teachers_info = {
+        tid: {
+            "name": f"T{tid:03d}",
+            "max_hours": min(slots, max(1, math.ceil(load[tid] * capacity_slack))),
+            "subjects": sorted(subjects_of_teacher)
+        }
+        for tid, subjects_of_teacher in qualified.items()
+    }
+
+    # Parallel limits: slightly above the average number of parallel lessons of the subject
+    restricted_parallel_subjects = []
+    for subject in rng.sample(subject_names, min(parallel_limits, subjects)):
+        subject_demand = sum(hours[subject] for hours in class_subject_hours.values())
+        restricted_parallel_subjects.append((subject, math.ceil(subject_demand / slots) + 1))
+
+    return {
+        "classes": class_names,
+        "subjects": subject_names,
+        "days": days,
+        "hours_per_day": hours_per_day,
+        "teachers_info": teachers_info,
+        "class_subject_hours": class_subject_hours,
+        "restricted_parallel_subjects": restricted_parallel_subjects,
+        "prefer_block_subjects": {rng.choice(subject_names): 3},
+        "prefer_early_hours": True,
+        "allow_block_scheduling": True,
+        "max_hours_per_day": max_hours_per_day,
+        "global_break": hours_per_day // 2,
+        "weight_block_scheduling": 2,
+        "weight_time_of_hours": 1
+    }
@@ -0,0 +1,132 @@
+from ortools.sat.python import cp_model
+from ..solver.model import MODEL_BACKENDS, build_timetable_model
+from ..solver.worker import SolveProgress
+from ..solver.school import school_problems
+from .generator import generate_school
+import argparse
+import json
+import sys
+import time
+
+"""
+This module runs the solver benchmarks on synthetic schools (see benchmarks/generator.py),
+without database, Flask session or solver pool.
+
+Every instance is built with `build_timetable_model()` and solved once per model formulation.
+One JSON line per run is written with
+- the instance parameters and the seed,
+- the model build time and the variables, constraints and build time per constraint group,
+- the time to the first feasible timetable, the number of solutions, objective, bound and status.
+
+The generated schools must pass the static feasibility analysis (see utils/feasibility.py), a school
+with problems stops the run, as its results would not measure the solver.
+
+Runs are repeatable: the schools only depend on the seed, and with `--deterministic-time` the
+solver stops after a fixed amount of deterministic work instead of wall time (use one worker).
+
+Usage (from src/backend):
+    python -m src.benchmarks.run --classes 5 10 20 --seeds 1 2 3 --models integer onehot --output results.jsonl
+"""
+
+
+def benchmark_school(school, model_backend, max_time_in_seconds, num_workers, deterministic_time=None):
+    """
+    Builds and solves the model of one school.
+
+    Returns:
+        dict with the build time, the size of the model and its constraint groups and the key figures of the solve.
+    """
+    started = time.perf_counter()
+    variables = build_timetable_model(school, model_backend)
+    build_time = time.perf_counter() - started
+
+    model = variables["model"]
+    proto = model.Proto()
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = max_time_in_seconds
+    solver.parameters.num_search_workers = num_workers
+    if deterministic_time:
+        solver.parameters.max_deterministic_time = deterministic_time
+
+    progress = SolveProgress()
+    status = solver.Solve(model, progress)
+
+    return {
+        "model": model_backend,
+        "build_time": round(build_time, 4),
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+        "groups": variables["groups"],
+        "status": solver.StatusName(status),
+        "objective": solver.ObjectiveValue() if status in [cp_model.OPTIMAL, cp_model.FEASIBLE] else None,
+        "best_bound": solver.BestObjectiveBound(),
+        "solutions": progress.solutions,
+        "first_solution_time": progress.first_solution_time,
+        "wall_time": solver.WallTime(),
+        "deterministic_time": solver.ResponseProto().deterministic_time
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the timetable model on synthetic schools.")
+    parser.add_argument("--classes", type=int, nargs="+", default=[5, 10, 20], help="numbers of classes")
+    parser.add_argument("--teachers-per-class", type=float, default=1.5, help="teachers per class")
+    parser.add_argument("--subjects", type=int, default=6, help="number of subjects")
+    parser.add_argument("--density", type=float, default=0.3, help="qualification density of the teachers")
+    parser.add_argument("--hours-per-day", type=int, default=6, help="teaching periods per day")
+    parser.add_argument("--fill-rate", type=float, default=0.65, help="share of the slots every class is taught")
+    parser.add_argument("--parallel-limits", type=int, default=1, help="subjects with a parallel limit")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1], help="seeds of the generated schools")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_BACKENDS), choices=MODEL_BACKENDS)
+    parser.add_argument("--time-limit", type=float, default=30.0, help="time limit per solve in seconds")
+    parser.add_argument("--workers", type=int, default=4, help="search workers per solve (one worker rarely finds a first timetable)")
+    parser.add_argument("--deterministic-time", type=float, default=None,
+                        help="deterministic time limit per solve, for repeatable results")
+    parser.add_argument("--output", default="-", help="JSON lines file (default: standard output)")
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        for classes in args.classes:
+            for seed in args.seeds:
+                parameters = {
+                    "seed": seed,
+                    "classes": classes,
+                    "teachers": max(1, round(classes * args.teachers_per_class)),
+                    "subjects": args.subjects,
+                    "qualification_density": args.density,
+                    "hours_per_day": args.hours_per_day,
+                    "parallel_limits": args.parallel_limits,
+                    "fill_rate": args.fill_rate
+                }
+                school = generate_school(**parameters)
+                problems = school_problems(school)
+                if problems:
+                    parser.error(
+                        f"classes={classes} seed={seed} generates an infeasible school: "
+                        + ", ".join(problem["type"] for problem in problems)
+                    )
+
+                for model_backend in args.models:
+                    run = {"instance": parameters}
+                    run.update(benchmark_school(
+                        school, model_backend, args.time_limit, args.workers, args.deterministic_time
+                    ))
+                    output.write(json.dumps(run) + "\n")
+                    output.flush()
+
+                    # short summary on stderr, the JSON lines stay machine readable
+                    print(
+                        f'classes={classes} seed={seed} model={model_backend}: {run["status"]} '
+                        f'objective={run["objective"]} build={run["build_time"]}s '
+                        f'first={run["first_solution_time"]} wall={round(run["wall_time"], 2)}s',
+                        file=sys.stderr
+                    )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, LargeBinary, Text
 from sqlalchemy.orm import declarative_base
 import os
 
@@ -18,6 +18,7 @@ Functionality:
   - Classes
   - SubjectParallelLimit
   - PreferBlockSubjects
+  - Jobs (durable job store of the timetable computation, see utils/job_store.py)
 
 - At the end of the file, the engine is created using environment variables,
   and all defined tables are created in the target database.
@@ -102,6 +103,16 @@ class PreferBlockSubjects(Base):
     subject_name = Column(String(128), nullable=False)
     weight = Column(Integer, nullable=False)
 
+# Status and compressed result of timetable computation jobs (used if JOB_STORE=mariadb)
+class Jobs(Base):
+    __tablename__ = 'Jobs'
+    job_id = Column(String(36), primary_key=True)
+    Uid = Column(Integer, nullable=True)
+    status = Column(String(16), nullable=False)
+    result = Column(LargeBinary(length=2**32 - 1), nullable=True)  # zlib compressed JSON (LONGBLOB)
+    progress = Column(Text, nullable=True)  # JSON of the last progress report of the solver
+    updated_at = Column(DateTime, nullable=False, index=True)
+
 # Create DB engine using URI from environment
 engine = create_engine(f"mysql+pymysql://{os.environ.get('DB_USER')}:{os.environ.get('DB_PASSWORD')}@{os.environ.get('DB_HOST')}/{os.environ.get('DB_NAME')}")
 
@@ -0,0 +1,142 @@
+from ortools.sat.python import cp_model
+from .model import unpack_school
+
+"""
+This module implements warm starts of the timetable model from an earlier solution.
+
+Users usually change a single teacher or class allocation and generate again. The last
+timetable is kept as a snapshot by names (class, subject and teacher ID instead of model
+indices), so it can be mapped onto the variables of the next model even if the data changed.
+
+Functionality:
+- `solution_snapshot()`:
+  Stores the solved timetable as subject and teacher per (class, day, hour) plus the
+  constant teacher of every (class, subject) pair.
+
+- `add_solution_hints()`:
+  Feeds a snapshot to `model.AddHint` for all variables whose entities still exist
+  in the current school data.
+
+- `teacher_hints()`:
+  Translates the constant teachers of a snapshot into teacher indices of the current data
+  (used as hints for the teacher assignment of the two-phase solve).
+
+Snapshot format (JSON compatible):
+    {
+        "slots": [[class, day index, hour, subject or None, Tid or None], ...],
+        "constant_teacher": [[class, subject, Tid], ...]
+    }
+"""
+
+
+def solution_snapshot(solver, school, variables):
+    """
+    Expects a solver with a feasible solution, the school data and the variables of
+    `build_timetable_model()`.
+
+    Returns:
+        The snapshot of the solution (see module docstring).
+    """
+    subjects = school["subjects"]
+    _, teacher_ids, _, _ = unpack_school(school)
+
+    slots = []
+    constant_teacher = {}
+    for (c, d, h), subject_var in variables["schedule"].items():
+        subj_idx = solver.Value(subject_var)
+        t_idx = solver.Value(variables["teacher_schedule"][(c, d, h)])
+        if subj_idx >= 0 and t_idx >= 0:
+            slots.append([c, d, h, subjects[subj_idx], teacher_ids[t_idx]])
+            constant_teacher[(c, subjects[subj_idx])] = teacher_ids[t_idx]
+        else:
+            slots.append([c, d, h, None, None])
+
+    # subjects without lessons keep the teacher chosen by the model
+    for (c, subject), teacher_var in variables["constant_teacher"].items():
+        constant_teacher.setdefault((c, subject), teacher_ids[solver.Value(teacher_var)])
+
+    return {
+        "slots": slots,
+        "constant_teacher": [[c, subject, tid] for (c, subject), tid in constant_teacher.items()]
+    }
+
+
+def teacher_hints(school, snapshot):
+    """
+    Returns:
+        {(class, subject): teacher index} for all constant teachers of the snapshot whose
+        class, subject and teacher still exist and where the teacher is still qualified.
+    """
+    _, _, _, teacher_indices = unpack_school(school)
+    class_subject_hours = school["class_subject_hours"]
+
+    hints = {}
+    for c, subject, tid in snapshot["constant_teacher"]:
+        if subject in class_subject_hours.get(c, {}) and tid in teacher_indices \
+                and subject in school["teachers_info"][tid]["subjects"]:
+            hints[(c, subject)] = teacher_indices[tid]
+    return hints
+
+
+def add_solution_hints(school, variables, snapshot):
+    """
+    Adds hints for all model variables that can be mapped onto the snapshot.
+    Slots of classes, subjects or teachers that no longer exist are left without hints.
+
+    Returns:
+        The number of hinted variables.
+    """
+    model = variables["model"]
+    subject_indices, _, _, teacher_indices = unpack_school(school)
+    days = school["days"]
+    hours_per_day = school["hours_per_day"]
+    class_subject_hours = school["class_subject_hours"]
+    hinted = set()
+
+    def hint(var, value):
+        # only real variables can be hinted (the one-hot formulation keeps some values as expressions)
+        if isinstance(var, cp_model.IntVar) and var.Index() not in hinted:
+            model.AddHint(var, value)
+            hinted.add(var.Index())
+
+    def hint_teacher(c, d, h, t_idx):
+        # slot_teacher only exists for the candidate teachers of the class (empty with fixed teachers)
+        for other in teacher_indices.values():
+            if (c, d, h, other) in variables["slot_teacher"]:
+                hint(variables["slot_teacher"][(c, d, h, other)], int(other == t_idx))
+        if variables["slot_teacher"]:
+            hint(variables["teacher_schedule"][(c, d, h)], t_idx)
+
+    for c, d, h, subject, tid in snapshot["slots"]:
+        if c not in class_subject_hours or d >= len(days) or h >= hours_per_day:
+            continue
+
+        # free period in the old timetable
+        if subject is None:
+            hint(variables["is_occupied"][(c, d, h)], 0)
+            hint(variables["schedule"][(c, d, h)], -1)
+            for s in class_subject_hours[c]:
+                hint(variables["slot_subject"][(c, d, h, subject_indices[s])], 0)
+            hint_teacher(c, d, h, -1)
+            continue
+
+        # lesson of a subject that is no longer part of the curriculum
+        if subject not in class_subject_hours[c]:
+            continue
+
+        subj_idx = subject_indices[subject]
+        hint(variables["is_occupied"][(c, d, h)], 1)
+        hint(variables["schedule"][(c, d, h)], subj_idx)
+        for s in class_subject_hours[c]:
+            hint(variables["slot_subject"][(c, d, h, subject_indices[s])], int(s == subject))
+
+        # teacher of the slot, only if the model chooses teachers and the teacher can still teach it
+        if tid in teacher_indices and (c, d, h, teacher_indices[tid]) in variables["slot_teacher"] \
+                and subject in school["teachers_info"][tid]["subjects"]:
+            hint_teacher(c, d, h, teacher_indices[tid])
+
+    for (c, subject), t_idx in teacher_hints(school, snapshot).items():
+        if (c, subject) in variables["constant_teacher"]:
+            hint(variables["constant_teacher"][(c, subject)], t_idx)
+
+    return len(hinted)
@@ -0,0 +1,174 @@
+from ortools.sat.python import cp_model
+from .model import unpack_school, MODEL_BACKENDS
+from .model_cache import build_cached_model
+from .hints import add_solution_hints
+from .instrumentation import measure, instrument, record_solve
+import time
+
+"""
+This module implements the incremental re-solve of a timetable.
+
+When a single teacher or class allocation changes, most of the last timetable is still valid.
+Instead of searching the whole timetable again, the classes that are not touched by the change
+keep their slots and teachers, and only the affected neighbourhood is re-optimized.
+
+Functionality:
+- `affected_classes()`:
+  Diffs the current school data against the data of the last successful run and returns the
+  classes that have to be re-optimized (or None if a setting changed and everything is affected).
+
+- `widen_neighbourhood()`:
+  Adds all classes that share a teacher with the current neighbourhood.
+
+- `freeze_classes()`:
+  Fixes the slots and teachers of the given classes to the values of the last timetable.
+
+- `solve_incremental()`:
+  Solves the neighbourhood with all other classes frozen and widens it until a solution is
+  found (in the worst case until all classes are free, which is the full solve).
+
+Technologies:
+- OR-Tools (cp_model) for constraint solving
+"""
+
+
+# school data that affects every class; if any of it changed, the whole timetable is re-solved
+GLOBAL_KEYS = (
+    "days", "hours_per_day", "global_break", "max_hours_per_day", "restricted_parallel_subjects",
+    "prefer_block_subjects", "prefer_early_hours", "allow_block_scheduling",
+    "weight_block_scheduling", "weight_time_of_hours"
+)
+
+
+def teachers_of_classes(snapshot):
+    """
+    Returns:
+        {class: set of Tids} that teach the class in the snapshot.
+    """
+    teachers = {}
+    for c, _, tid in snapshot["constant_teacher"]:
+        teachers.setdefault(c, set()).add(tid)
+    return teachers
+
+
+def affected_classes(previous_school, school, snapshot):
+    """
+    Expects the school data of the last successful run, the current school data and the
+    snapshot of the last timetable (see solver/hints.py).
+
+    Returns:
+        The set of classes that have to be re-optimized, or None if a global setting changed.
+        A class is affected if it is new, its curriculum changed or one of its teachers was
+        removed or changed their subjects or max_hours.
+    """
+    if any(previous_school[key] != school[key] for key in GLOBAL_KEYS):
+        return None
+
+    old_teachers = previous_school["teachers_info"]
+    new_teachers = school["teachers_info"]
+    changed_teachers = {
+        tid for tid, info in old_teachers.items()
+        if tid not in new_teachers
+        or set(info["subjects"]) != set(new_teachers[tid]["subjects"])
+        or info["max_hours"] != new_teachers[tid]["max_hours"]
+    }
+
+    teachers = teachers_of_classes(snapshot)
+    affected = set()
+    for c in school["classes"]:
+        if previous_school["class_subject_hours"].get(c) != school["class_subject_hours"][c]:
+            affected.add(c)
+        elif teachers.get(c, set()) & changed_teachers:
+            affected.add(c)
+    return affected
+
+
+def widen_neighbourhood(school, snapshot, free_classes):
+    """
+    Returns:
+        The free classes plus all classes that share a teacher with one of them in the snapshot.
+        If that adds nothing, all classes are returned.
+    """
+    teachers = teachers_of_classes(snapshot)
+    involved = set().union(*(teachers.get(c, set()) for c in free_classes))
+    widened = set(free_classes) | {c for c in school["classes"] if teachers.get(c, set()) & involved}
+    if widened == set(free_classes):
+        return set(school["classes"])
+    return widened
+
+
+def freeze_classes(school, variables, snapshot, frozen_classes):
+    """
+    Fixes the lessons and teachers of the frozen classes to the snapshot.
+    Expects that the frozen classes are not affected by any change (see `affected_classes()`).
+    """
+    model = variables["model"]
+    subject_indices, _, _, teacher_indices = unpack_school(school)
+    class_subject_hours = school["class_subject_hours"]
+
+    for c, d, h, subject, _ in snapshot["slots"]:
+        if c not in frozen_classes:
+            continue
+        model.Add(variables["is_occupied"][(c, d, h)] == int(subject is not None))
+        for s in class_subject_hours[c]:
+            model.Add(variables["slot_subject"][(c, d, h, subject_indices[s])] == int(s == subject))
+
+    # the teacher of every slot follows from the constant teacher of its subject
+    for c, subject, tid in snapshot["constant_teacher"]:
+        if c in frozen_classes:
+            model.Add(variables["constant_teacher"][(c, subject)] == teacher_indices[tid])
+
+
+def solve_incremental(school, previous_school, snapshot, model_backend=MODEL_BACKENDS[0],
+                      max_time_in_seconds=60.0, num_workers=3, solution_callback=None, relative_gap_limit=0.0):
+    """
+    Re-optimizes only the classes affected by the changes since the last run.
+
+    Args:
+        school (dict): Current school data snapshot (see solver/model.py).
+        previous_school (dict): School data of the last successful run.
+        snapshot (dict): Timetable of the last successful run (see solver/hints.py).
+        model_backend (str): Model formulation, one of MODEL_BACKENDS.
+        max_time_in_seconds (float): Time limit for all rounds together.
+        num_workers (int): Number of search workers.
+        solution_callback (cp_model.CpSolverSolutionCallback, optional): Passed to the solves.
+        relative_gap_limit (float): Every solve stops once within this relative gap of its optimum (0 to disable).
+
+    Returns:
+        (solver, status, variables, rounds, free_classes) of the last solve, where free_classes
+        is the number of classes that were re-optimized.
+    """
+    start = time.monotonic()
+    free_classes = affected_classes(previous_school, school, snapshot)
+    if free_classes is None:
+        free_classes = set(school["classes"])
+
+    rounds = 0
+    while True:
+        rounds += 1
+        remaining = max_time_in_seconds - (time.monotonic() - start)
+        final = free_classes == set(school["classes"])
+
+        # the base model is the same in every round, only the frozen classes differ
+        with measure(solution_callback, "model_build"):
+            variables, _ = build_cached_model(school, model_backend)
+            model = variables["model"]
+            freeze_classes(school, variables, snapshot, set(school["classes"]) - free_classes)
+            add_solution_hints(school, variables, snapshot)
+        if hasattr(solution_callback, "track"):
+            # the progress callback reports provisional timetables of this model (see solver/worker.py)
+            solution_callback.track(school, variables)
+
+        solver = cp_model.CpSolver()
+        # a neighbourhood gets half of the remaining time, so there is time left to widen it
+        solver.parameters.max_time_in_seconds = max(1.0, remaining if final else remaining / 2)
+        solver.parameters.num_search_workers = num_workers
+        solver.parameters.relative_gap_limit = relative_gap_limit
+        instrument(solver)
+        status = solver.Solve(model, solution_callback)
+        record_solve(solution_callback, solver)
+
+        if final or status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+            return solver, status, variables, rounds, len(free_classes)
+
+        free_classes = widen_neighbourhood(school, snapshot, free_classes)
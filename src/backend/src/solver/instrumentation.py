@@ -0,0 +1,164 @@
+from contextlib import contextmanager
+import os
+import re
+import time
+
+"""
+This module measures where the time of a solve goes.
+
+The phases of a job are recorded on a recorder object, in the worker the solution callback of the
+job (see `SolveProgress` in solver/worker.py), which every strategy receives anyway. Objects without
+`timings` (e.g. no callback) are ignored, so the strategies can be used without instrumentation.
+
+Functionality:
+- `measure()`:
+  Context manager adding the time of a block to one phase (e.g. 'model_build') of the recorder.
+
+- `instrument()`:
+  With SOLVER_SEARCH_LOG, lets CP-SAT write its search log into the response (not to stdout),
+  the presolve and search times are read from it after the solve. Without it, the solver is left alone.
+
+- `record_solve()`:
+  Adds the solve time (the `wall_time` of the response, split into presolve and search if the search
+  log was written) and the response statistics (branches, conflicts, wall and deterministic time) of
+  a finished solve to the recorder. Strategies with several solves (rounds, parallel searches) report
+  the sum of all solves.
+
+- `recording()`:
+  The timings and CP-SAT statistics of a recorder for the job result ('timings' and 'solver_response').
+
+- `model_size()`:
+  Variables and constraints of a model and of its constraint groups (see `group_recorder()` in solver/model.py).
+
+Phases (seconds):
+- queue, load, feasibility: waiting in the scheduler, loading from the database and the static
+  feasibility analysis (recorded by the API, see api_endpoints/AsyncCompute.py)
+- model_build: building the model or loading it from the model cache, hints and extra constraints
+- solve: the CP-SAT solve, presolve and search (without SOLVER_SEARCH_LOG)
+- presolve: CP-SAT presolve and loading of the presolved model, up to the start of the search (with SOLVER_SEARCH_LOG)
+- search: the search itself, up to the end of the solve (with SOLVER_SEARCH_LOG)
+- extraction: reading the timetables of the solution
+
+Configuration (environment variables):
+- SOLVER_SEARCH_LOG: 1 writes the CP-SAT search log of every solve to tell presolve and search
+  time apart, it costs time on large models (default: 0)
+
+Technologies:
+- OR-Tools (CP-SAT search log and response statistics)
+"""
+
+
+SOLVER_SEARCH_LOG = int(os.environ.get("SOLVER_SEARCH_LOG", 0))
+
+# start of the presolve and of the search in the CP-SAT log
+PRESOLVE_START = re.compile(r"^Starting presolve at ([0-9.]+)s", re.MULTILINE)
+SEARCH_START = re.compile(r"^Starting (?:sequential )?search at ([0-9.]+)s", re.MULTILINE)
+
+
+def new_recording():
+    """
+    Returns:
+        (timings, solver_statistics) dicts as kept by a recorder, all values zero.
+    """
+    solve_phases = ("presolve", "search") if SOLVER_SEARCH_LOG else ("solve",)
+    timings = {"model_build": 0.0, **{phase: 0.0 for phase in solve_phases}, "extraction": 0.0}
+    solver_statistics = {"solves": 0, "branches": 0, "conflicts": 0, "wall_time": 0.0, "deterministic_time": 0.0}
+    return timings, solver_statistics
+
+
+@contextmanager
+def measure(recorder, phase):
+    """
+    Adds the wall time of the with-block to `phase` of `recorder.timings` (nothing if the recorder has none).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = getattr(recorder, "timings", None)
+        if timings is not None:
+            timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - started
+
+
+def instrument(solver):
+    """
+    Writes the search log of `solver` into its response instead of stdout (read by `record_solve()`),
+    only with SOLVER_SEARCH_LOG.
+    """
+    if not SOLVER_SEARCH_LOG:
+        return
+    solver.parameters.log_search_progress = True
+    solver.parameters.log_to_stdout = False
+    solver.parameters.log_to_response = True
+
+
+def solve_phases(solver):
+    """
+    Returns:
+        (presolve, search) seconds of the last solve of `solver`, (None, None) without a search log
+        (e.g. if the presolve already proved the model infeasible).
+    """
+    response = solver.ResponseProto()
+    presolve_start = PRESOLVE_START.search(response.solve_log)
+    search_start = SEARCH_START.search(response.solve_log)
+    if not presolve_start or not search_start:
+        return None, None
+    search_start = float(search_start.group(1))
+    return search_start - float(presolve_start.group(1)), max(0.0, response.wall_time - search_start)
+
+
+def record_solve(recorder, solver):
+    """
+    Adds the phases and the response statistics of the last solve of `solver` to the recorder
+    (nothing if the recorder has no `timings`).
+    """
+    timings = getattr(recorder, "timings", None)
+    if timings is None:
+        return
+
+    response = solver.ResponseProto()
+    if not response.solve_log:
+        # without search log only the time of the whole solve is known
+        timings["solve"] = timings.get("solve", 0.0) + response.wall_time
+    else:
+        presolve, search = solve_phases(solver)
+        if presolve is None:
+            # no search was started, the whole solve counts as presolve
+            presolve, search = response.wall_time, 0.0
+        timings["presolve"] = timings.get("presolve", 0.0) + presolve
+        timings["search"] = timings.get("search", 0.0) + search
+
+    statistics = recorder.solver_statistics
+    statistics["solves"] += 1
+    statistics["branches"] += response.num_branches
+    statistics["conflicts"] += response.num_conflicts
+    statistics["wall_time"] += response.wall_time
+    statistics["deterministic_time"] += response.deterministic_time
+
+
+def recording(recorder):
+    """
+    Returns:
+        {"timings": seconds per phase, "solver_response": summed CP-SAT statistics} of the recorder, rounded.
+    """
+    return {
+        "timings": {phase: round(seconds, 4) for phase, seconds in recorder.timings.items()},
+        "solver_response": {
+            key: round(value, 4) if isinstance(value, float) else value
+            for key, value in recorder.solver_statistics.items()
+        }
+    }
+
+
+def model_size(variables):
+    """
+    Returns:
+        {"variables", "constraints", "groups"} of the model in `variables` (see `build_timetable_model()`),
+        the groups as recorded when the model was built (extra constraints of the strategies are not in them).
+    """
+    proto = variables["model"].Proto()
+    return {
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+        "groups": variables.get("groups")
+    }
@@ -0,0 +1,788 @@
+from ortools.sat.python import cp_model
+from .symmetry import add_symmetry_breaking
+import time
+
+"""
+This module builds the CP-SAT model for the school timetable and turns a solved
+model back into timetables. It works on a plain data snapshot of the school and
+does not access the database.
+
+Functionality:
+- `build_timetable_model()`:
+  Creates the constraint optimization model (hard constraints, soft preferences and
+  objective) for a school and returns the model together with its variables.
+
+- `group_recorder()`:
+  Records the size and build time of every constraint group of the model (returned as 'groups').
+
+- `extract_timetable()`:
+  Reads the values of a solved model in one pass over the slots and builds the timetable
+  for each class and teacher.
+
+- `extract_compact()`:
+  The same timetables in the compact format of the job store (see utils/result_format.py), built from
+  the subject and teacher indices of the slots. Used for the results and the provisional timetables of jobs.
+
+School data:
+- The school is passed as a dict with the keys
+  classes, subjects, days, hours_per_day (teaching periods without the break),
+  teachers_info ({Tid: {"name", "max_hours", "subjects"}}), class_subject_hours
+  ({class_name: {subject: hours_per_week}}), restricted_parallel_subjects
+  ([(subject, max_parallel)]), prefer_block_subjects ({subject: weight}) and the settings
+  prefer_early_hours, allow_block_scheduling, max_hours_per_day, global_break (zero-based),
+  weight_block_scheduling and weight_time_of_hours.
+
+Model formulations (`MODEL_BACKENDS`):
+- integer: every slot is an integer subject variable with reified subject literals,
+- onehot: every slot is a set of Boolean subject literals tied together by an exactly-one constraint.
+  Both share the same constraints and objective, so their results can be compared directly.
+
+Technologies:
+- OR-Tools (cp_model) for constraint solving
+"""
+
+
+# available formulations of the timetable model, the first one is the default
+MODEL_BACKENDS = ('integer', 'onehot')
+
+# school days of a week
+DAYS = ['Mo', 'Tu', 'We', 'Th', 'Fr']
+
+
+def unpack_school(school):
+    """
+    Expects the school data dict (see module docstring).
+
+    Returns:
+        The derived index structures used by the model and the extraction:
+        subject_indices ({subject: index}), teacher_ids (sorted Tids),
+        teacher_names (names in index order) and teacher_indices ({Tid: index}).
+    """
+    subject_indices = {subject: i for i, subject in enumerate(school["subjects"])}
+    teacher_ids   = sorted(school["teachers_info"].keys())                                # e.g. [1,2,3,4]
+    teacher_names = [school["teachers_info"][tid]["name"] for tid in teacher_ids]         # ["Maier", …]
+    teacher_indices = {tid: i for i, tid in enumerate(teacher_ids)}                       # {1:0, 2:1, …}
+    return subject_indices, teacher_ids, teacher_names, teacher_indices
+
+
+def group_recorder(model, groups):
+    """
+    Returns:
+        mark(name): stores the variables and constraints added to `model` and the time passed since
+        the previous mark as constraint group `name` in `groups`.
+    """
+    proto = model.Proto()
+    last = {"variables": 0, "constraints": 0, "time": time.perf_counter()}
+
+    def mark(name):
+        now = time.perf_counter()
+        variables, constraints = len(proto.variables), len(proto.constraints)
+        groups[name] = {
+            "variables": variables - last["variables"],
+            "constraints": constraints - last["constraints"],
+            "build_time": round(now - last["time"], 4)
+        }
+        last.update(variables=variables, constraints=constraints, time=now)
+
+    return mark
+
+
+def build_timetable_model(school, model_backend=MODEL_BACKENDS[0], fixed_teachers=None, symmetry_breaking=False):
+    """
+    Builds the CP-SAT model of the timetable.
+
+    Args:
+        school (dict): School data snapshot (see module docstring).
+        model_backend (str): Model formulation, one of MODEL_BACKENDS.
+        fixed_teachers (dict, optional): {(class, subject): teacher index} if the teachers are already
+            assigned. The model then only places the lessons in time slots.
+        symmetry_breaking (bool): Add symmetry-breaking constraints for identical classes and teachers
+            (see solver/symmetry.py). Ignored with fixed teachers.
+
+    Returns:
+        dict with the model and its variables:
+        - 'model': the CpModel
+        - 'schedule': (class, day, hour) -> subject index or -1
+        - 'teacher_schedule': (class, day, hour) -> teacher index or -1
+        - 'is_occupied', 'slot_subject', 'slot_teacher', 'constant_teacher'
+        - 'teacher_clash_free': teacher index -> literal guarding the clash constraints of the teacher
+          (only with fixed teachers)
+        - 'symmetry': number of symmetric class and teacher groups that were broken (None if not used)
+        - 'groups': {constraint group: {"variables", "constraints", "build_time"}} added by each part of the model
+    """
+    classes = school["classes"]
+    subjects = school["subjects"]
+    days = school["days"]
+    hours_per_day = school["hours_per_day"]
+    teachers_info = school["teachers_info"]
+    class_subject_hours = school["class_subject_hours"]
+    restricted_parallel_subjects = school["restricted_parallel_subjects"]
+    PREFER_BLOCK_SUBJECTS = school["prefer_block_subjects"]
+
+    # activate certain pats of the code based on the settings
+    PREFER_EARLY_HOURS = school["prefer_early_hours"]
+    ALLOW_BLOCK_SCHEDULING = school["allow_block_scheduling"]
+
+    # scheduling parameters
+    MAX_HOURS_PER_DAY = school["max_hours_per_day"]
+    GLOBAL_BREAK = school["global_break"]
+
+    # weights for the soft restrictions
+    WEIGHT_BLOCK_SCHEDULING = school["weight_block_scheduling"]
+    WEIGHT_TIME_OF_HOURS = school["weight_time_of_hours"]
+
+    subject_indices, teacher_ids, teacher_names, teacher_indices = unpack_school(school)
+
+    # Initialize the model
+
+    model = cp_model.CpModel()  # Create a new CP model
+
+    # variables, constraints and build time added by every constraint group, in build order
+    groups = {}
+    mark = group_recorder(model, groups)
+
+    # schedule: (class, day, hour) -> subject index or -1 (free period)
+    # is_occupied: (class, day, hour) -> BoolVar
+    # slot_subject: (class, day, hour, subject index) -> BoolVar
+    #   Shared literal store: slot_subject[(c, d, h, s)] = True ⇔ subject s is scheduled in this slot.
+    #   Every constraint group below reads from this store, so each literal exists exactly once
+    #   instead of being rebuilt per constraint.
+    schedule = {}
+    is_occupied = {}
+    slot_subject = {}
+    teacher_clash_free = {}
+    objective_terms = []  # List to store terms used in the objective function
+
+    # HARD CONSTRAINT: Prevent scheduling of subjects that are not assigned to a class
+    # Only subjects explicitly assigned to the class (based on the 'class_subject_hours' data)
+    # get a literal in slot_subject, all other subjects cannot be represented in its timetable.
+    # Without this, the solver may assign "foreign" subjects (like Physics in a class
+    # that doesn’t have it) simply because it helps satisfy other constraints.
+
+    if model_backend == 'integer':
+        # Build the variable structure for the schedule:
+        # For each class, each day, and each hour:
+        # - a subject variable (var) is created, which is either a subject index (>= 0) or -1 (free period),
+        #   its domain only contains the subjects of the class,
+        # - a Boolean variable (occupied) indicating if the slot is used,
+        # - both variables are logically linked to ensure consistency,
+        # - one literal per class subject, reified as (var == subject_index).
+        for c in classes: 
+            allowed_idxs = sorted(subject_indices[s] for s in class_subject_hours[c])
+            slot_domain = cp_model.Domain.FromValues([-1] + allowed_idxs)
+            for d in range(len(days)):
+                for h in range(hours_per_day): 
+                    var = model.NewIntVarFromDomain(slot_domain, f'{c}_{d}_{h}')  # Subject index or -1 for free period
+                    occupied = model.NewBoolVar(f'occupied_{c}_{d}_{h}')  # Occupancy status (True/False)
+                    model.Add(var >= 0).OnlyEnforceIf(occupied)  # If occupied, subject index must be valid
+                    model.Add(var < 0).OnlyEnforceIf(occupied.Not())  # If not occupied, value must be -1
+                    schedule[(c, d, h)] = var  # Store subject variable
+                    is_occupied[(c, d, h)] = occupied  # Store occupancy variable
+
+                    for subject_index in allowed_idxs:
+                        b = model.NewBoolVar(f'is_{subjects[subject_index]}_{c}_{d}_{h}')
+                        model.Add(var == subject_index).OnlyEnforceIf(b)
+                        model.Add(var != subject_index).OnlyEnforceIf(b.Not())
+                        slot_subject[(c, d, h, subject_index)] = b
+
+    else:
+        # One-hot formulation: every slot is a set of Boolean variables x[c, d, h, s],
+        # one per subject of the class. At most one of them is True and the slot is
+        # occupied exactly when one of them is True (occupied == sum of the literals).
+        # The subject index is only kept as a linear expression for reading the solution.
+        for c in classes:
+            allowed_idxs = sorted(subject_indices[s] for s in class_subject_hours[c])
+            for d in range(len(days)):
+                for h in range(hours_per_day):
+                    occupied = model.NewBoolVar(f'occupied_{c}_{d}_{h}')
+                    literals = []
+                    for subject_index in allowed_idxs:
+                        x = model.NewBoolVar(f'x_{subjects[subject_index]}_{c}_{d}_{h}')
+                        slot_subject[(c, d, h, subject_index)] = x
+                        literals.append(x)
+
+                    # exactly one of "a subject" or "free" ⇔ occupied == sum(literals)
+                    model.AddExactlyOne(literals + [occupied.Not()])
+
+                    # subject index if occupied, -1 otherwise
+                    schedule[(c, d, h)] = sum(idx * x for idx, x in zip(allowed_idxs, literals)) + occupied - 1
+                    is_occupied[(c, d, h)] = occupied
+
+    mark("slots")
+
+    # This is a hard constraint to ensure that the subject taught before the break is different from the one after the break.
+    # This is important to avoid situations where the same subject is taught immediately before and after the break,
+    # which can be confusing for students and disrupts the flow of the day.
+    prev_hour = GLOBAL_BREAK - 1
+
+    # If both slots are occupied, then the subjects must be different:
+    # for every subject of the class, it may not be scheduled in both slots.
+    # In case of a "free" slot, all its subject literals are False and the constraint is not applied.
+    for c in classes:
+        for subject in class_subject_hours[c]:
+            subject_index = subject_indices[subject]
+            for d in range(len(days)):
+                model.AddBoolOr([
+                    slot_subject[(c, d, prev_hour, subject_index)].Not(),
+                    slot_subject[(c, d, GLOBAL_BREAK, subject_index)].Not()
+                ])
+
+
+
+
+    mark("break")
+
+    # Hard Constraint: Limit the number of simultaneous lessons for specific subjects.
+    # Background: Some subjects – such as Physical Education or Science – require special rooms
+    # (e.g. gymnasium, chemistry lab). These resources are limited.
+    # Therefore, a subject may only be taught a limited number of times simultaneously across all classes in any time slot.
+
+    for subject, max_parallel in restricted_parallel_subjects:  # For each subject with a parallel limit
+        subject_index = subject_indices[subject]  # Get the index of the subject
+
+        for d in range(len(days)):  
+            for h in range(hours_per_day):  
+
+                concurrent_subject_slots = []  # Tracks how many times the subject is taught at the same time
+
+                for c in classes: 
+                    # classes without this subject in their curriculum can never take part
+                    if (c, d, h, subject_index) in slot_subject:
+                        concurrent_subject_slots.append(slot_subject[(c, d, h, subject_index)])
+
+                # Enforce the maximum number of times the subject may be taught concurrently in this slot
+                model.Add(sum(concurrent_subject_slots) <= max_parallel)
+
+
+    mark("parallel_limits")
+
+    # Hard Constraints to ensure that each subject in each class
+    # appears in the schedule exactly as many times as specified in class_subject_hours.
+    # For every time slot, check whether the subject is scheduled.
+    # Store this information in a Boolean variable and count them in the end.
+
+    for c in classes:
+        for subject, required_count in class_subject_hours[c].items():
+            subject_index = subject_indices[subject]
+            occurrences = []
+            for d in range(len(days)):
+                for h in range(hours_per_day):
+                    # Bool: is this subject scheduled in this slot?
+                    occurrences.append(slot_subject[(c, d, h, subject_index)])  # Collect for later counting
+            # The subject must be scheduled exactly 'required_count' times per week
+            model.Add(sum(occurrences) == required_count)
+
+
+
+    mark("subject_hours")
+
+    # Hard Constraint: Limit how often a subject can be taught per day in a single class.
+    # Goal: A subject should appear at most MAX_HOURS_PER_DAY times per day.
+    # Example: If MAX_HOURS_PER_DAY = 2, then Math can occur at most twice per day, regardless of continuity.
+
+    for c in classes:
+        for subject, _ in class_subject_hours[c].items():  # Only consider subjects assigned to this class
+            subject_index = subject_indices[subject] 
+            for d in range(len(days)): 
+                occurrences = []  # List of slots where this subject occurs on this day
+                for h in range(hours_per_day): 
+                    # True ⇔ this subject is scheduled in this slot
+                    occurrences.append(slot_subject[(c, d, h, subject_index)])
+                # The total number of scheduled hours for this subject on this day must not exceed the limit
+                model.Add(sum(occurrences) <= MAX_HOURS_PER_DAY)
+
+
+    mark("max_hours_per_day")
+
+    # Hard Constrain: a subject may appear in at most one block per day
+    # This means that if a subject is scheduled in a class on a specific day,
+    # it should not be taught as two separated blocks.
+    # This is enforced by the following constraints:
+    for c in classes:
+        for subject, _ in class_subject_hours[c].items():  # only subjects actually taught in this class
+            subj_idx = subject_indices[subject]
+            for d in range(len(days)):
+                # 1. Helper variables: is the subject scheduled in period h?
+                is_subj = [slot_subject[(c, d, h, subj_idx)] for h in range(hours_per_day)]
+
+                # 2. “Start” variables: is period h the beginning of a new block?
+                starts = []
+                for h in range(hours_per_day):
+                    if h == 0:
+                        # The first slot of the day is a block start if it contains the subject
+                        starts.append(is_subj[0])
+                    else:
+                        s = model.NewBoolVar(f'{c}_{subject}_{d}_{h}_start')
+                        # Start ⇔ (subject now) ∧ (subject was NOT in the previous slot)
+                        model.AddBoolAnd([is_subj[h], is_subj[h-1].Not()]).OnlyEnforceIf(s)
+                        model.AddBoolOr([is_subj[h].Not(), is_subj[h-1]]).OnlyEnforceIf(s.Not())
+                        starts.append(s)
+
+                # 3. At most ONE start → at most ONE contiguous block of this subject today
+                model.Add(sum(starts) <= 1)
+
+
+
+
+    mark("blocks_per_day")
+
+    # Teacher side of the model.
+    # Without fixed teachers, the model chooses the teacher of every (class, subject) pair itself.
+    # With fixed teachers (e.g. from a separate teacher assignment, see solver/two_phase.py), the teacher of a slot
+    # follows from the scheduled subject, so no per-slot teacher variables are needed at all.
+    if fixed_teachers is None:
+        # Qualification relation: subject index -> indices of the teachers qualified for it
+        # (built from teachers_info[*]["subjects"], its size is the number of qualification pairs)
+        qualified_teachers = {i: [] for i in range(len(subjects))}
+        for teacher, info in teachers_info.items():
+            for s in info["subjects"]:
+                if s in subject_indices:
+                    qualified_teachers[subject_indices[s]].append(teacher_indices[teacher])
+
+        # preparing the teacher, class and subject mapping
+        # teacher_schedule: (class, day, hour) -> teacher index or -1 (no teacher assigned)
+        # slot_teacher: (class, day, hour, teacher index) -> BoolVar
+        #   Shared literal store: slot_teacher[(c, d, h, t)] = True ⇔ teacher t teaches class c in this slot.
+        #   Only teachers qualified for at least one subject of the class get a literal, so the teacher side
+        #   of the model grows with the real teaching options. The literals are built once and reused by
+        #   the qualification link, the clash constraint and the weekly workload limit.
+        teacher_schedule = {}
+        slot_teacher = {}
+        for c in classes:
+            candidate_teachers = sorted({
+                t_idx
+                for subject in class_subject_hours[c]
+                for t_idx in qualified_teachers[subject_indices[subject]]
+            })
+            for d in range(len(days)):
+                for h in range(hours_per_day):
+                    if model_backend == 'integer':
+                        teacher_var = model.NewIntVarFromDomain(
+                            cp_model.Domain.FromValues([-1] + candidate_teachers), f'teacher_{c}_{d}_{h}'
+                        )
+                        for t_idx in candidate_teachers:
+                            b = model.NewBoolVar(f'teacher_{t_idx}_assigned_{c}_{d}_{h}')
+                            model.Add(teacher_var == t_idx).OnlyEnforceIf(b)
+                            model.Add(teacher_var != t_idx).OnlyEnforceIf(b.Not())
+                            slot_teacher[(c, d, h, t_idx)] = b
+                        teacher_schedule[(c, d, h)] = teacher_var
+
+                    else:
+                        # exactly one teacher in an occupied slot, none in a free one
+                        literals = []
+                        for t_idx in candidate_teachers:
+                            y = model.NewBoolVar(f'y_teacher_{t_idx}_{c}_{d}_{h}')
+                            slot_teacher[(c, d, h, t_idx)] = y
+                            literals.append(y)
+                        model.AddExactlyOne(literals + [is_occupied[(c, d, h)].Not()])
+
+                        # teacher index if occupied, -1 otherwise
+                        teacher_schedule[(c, d, h)] = (
+                            sum(t_idx * y for t_idx, y in zip(candidate_teachers, literals)) + is_occupied[(c, d, h)] - 1
+                        )
+
+
+        # Assign a constant teacher to each subject per class
+        # This variable determines which teacher will consistently teach the subject in that class.
+        # Its domain only contains teachers qualified for the subject, which already enforces
+        # the qualification rule for every slot the subject is scheduled in.
+        constant_teacher = {}
+        for c in classes:
+            for subject in class_subject_hours[c]:
+                teacher_domain = cp_model.Domain.FromValues(sorted(qualified_teachers[subject_indices[subject]]))
+                constant_teacher[(c, subject)] = model.NewIntVarFromDomain(teacher_domain, f'const_teacher_{c}_{subject}')
+
+
+        # For each class, day, and hour:
+        # Check whether a specific subject is scheduled in that slot.
+        # If yes, enforce that the assigned teacher matches the pre-assigned (constant) teacher for that subject in that class.
+        # Goal: A subject should always be taught by the same teacher in a specific class.
+
+        for c in classes:
+            for d in range(len(days)):
+                for h in range(hours_per_day):
+                    teacher_var = teacher_schedule[(c, d, h)]  # The teacher assigned to this time slot
+
+                    for subject in class_subject_hours[c]:  # Only consider subjects scheduled for this class
+                        subject_index = subject_indices[subject]  # Get the subject index (e.g., Math = 0, English = 1, ...)
+                        is_subject = slot_subject[(c, d, h, subject_index)]  # Bool: Is this subject scheduled here?
+
+                        # If this subject is scheduled, enforce that the correct constant teacher is assigned
+                        model.Add(teacher_var == constant_teacher[(c, subject)]).OnlyEnforceIf(is_subject)
+
+
+        # Hard Constraint: A teacher may only teach subjects they are qualified for.
+        # Besides the restricted domain of constant_teacher, every slot gets a single table constraint
+        # on (subject, teacher) listing the allowed pairs: a free period without teacher (-1, -1)
+        # and every (subject, teacher) qualification pair for the subjects of the class.
+        # The model size of this rule scales with the number of qualification pairs, not with
+        # teachers × subjects per slot.
+        # The one-hot formulation has no subject variable per slot, there each teacher literal of a slot
+        # implies that one of the subjects the teacher is qualified for is scheduled in it.
+
+        if model_backend == 'integer':
+            for c in classes:
+                allowed_pairs = [(-1, -1)]
+                for subject in class_subject_hours[c]:
+                    subject_index = subject_indices[subject]
+                    allowed_pairs += [(subject_index, t_idx) for t_idx in qualified_teachers[subject_index]]
+
+                for d in range(len(days)):
+                    for h in range(hours_per_day):
+                        model.AddAllowedAssignments(
+                            [schedule[(c, d, h)], teacher_schedule[(c, d, h)]],
+                            allowed_pairs
+                        )
+
+        else:
+            for (c, d, h, t_idx), taught in slot_teacher.items():
+                model.AddBoolOr([
+                    slot_subject[(c, d, h, subject_indices[subject])]
+                    for subject in class_subject_hours[c]
+                    if t_idx in qualified_teachers[subject_indices[subject]]
+                ]).OnlyEnforceIf(taught)
+
+
+        # Hard Constraints on teacher workload:
+        # For each teacher we enforce:
+        # - They can teach at most one class in any given time slot,
+        # - Their total weekly teaching hours do not exceed their maximum allowed.
+        # The slot_teacher literals indicate whether the teacher is teaching a class in a time slot.
+        # The sum of these Booleans represents the workload.
+
+        for teacher, t_index in teacher_indices.items():
+            assignments = []  # List of all assignments for this teacher across the week
+
+            for d in range(len(days)):
+                for h in range(hours_per_day):
+                    # Is this teacher assigned to this class at this time? (only classes the teacher can teach)
+                    in_slot = [
+                        slot_teacher[(c, d, h, t_index)]
+                        for c in classes
+                        if (c, d, h, t_index) in slot_teacher
+                    ]
+
+                    # A teacher may only be assigned to one class per time slot
+                    model.AddAtMostOne(in_slot)
+                    assignments += in_slot
+
+            # Limit total working hours per week
+            model.Add(sum(assignments) <= teachers_info[teacher]['max_hours'])
+
+
+        # Hard Constraint: If a time slot is not occupied, no teacher should be assigned
+        # (the one-hot formulation already ties its teacher literals to the occupancy)
+        if model_backend == 'integer':
+            for c in classes:
+                for d in range(len(days)):
+                    for h in range(hours_per_day):
+                        occupied = is_occupied[(c, d, h)]
+                        teacher_var = teacher_schedule[(c, d, h)]
+                        model.Add(teacher_var == -1).OnlyEnforceIf(occupied.Not())  # No teacher if not occupied
+                        model.Add(teacher_var >= 0).OnlyEnforceIf(occupied)         # Valid teacher index if occupied
+
+    else:
+        # teacher index if occupied, -1 otherwise (exactly one subject literal is True in an occupied slot)
+        teacher_schedule = {}
+        for c in classes:
+            for d in range(len(days)):
+                for h in range(hours_per_day):
+                    teacher_schedule[(c, d, h)] = sum(
+                        fixed_teachers[(c, subject)] * slot_subject[(c, d, h, subject_indices[subject])]
+                        for subject in class_subject_hours[c]
+                    ) + is_occupied[(c, d, h)] - 1
+        slot_teacher = {}
+        constant_teacher = {}
+
+        # Hard Constraint: A teacher may only be assigned to one class per time slot.
+        # All lessons of a teacher are known, so at most one of their subject literals may be True per slot.
+        # The constraints of each teacher are guarded by one literal in teacher_clash_free, which can be
+        # used as assumption to find out which teachers make the model infeasible.
+        lessons_of_teacher = {t_idx: [] for t_idx in range(len(teacher_ids))}
+        for (c, subject), t_idx in fixed_teachers.items():
+            lessons_of_teacher[t_idx].append((c, subject_indices[subject]))
+
+        for t_idx, lessons in lessons_of_teacher.items():
+            if len(lessons) < 2:
+                continue
+            clash_free = model.NewBoolVar(f'teacher_{t_idx}_clash_free')
+            teacher_clash_free[t_idx] = clash_free
+            for d in range(len(days)):
+                for h in range(hours_per_day):
+                    model.Add(sum(slot_subject[(c, d, h, s_idx)] for c, s_idx in lessons) <= 1).OnlyEnforceIf(clash_free)
+
+
+    mark("teachers")
+
+    # Optional symmetry breaking for interchangeable classes and teachers.
+    # Fixed teachers already distinguish otherwise identical classes and teachers.
+    symmetry = None
+    if symmetry_breaking and fixed_teachers is None:
+        symmetry = add_symmetry_breaking(
+            model, school,
+            {"constant_teacher": constant_teacher},
+            subject_indices, teacher_indices
+        )
+
+
+    mark("symmetry")
+
+    # All soft contraints follow here:
+    # Soft Constraints are used to guide the solver towards a more desirable solution,
+    # but they do not prevent the solver from finding a solution if they are violated.
+
+    # Soft Constrain: Prefer early hours – a subject should ideally be scheduled in the first hours of the day.
+    # The erlier a subject is scheduled, the higher the reinforcement weight.
+    # The solver trys to maximize the total weight of all scheduled subjects,
+    if PREFER_EARLY_HOURS: # only activated if the user settings allow it
+        for c in classes:
+            for d in range(len(days)):
+                for h in range(hours_per_day):
+                    period_weight = (hours_per_day - h) * WEIGHT_TIME_OF_HOURS
+                    objective_terms.append(is_occupied[(c, d, h)] * period_weight)
+
+    mark("early_hours")
+
+    # Soft constraint: Prefer double periods – a subject should ideally be scheduled in a choosen amount of consecutive hours.
+    # This encourages "block lessons", which are often desirable for subjects like Math or Physical Education.
+    # This is only applied if the user settings allow it.
+    # This is done by checking pairs of consecutive hours for each class and subject.
+    # If a subject is scheduled in both hours, it is considered a "block" and gets a bonus.
+
+    if ALLOW_BLOCK_SCHEDULING:
+        for c in classes:
+            for subject, _ in class_subject_hours[c].items():
+                subj_idx = subject_indices[subject]
+                # pick weight: global default OR subject-specific bonus
+                weight = PREFER_BLOCK_SUBJECTS.get(subject, WEIGHT_BLOCK_SCHEDULING)
+                for d in range(len(days)):
+                    for h in range(hours_per_day - 1):
+                        b1 = slot_subject[(c, d, h, subj_idx)]
+                        b2 = slot_subject[(c, d, h + 1, subj_idx)]
+
+                        both = model.NewBoolVar(f'{c}_{subject}_{d}_{h}_both')
+                        model.AddBoolAnd([b1, b2]).OnlyEnforceIf(both)
+                        model.AddBoolOr([b1.Not(), b2.Not()]).OnlyEnforceIf(both.Not())
+
+                        objective_terms.append(both * weight)
+
+
+    mark("block_lessons")
+
+    #punish "inner gaps" in the schedule
+    # An "inner gap" is defined as a free period that is followed by more lessons in the same class.
+    # This helps to concentrate lessons and avoid unnecessary breaks in the schedule.
+    # For each class and day, one "something later" chain is built from the last period backwards:
+    # something_later[h] ⇔ occupied[h + 1] ∨ something_later[h + 1]
+    # so every period only looks at the next one and the model size stays linear in hours_per_day.
+    penalty_weight = 2  # Tune this to influence the importance of avoiding gaps
+    for c in classes:
+        for d in range(len(days)):
+            # nothing comes after the last period
+            later_next = None
+
+            for h in range(hours_per_day - 2, -1, -1):  # No need to check the last period
+                occupied_next = is_occupied[(c, d, h + 1)]
+
+                # Boolean: Is there any scheduled lesson after the current period?
+                if later_next is None:
+                    something_later = occupied_next
+                else:
+                    something_later = model.NewBoolVar(f'{c}_{d}_{h}_after')
+                    model.AddBoolOr([occupied_next, later_next]).OnlyEnforceIf(something_later)
+                    model.AddImplication(occupied_next, something_later)
+                    model.AddImplication(later_next, something_later)
+
+                # A free period that is followed by more lessons is considered an "inner gap"
+                # is_inner_gap ⇔ ¬occupied[h] ∧ something_later[h]
+                current = is_occupied[(c, d, h)]
+                is_inner_gap = model.NewBoolVar(f'{c}_{d}_{h}_inner_gap')
+                model.AddBoolAnd([current.Not(), something_later]).OnlyEnforceIf(is_inner_gap)
+                model.AddBoolOr([current, something_later.Not()]).OnlyEnforceIf(is_inner_gap.Not())
+
+                # Penalize such gaps in the objective function to reduce non-terminal free periods
+                objective_terms.append(is_inner_gap * -penalty_weight)
+
+                later_next = something_later
+
+
+    mark("inner_gaps")
+
+    # The impact of the soft constraints is defined here.
+    # The objective function is a weighted sum of all terms that were collected during the model building.
+    # by trying to maximize this sum, the solver will try to find a solution that satisfies as many soft constraints as possible.
+    model.Maximize(sum(objective_terms))
+    mark("objective")
+
+    return {
+        "model": model,
+        "schedule": schedule,
+        "teacher_schedule": teacher_schedule,
+        "is_occupied": is_occupied,
+        "slot_subject": slot_subject,
+        "slot_teacher": slot_teacher,
+        "constant_teacher": constant_teacher,
+        "teacher_clash_free": teacher_clash_free,
+        "symmetry": symmetry,
+        "groups": groups
+    }
+
+
+def linear_terms(value):
+    """
+    Returns:
+        ([(proto index, coefficient)], constant) of a variable, a linear expression or an integer.
+    """
+    if isinstance(value, cp_model.IntVar):
+        return [(value.Index(), 1)], 0
+    if isinstance(value, int):
+        return [], value
+    coefficients, constant = value.get_integer_var_value_map()
+    return [(var.Index(), coef) for var, coef in coefficients.items()], constant
+
+
+def extraction_plan(school, variables):
+    """
+    Returns:
+        [(class, day index, hour, subject terms, teacher terms)] of all slots in class, day and hour order,
+        with the terms of `linear_terms()`. Computed once per model and kept in `variables`, the provisional
+        timetables of a running job are extracted from the same model many times.
+    """
+    plan = variables.get("extraction_plan")
+    if plan is None:
+        schedule = variables["schedule"]
+        teacher_schedule = variables["teacher_schedule"]
+        plan = [
+            (c, d, h, linear_terms(schedule[(c, d, h)]), linear_terms(teacher_schedule[(c, d, h)]))
+            for c in school["classes"]
+            for d in range(len(school["days"]))
+            for h in range(school["hours_per_day"])
+        ]
+        variables["extraction_plan"] = plan
+    return plan
+
+
+def solution_values(solver, variables, plan):
+    """
+    Returns:
+        The values of the solution indexed by proto index. Read in one piece from the response of a
+        CpSolver (`ResponseProto()`) or a solution callback (`Response()`); objects that only offer
+        `Value()` are asked once for every variable of the plan.
+    """
+    if hasattr(solver, "ResponseProto"):
+        return solver.ResponseProto().solution
+    if hasattr(solver, "Response"):
+        return solver.Response().solution
+
+    model = variables["model"]
+    indices = {index for *_, subject_terms, teacher_terms in plan for index, _ in subject_terms[0] + teacher_terms[0]}
+    return {index: solver.Value(model.GetIntVarFromProtoIndex(index)) for index in indices}
+
+
+def slot_values(solver, school, variables):
+    """
+    Yields:
+        (class, day index, hour, subject index, teacher index) of every slot with a subject and a teacher,
+        in class, day and hour order (see `extraction_plan()`). Slots without either are free and skipped.
+    """
+    plan = extraction_plan(school, variables)
+    values = solution_values(solver, variables, plan)
+    for c, d, h, (subject_terms, subject_constant), (teacher_terms, teacher_constant) in plan:
+        t_idx = teacher_constant + sum(coef * values[index] for index, coef in teacher_terms)
+        subj_idx = subject_constant + sum(coef * values[index] for index, coef in subject_terms)
+        if t_idx < 0 or subj_idx < 0:
+            continue
+        yield c, d, h, subj_idx, t_idx
+
+
+def extract_compact(solver, school, variables):
+    """
+    Builds the timetables of a solved model in the compact format (see utils/result_format.py)
+    directly from the subject and teacher indices of the slots, without formatting any entry.
+
+    Args:
+        solver (cp_model.CpSolver): Solver that found a feasible solution (or a solution callback).
+        school (dict): School data snapshot the model was built from.
+        variables (dict): Variables returned by `build_timetable_model()`.
+
+    Returns:
+        dict with 'format' ("compact"), the names of the 'days', 'classes', 'teachers' (in index order)
+        and 'subjects' (in index order), and 'subject_grid' and 'teacher_grid' ([class][day][period],
+        -1 for free periods, the break included).
+    """
+    classes = school["classes"]
+    days = school["days"]
+    GLOBAL_BREAK = school["global_break"]
+    _, _, teacher_names, _ = unpack_school(school)
+
+    # all periods start free, the break is the period GLOBAL_BREAK
+    class_positions = {c: c_index for c_index, c in enumerate(classes)}
+    subject_grid = [[[-1] * (school["hours_per_day"] + 1) for _ in days] for _ in classes]
+    teacher_grid = [[[-1] * (school["hours_per_day"] + 1) for _ in days] for _ in classes]
+
+    for c, d, h, subj_idx, t_idx in slot_values(solver, school, variables):
+        period = h if h < GLOBAL_BREAK else h + 1
+        subject_grid[class_positions[c]][d][period] = subj_idx
+        teacher_grid[class_positions[c]][d][period] = t_idx
+
+    return {
+        "format": "compact",
+        "days": list(days),
+        "classes": list(classes),
+        "teachers": teacher_names,
+        "subjects": list(school["subjects"]),
+        "subject_grid": subject_grid,
+        "teacher_grid": teacher_grid
+    }
+
+
+def extract_timetable(solver, school, variables):
+    """
+    Builds the timetable for each class and teacher from a solved model.
+
+    Subject and teacher of every slot are read once from the solution and written to the class
+    and the teacher view at the same time.
+
+    Args:
+        solver (cp_model.CpSolver): Solver that found a feasible solution (or a solution callback).
+        school (dict): School data snapshot the model was built from.
+        variables (dict): Variables returned by `build_timetable_model()`.
+
+    Returns:
+        dict with 'classes' ({class: {day: [entry, ...]}}) and 'teachers'
+        ({teacher name: {day: [entry, ...]}}), the break is inserted as "free".
+    """
+    classes = school["classes"]
+    subjects = school["subjects"]
+    days = school["days"]
+    hours_per_day = school["hours_per_day"]
+    GLOBAL_BREAK = school["global_break"]
+    _, _, teacher_names, _ = unpack_school(school)
+
+    # all periods start free, every slot of the plan fills its class and its teacher
+    class_periods = {c: [["free"] * hours_per_day for _ in days] for c in classes}
+    teacher_periods = [[["free"] * hours_per_day for _ in days] for _ in teacher_names]
+
+    # Build the timetable for each class and teacher ready to be returned to the user in a format
+    # that can be easily processed in the frontend.
+    for c, d, h, subj_idx, t_idx in slot_values(solver, school, variables):
+        subject = subjects[subj_idx]
+        class_periods[c][d][h] = f"{subject} ({teacher_names[t_idx]})"
+        # a teacher teaches one class per slot, the first class in class order is shown
+        if teacher_periods[t_idx][d][h] == "free":
+            teacher_periods[t_idx][d][h] = f"{subject} ({c})"
+
+    def with_break(periods):
+        # from GLOBAL_BREAK move all periods one step forward and add the break
+        return periods[:GLOBAL_BREAK] + ["free"] + periods[GLOBAL_BREAK:]
+
+    return {
+        "classes": {
+            c: {day: with_break(class_periods[c][d_index]) for d_index, day in enumerate(days)}
+            for c in classes
+        },
+        "teachers": {
+            teacher: {day: with_break(teacher_periods[t_idx][d_index]) for d_index, day in enumerate(days)}
+            for t_idx, teacher in enumerate(teacher_names)
+        }
+    }
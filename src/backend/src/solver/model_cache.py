@@ -0,0 +1,243 @@
+from ortools.sat.python import cp_model
+from google.protobuf.message import DecodeError
+from .model import build_timetable_model, MODEL_BACKENDS
+import hashlib
+import json
+import logging
+import os
+import stat
+import tempfile
+
+"""
+This module caches built timetable models on local disk.
+
+Building the model goes through the Python wrapper of OR-Tools for every variable and
+constraint, and for large schools it takes longer than finding the first solution.
+Re-runs with unchanged data (retries, runs with a longer time limit, incremental rounds)
+load the serialized `CpModelProto` instead and skip the build phase completely.
+
+Functionality:
+- `school_fingerprint()`:
+  Canonical hash of the school data and the model options.
+
+- `build_cached_model()`:
+  Returns the variables of `build_timetable_model()`, either loaded from the cache or
+  built and stored in the cache.
+
+Cache entries:
+- One file per fingerprint: one line of JSON with the variable index map (the proto indices of all
+  variables and the coefficients of all linear expressions) followed by the serialized model proto.
+  Entries are plain data, loading one never executes code.
+- The cache directory is created private to the user of the process (mode 0700). A directory owned by
+  someone else or writable by others is not used, the models are then built without cache.
+- The cache is bounded by size. The least recently used entries (by file modification time,
+  which is renewed on every hit) are removed first.
+
+Configuration (environment variables):
+- MODEL_CACHE_DIR: cache directory (default: $XDG_CACHE_HOME/timetable-model-cache, ~/.cache without XDG_CACHE_HOME)
+- MODEL_CACHE_MAX_BYTES: maximum total size of the cache (default: 512 MB, 0 disables the cache)
+
+Technologies:
+- OR-Tools (cp_model) for constraint solving
+- Local file system for storage
+"""
+
+
+MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "timetable-model-cache"
+))
+MODEL_CACHE_MAX_BYTES = int(os.environ.get("MODEL_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+# variables that are stored per key in the variables dict of build_timetable_model()
+VARIABLE_STORES = (
+    "schedule", "teacher_schedule", "is_occupied", "slot_subject",
+    "slot_teacher", "constant_teacher", "teacher_clash_free"
+)
+
+
+def school_fingerprint(school, **options):
+    """
+    Expects the school data (see solver/model.py) and the options the model is built with.
+
+    Returns:
+        A hex SHA-256 digest that is equal for equal inputs, independent of the order of
+        teachers, qualifications and parallel limits.
+    """
+    canonical = dict(school)
+    # JSON only allows string keys, and the order of qualifications and limits does not matter
+    canonical["teachers_info"] = {
+        str(tid): {**info, "subjects": sorted(info["subjects"])}
+        for tid, info in school["teachers_info"].items()
+    }
+    canonical["restricted_parallel_subjects"] = sorted(list(limit) for limit in school["restricted_parallel_subjects"])
+    canonical["options"] = options
+
+    data = json.dumps(canonical, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def encode_variable(value):
+    """
+    Returns:
+        ("var", proto index) for a variable, or ("expr", [(proto index, coefficient)], constant)
+        for a linear expression.
+    """
+    if isinstance(value, cp_model.IntVar):
+        return ("var", value.Index())
+    coefficients, constant = value.get_integer_var_value_map()
+    return ("expr", [(var.Index(), coef) for var, coef in coefficients.items()], constant)
+
+
+def decode_variable(model, encoded):
+    """
+    Returns:
+        The variable or linear expression of the loaded model for an encoded entry.
+    """
+    if encoded[0] == "var":
+        return model.GetIntVarFromProtoIndex(encoded[1])
+    _, terms, constant = encoded
+    return cp_model.LinearExpr.WeightedSum(
+        [model.GetIntVarFromProtoIndex(index) for index, _ in terms],
+        [coef for _, coef in terms]
+    ) + constant
+
+
+def cache_directory(create=False):
+    """
+    Returns:
+        MODEL_CACHE_DIR if it is a directory of the user of this process that nobody else can write to,
+        created with mode 0700 if `create` is set; otherwise None (the cache is not used).
+    """
+    if create:
+        try:
+            os.makedirs(MODEL_CACHE_DIR, mode=0o700, exist_ok=True)
+        except OSError:
+            return None
+    try:
+        info = os.lstat(MODEL_CACHE_DIR)
+    except OSError:
+        return None
+
+    # a directory of another user could hold planted entries
+    owner_ok = not hasattr(os, "getuid") or info.st_uid == os.getuid()
+    if not stat.S_ISDIR(info.st_mode) or not owner_ok or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        logging.warning("Model cache disabled: %s is not a private directory of this user", MODEL_CACHE_DIR)
+        return None
+    return MODEL_CACHE_DIR
+
+
+def cache_path(directory, fingerprint):
+    return os.path.join(directory, f'{fingerprint}.model')
+
+
+def load_model(fingerprint):
+    """
+    Returns:
+        The variables dict of the cached model, or None if it is not cached.
+    """
+    directory = cache_directory()
+    if directory is None:
+        return None
+
+    path = cache_path(directory, fingerprint)
+    try:
+        with open(path, "rb") as f:
+            metadata, proto = f.read().split(b"\n", 1)
+        entry = json.loads(metadata.decode("utf-8"))
+        os.utime(path)  # mark as recently used
+    except (OSError, ValueError):
+        # missing, or written by an older version (ValueError covers broken JSON and a missing separator)
+        return None
+
+    try:
+        model = cp_model.CpModel()
+        model.Proto().ParseFromString(proto)
+
+        # entries written before the constraint groups were recorded have none
+        variables = {"model": model, "symmetry": entry["symmetry"], "groups": entry.get("groups")}
+        for store in VARIABLE_STORES:
+            # JSON has no tuples, the keys and encoded entries are stored as lists
+            variables[store] = {tuple(key): decode_variable(model, encoded) for key, encoded in entry[store]}
+    except (DecodeError, KeyError, ValueError, IndexError, TypeError):
+        # truncated or corrupt entry, it is replaced by the next build
+        return None
+    return variables
+
+
+def store_model(fingerprint, variables):
+    """
+    Writes the model and its variable index map to the cache and evicts the least
+    recently used entries if the cache exceeds MODEL_CACHE_MAX_BYTES.
+    """
+    directory = cache_directory(create=True)
+    if directory is None:
+        return
+
+    entry = {"symmetry": variables["symmetry"], "groups": variables["groups"]}
+    for store in VARIABLE_STORES:
+        entry[store] = [(key, encode_variable(value)) for key, value in variables[store].items()]
+    # one line of JSON (no raw line feeds in compact JSON), then the proto bytes
+    data = json.dumps(entry, separators=(',', ':')).encode("utf-8") + b"\n" + variables["model"].Proto().SerializeToString()
+
+    # write to a temporary file of its own first (mode 0600), so concurrent jobs never read a half-written
+    # entry and solver threads of the same process storing the same fingerprint never share a file
+    path = cache_path(directory, fingerprint)
+    descriptor, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with open(descriptor, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        os.remove(tmp_path)
+        raise
+
+    evict(directory)
+
+
+def evict(directory):
+    """
+    Removes the least recently used cache entries until the cache fits into MODEL_CACHE_MAX_BYTES.
+    """
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(".model"):
+            try:
+                info = os.stat(os.path.join(directory, name))
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, name))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= MODEL_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+        total -= size
+
+
+def build_cached_model(school, model_backend=MODEL_BACKENDS[0], symmetry_breaking=False):
+    """
+    Same as `build_timetable_model(school, model_backend, symmetry_breaking=...)`, but loads the
+    model from the cache if it was built for the same inputs before.
+
+    Returns:
+        (variables, cache_hit)
+    """
+    if MODEL_CACHE_MAX_BYTES <= 0:
+        return build_timetable_model(school, model_backend, symmetry_breaking=symmetry_breaking), False
+
+    fingerprint = school_fingerprint(school, model_backend=model_backend, symmetry_breaking=symmetry_breaking)
+    variables = load_model(fingerprint)
+    if variables is not None:
+        return variables, True
+
+    variables = build_timetable_model(school, model_backend, symmetry_breaking=symmetry_breaking)
+    try:
+        store_model(fingerprint, variables)
+    except OSError:
+        # the cache is only an optimization, a full disk must not fail the job
+        pass
+    return variables, False
@@ -0,0 +1,218 @@
+from ortools.sat.python import cp_model
+from .model import MODEL_BACKENDS, extract_compact
+from .model_cache import build_cached_model
+from .hints import add_solution_hints
+from .instrumentation import measure, instrument, record_solve
+from concurrent.futures import ThreadPoolExecutor, wait
+import time
+
+"""
+This module computes several alternative timetables of one school in one job.
+
+Schools want to compare a few alternatives before they decide. Instead of N full runs one
+after the other, the portfolio runs several differently seeded searches at the same time
+(CP-SAT releases the GIL while solving) and excludes the timetables already found in the
+following rounds, so every round adds new alternatives.
+
+Functionality:
+- `placements()`:
+  The lessons of a solved model as set of (class, day, hour, subject index).
+
+- `add_diversity_constraint()`:
+  Requires at least `min_difference` lessons of a found timetable to be placed differently.
+
+- `add_placement_hints()`:
+  Uses a found timetable as solution hint of the next round.
+
+- `class_differences()`:
+  Per-class number of periods in which an alternative differs from the best timetable.
+
+- `solve_portfolio()`:
+  Runs rounds of parallel searches until k distinct timetables are found or the time is up,
+  and returns the best one together with all alternatives.
+
+Technologies:
+- OR-Tools (cp_model) for constraint solving
+- concurrent.futures (threads for the parallel searches)
+"""
+
+
+# seconds between two checks whether the searches of a round have to be stopped
+STOP_CHECK_INTERVAL = 0.2
+
+# default minimum difference between two timetables as share of all lessons of the school
+MIN_DIFFERENCE_SHARE = 0.1
+
+
+def placements(solver, variables):
+    """
+    Returns:
+        frozenset of the (class, day, hour, subject index) keys of `slot_subject` that are true.
+    """
+    return frozenset(key for key, literal in variables["slot_subject"].items() if solver.BooleanValue(literal))
+
+
+def add_diversity_constraint(variables, found, min_difference):
+    """
+    Excludes every timetable that keeps more than len(found) - min_difference lessons of `found`
+    (a set returned by `placements()`) in place.
+    """
+    slot_subject = variables["slot_subject"]
+    variables["model"].Add(sum(slot_subject[key] for key in found) <= len(found) - min_difference)
+
+
+def add_placement_hints(variables, found):
+    """
+    Hints every lesson of `found` (a set returned by `placements()`) and no other one.
+    """
+    model = variables["model"]
+    for key, literal in variables["slot_subject"].items():
+        model.AddHint(literal, key in found)
+
+
+def class_differences(timetable, best):
+    """
+    Returns:
+        {class: number of periods with another subject or teacher than in `best`} for the classes
+        that differ (both timetables in the compact format of `extract_compact()`, for the same school).
+    """
+    differences = {}
+    for c_index, c in enumerate(best["classes"]):
+        changed = sum(
+            1
+            for grids in zip(
+                timetable["subject_grid"][c_index], timetable["teacher_grid"][c_index],
+                best["subject_grid"][c_index], best["teacher_grid"][c_index]
+            )
+            for subject, teacher, best_subject, best_teacher in zip(*grids)
+            if (subject, teacher) != (best_subject, best_teacher)
+        )
+        if changed:
+            differences[c] = changed
+    return differences
+
+
+def solve_portfolio(school, model_backend=MODEL_BACKENDS[0], max_time_in_seconds=60.0, num_workers=3,
+                    solution_callback=None, alternatives=3, min_difference=None, snapshot=None, relative_gap_limit=0.0):
+    """
+    Searches the `alternatives` best timetables that differ pairwise in at least `min_difference` lessons.
+
+    Every round builds the model once per search, excludes all timetables found so far and runs
+    one search per missing timetable (at most `num_workers`) with its own random seed on a share
+    of the search workers. Timetables found by several searches of a round are only counted once.
+
+    Args:
+        school (dict): School data snapshot (see solver/model.py).
+        model_backend (str): Model formulation, one of MODEL_BACKENDS.
+        max_time_in_seconds (float): Time limit for all rounds together.
+        num_workers (int): Number of search workers, shared by the searches of a round.
+        solution_callback (cp_model.CpSolverSolutionCallback, optional): Passed to the first search of
+            every round; if it has a `stop_reason` (see solver/worker.py), all searches are stopped with it.
+        alternatives (int): Number of timetables to find.
+        min_difference (int, optional): Minimum number of lessons placed differently between two timetables
+            (default: MIN_DIFFERENCE_SHARE of all lessons).
+        snapshot (dict, optional): Earlier solution used as hints of the first search of the first round
+            (see solver/hints.py), the later rounds are hinted with the timetables found before.
+        relative_gap_limit (float): Every search stops once within this relative gap of its optimum (0 to disable).
+
+    Returns:
+        (solver, status, variables, rounds, found) where solver, status and variables belong to the search
+        of the best timetable (status INFEASIBLE and variables None if none was found) and found is the list
+        of {"objective", "placements"} and the compact timetables (see `extract_compact()`) of all
+        timetables, best first.
+    """
+    start = time.monotonic()
+    if min_difference is None:
+        lessons = sum(sum(hours.values()) for hours in school["class_subject_hours"].values())
+        min_difference = max(1, int(lessons * MIN_DIFFERENCE_SHARE))
+
+    found = []
+    best = (cp_model.CpSolver(), cp_model.INFEASIBLE, None)
+    rounds = 0
+
+    while len(found) < alternatives:
+        remaining = max_time_in_seconds - (time.monotonic() - start)
+        if remaining < 1.0 or getattr(solution_callback, "stop_reason", None):
+            break
+        rounds += 1
+
+        # one search per missing timetable, each on its own share of the workers
+        missing = alternatives - len(found)
+        searches = max(1, min(missing, num_workers))
+        # a round gets the share of the remaining time of the timetables it searches,
+        # but at least half of it as long as no timetable was found (the first one is the hardest)
+        round_time = remaining * searches / missing
+        if not found:
+            round_time = max(round_time, remaining / 2)
+        round_time = max(1.0, round_time)
+
+        runs = []
+        for i in range(searches):
+            # every search gets its own model, the diversity constraints are added to all of them
+            with measure(solution_callback, "model_build"):
+                variables, _ = build_cached_model(school, model_backend)
+                for solution in found:
+                    add_diversity_constraint(variables, solution["placements"], min_difference)
+                if found:
+                    # a found timetable is a good starting point, the search only has to move enough lessons
+                    add_placement_hints(variables, found[i % len(found)]["placements"])
+                elif snapshot and i == 0:
+                    add_solution_hints(school, variables, snapshot)
+
+            solver = cp_model.CpSolver()
+            solver.parameters.max_time_in_seconds = round_time
+            solver.parameters.num_search_workers = max(1, num_workers // searches)
+            solver.parameters.random_seed = rounds * num_workers + i
+            # the other searches leave the default search order to find other timetables
+            solver.parameters.randomize_search = i > 0
+            solver.parameters.relative_gap_limit = relative_gap_limit
+            instrument(solver)
+            runs.append((solver, variables))
+
+        # the first search reports the progress of the job (see solver/worker.py)
+        if hasattr(solution_callback, "track"):
+            solution_callback.track(school, runs[0][1])
+
+        with ThreadPoolExecutor(max_workers=searches) as executor:
+            futures = [
+                executor.submit(solver.Solve, variables["model"], solution_callback if i == 0 else None)
+                for i, (solver, variables) in enumerate(runs)
+            ]
+            # a cancelled job stops the searches of the whole round
+            while wait(futures, timeout=STOP_CHECK_INTERVAL).not_done:
+                if getattr(solution_callback, "stop_reason", None):
+                    for solver, _ in runs:
+                        solver.StopSearch()
+            statuses = [future.result() for future in futures]
+        # the parallel searches are summed up, their search time is more than the wall time of the round
+        for solver, _ in runs:
+            record_solve(solution_callback, solver)
+
+        new = 0
+        for (solver, variables), status in zip(runs, statuses):
+            if status not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+                continue
+
+            # several searches of a round may find the same or almost the same timetable
+            solution = placements(solver, variables)
+            if any(len(solution - other["placements"]) < min_difference for other in found):
+                continue
+
+            with measure(solution_callback, "extraction"):
+                timetable = extract_compact(solver, school, variables)
+            timetable.update({"objective": solver.ObjectiveValue(), "placements": solution})
+            found.append(timetable)
+            new += 1
+
+            if best[2] is None or solver.ObjectiveValue() > best[0].ObjectiveValue():
+                best = (solver, status, variables)
+
+        # the excluded timetables leave no feasible alternative
+        if new == 0 and all(status == cp_model.INFEASIBLE for status in statuses):
+            break
+        if best[2] is None:
+            best = (runs[0][0], statuses[0], None)
+
+    found.sort(key=lambda timetable: timetable["objective"], reverse=True)
+    solver, status, variables = best
+    return solver, status, variables, rounds, found[:alternatives]
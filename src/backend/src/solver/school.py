@@ -0,0 +1,164 @@
+from ..utils.feasibility import check_feasibility
+from .model import DAYS
+from .worker import solve_school
+import time
+
+"""
+This module is the entry point of the solver as a library: a plain school snapshot in,
+a timetable out. It needs neither the database nor Flask, so the same solve runs behind the API
+(see api_endpoints/AsyncCompute.py), in the batch mode (see batch.py) and in scripts.
+
+Functionality:
+- `build_school()`:
+  Builds the school snapshot (see solver/model.py) from the stored settings and school data,
+  as they are kept in the database and sent to `/Settings/set`.
+
+- `school_from_settings()`:
+  Builds the school snapshot from a `/Settings/set` payload (settings, school, teachers, class_allocations, ...).
+
+- `school_from_json()`:
+  Builds the school snapshot from a JSON document, either a `/Settings/set` payload or a snapshot
+  written with `json.dump()` (teacher IDs and parallel limits are restored to their original types).
+
+- `school_problems()`:
+  Static feasibility analysis of a snapshot (see utils/feasibility.py).
+
+- `solve_timetable()`:
+  Checks and solves one school. Over-constrained schools return the status 'infeasible' with
+  their problems without building a model.
+"""
+
+
+# time limit in seconds if neither the caller nor the settings of the school give one
+DEFAULT_TIME_LIMIT = 60.0
+
+
+def build_school(settings, classes, subjects, hours_per_day, teachers_info, class_subject_hours,
+                 restricted_parallel_subjects, prefer_block_subjects):
+    """
+    Args:
+        settings (dict): prefer_early_hours, allow_block_scheduling, max_hours_per_day, global_break
+            (one-based period of the break), weight_block_scheduling, weight_time_of_hours and max_time_for_solving.
+        classes (list): Class names.
+        subjects (list): Subject names.
+        hours_per_day (int): Periods per day including the break.
+        teachers_info (dict): {Tid: {"name", "max_hours", "subjects"}}.
+        class_subject_hours (dict): {class_name: {subject: hours_per_week}}.
+        restricted_parallel_subjects (list): [(subject, max_parallel)].
+        prefer_block_subjects (dict): {subject: weight}.
+
+    Returns:
+        (school, max_time_for_solving) with the school snapshot as expected by `build_timetable_model()`.
+    """
+    school = {
+        "classes": classes,
+        "subjects": subjects,
+        "days": DAYS,
+        "hours_per_day": hours_per_day - 1,  # -1 because of the additional break period
+        "teachers_info": teachers_info,
+        "class_subject_hours": class_subject_hours,
+        "restricted_parallel_subjects": restricted_parallel_subjects,
+        "prefer_block_subjects": prefer_block_subjects,
+        "prefer_early_hours": settings["prefer_early_hours"],
+        "allow_block_scheduling": settings["allow_block_scheduling"],
+        "max_hours_per_day": settings["max_hours_per_day"],
+        "global_break": settings["global_break"] - 1,  # zero-based index of the break period
+        "weight_block_scheduling": settings["weight_block_scheduling"],
+        "weight_time_of_hours": settings["weight_time_of_hours"]
+    }
+    return school, settings["max_time_for_solving"]
+
+
+def school_from_settings(data):
+    """
+    Expects a `/Settings/set` payload (see README). The teachers get the IDs 1..n in the order of the payload.
+
+    Returns:
+        (school, max_time_for_solving), see `build_school()`.
+    """
+    teachers_info = {
+        tid: {"name": teacher["name"], "max_hours": teacher["max_hours"], "subjects": list(teacher.get("subjects", []))}
+        for tid, teacher in enumerate(data.get("teachers", []), start=1)
+    }
+
+    class_subject_hours = {}
+    for entry in data.get("class_allocations", []):
+        class_subject_hours.setdefault(entry["class_name"], {})[entry["subject"]] = entry["hours_per_week"]
+
+    return build_school(
+        data["settings"],
+        data["school"]["classes"],
+        data["school"]["subjects"],
+        data["school"]["hours_per_day"],
+        teachers_info,
+        class_subject_hours,
+        [(entry["subject_name"], entry["max_parallel"]) for entry in data.get("subject_parallel_limits", [])],
+        {entry["subject_name"]: entry["weight"] for entry in data.get("prefer_block_subjects", [])}
+    )
+
+
+def school_from_json(data):
+    """
+    Expects a `/Settings/set` payload or a school snapshot loaded with `json.load()`.
+
+    Returns:
+        (school, max_time_for_solving); max_time_for_solving is None for snapshots, they hold no settings.
+    """
+    if "settings" in data:
+        return school_from_settings(data)
+
+    school = dict(data)
+    school.setdefault("days", DAYS)
+    # JSON object keys are strings, the teacher IDs of the database are integers
+    school["teachers_info"] = {
+        int(tid) if isinstance(tid, str) and tid.isdigit() else tid: info
+        for tid, info in data["teachers_info"].items()
+    }
+    school["restricted_parallel_subjects"] = [tuple(entry) for entry in data.get("restricted_parallel_subjects", [])]
+    school.setdefault("prefer_block_subjects", {})
+    return school, None
+
+
+def school_problems(school):
+    """
+    Returns:
+        The problems found by `check_feasibility()` in the school snapshot, empty if none.
+    """
+    return check_feasibility(
+        school["classes"], school["subjects"], school["class_subject_hours"], school["teachers_info"],
+        school["restricted_parallel_subjects"], school["hours_per_day"], school["max_hours_per_day"],
+        len(school["days"])
+    )
+
+
+def solve_timetable(school, options=None, max_time_in_seconds=DEFAULT_TIME_LIMIT, num_workers=1,
+                    previous=None, snapshot=None, cpu_time_limit=0):
+    """
+    Checks and solves the timetable of one school.
+
+    Args:
+        school (dict): School data snapshot (see solver/model.py).
+        options (dict, optional): Options of the solve (see `solver.worker.solve_school()`), default: monolithic integer model.
+        max_time_in_seconds (float): Time limit of the solver.
+        num_workers (int): Number of search workers.
+        previous (dict, optional): {"school", "snapshot"} of an earlier run (for the incremental strategy).
+        snapshot (dict, optional): Timetable used as warm start (see solver/hints.py).
+        cpu_time_limit (float): CPU time limit of the process in seconds (0 for no limit).
+
+    Returns:
+        dict with
+        - 'result': the result with status 'success' (timetables, statistics), 'no_solution' or 'infeasible' (problems)
+        - 'snapshot': snapshot of the found timetable, None without a solution
+    """
+    started = time.perf_counter()
+    problems = school_problems(school)
+    feasibility = round(time.perf_counter() - started, 4)
+    if problems:
+        return {
+            "result": {"status": "infeasible", "problems": problems, "statistics": {"timings": {"feasibility": feasibility}}},
+            "snapshot": None
+        }
+
+    solved = solve_school(school, options or {}, max_time_in_seconds, num_workers, previous, snapshot, cpu_time_limit)
+    solved["result"]["statistics"]["timings"] = {"feasibility": feasibility, **solved["result"]["statistics"]["timings"]}
+    return solved
@@ -0,0 +1,140 @@
+"""
+This module adds symmetry-breaking constraints to the timetable model.
+
+Many schools have parallel classes with identical curricula (e.g. 5a/5b/5c) and teachers
+with identical subjects and `max_hours`. Every permutation of such classes or teachers
+turns one timetable into another one with the same objective, and the solver wastes time
+exploring these permutations. The constraints below only keep one representative of each
+group of permuted timetables.
+
+Functionality:
+- `find_equivalent_classes()`:
+  Groups classes with identical curricula.
+
+- `find_equivalent_teachers()`:
+  Groups teachers with identical subjects and `max_hours`.
+
+- `add_symmetry_breaking()`:
+  - identical classes: the teacher vectors (`constant_teacher` of every subject) of the classes
+    are lexicographically ordered,
+  - identical teachers: value precedence on `constant_teacher`, i.e. a teacher of a group may only
+    be used for a (class, subject) pair once the previous teacher of the group was used for an
+    earlier pair.
+
+Both rules use the same order of the (class, subject) pairs (classes in class order, subjects by
+subject index), so the lexicographically smallest timetable of every group of permuted timetables
+satisfies both of them at the same time.
+They require that the model chooses the teachers itself, so they are not used with fixed teachers.
+"""
+
+
+def find_equivalent_classes(school):
+    """
+    Returns:
+        A list of groups (lists of class names in class order) with at least two classes
+        sharing the same subjects and weekly hours.
+    """
+    groups = {}
+    for c in school["classes"]:
+        key = frozenset(school["class_subject_hours"][c].items())
+        groups.setdefault(key, []).append(c)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def find_equivalent_teachers(school, teacher_indices):
+    """
+    Expects the school data and the mapping {Tid: teacher index}.
+
+    Returns:
+        A list of groups (sorted lists of teacher indices) with at least two teachers
+        sharing the same subjects and max_hours.
+    """
+    groups = {}
+    for tid, info in school["teachers_info"].items():
+        key = (frozenset(info["subjects"]), info["max_hours"])
+        groups.setdefault(key, []).append(teacher_indices[tid])
+    return [sorted(group) for group in groups.values() if len(group) > 1]
+
+
+def add_lex_less_equal(model, left, right, name):
+    """
+    Adds the constraint left <= right in lexicographic order for two equally long
+    lists of integer expressions.
+    """
+    # prefix_equal: all positions before the current one are equal so far
+    prefix_equal = model.NewConstant(1)
+    for k, (a, b) in enumerate(zip(left, right)):
+        # while the prefix is equal, the current position may not be greater
+        model.Add(a <= b).OnlyEnforceIf(prefix_equal)
+
+        if k == len(left) - 1:
+            break
+
+        equal = model.NewBoolVar(f'{name}_eq_{k}')
+        model.Add(a == b).OnlyEnforceIf(equal)
+        model.Add(a != b).OnlyEnforceIf(equal.Not())
+
+        # equal prefix and equal position ⇒ the prefix stays equal
+        next_prefix_equal = model.NewBoolVar(f'{name}_prefix_{k}')
+        model.AddBoolOr([prefix_equal.Not(), equal.Not(), next_prefix_equal])
+        prefix_equal = next_prefix_equal
+
+
+def add_symmetry_breaking(model, school, variables, subject_indices, teacher_indices):
+    """
+    Adds the symmetry-breaking constraints for identical classes and teachers.
+
+    Args:
+        model (cp_model.CpModel): Timetable model.
+        school (dict): School data snapshot (see solver/model.py).
+        variables (dict): 'constant_teacher' of the model.
+        subject_indices (dict): {subject: index}
+        teacher_indices (dict): {Tid: index}
+
+    Returns:
+        dict with the number of 'class_groups' and 'teacher_groups' that were found.
+    """
+    constant_teacher = variables["constant_teacher"]
+
+    # common order of the (class, subject) pairs: classes in class order, subjects by subject index
+    def subjects_of(c):
+        return sorted(school["class_subject_hours"][c], key=lambda subject: subject_indices[subject])
+
+    ordered_pairs = [(c, subject) for c in school["classes"] for subject in subjects_of(c)]
+
+    # Identical classes: order them by the teachers of their subjects
+    class_groups = find_equivalent_classes(school)
+    for group in class_groups:
+        for first, second in zip(group, group[1:]):
+            add_lex_less_equal(
+                model,
+                [constant_teacher[(first, subject)] for subject in subjects_of(first)],
+                [constant_teacher[(second, subject)] for subject in subjects_of(second)],
+                f'lex_{first}_{second}'
+            )
+
+    # Identical teachers: value precedence on constant_teacher
+    # (teacher t_next may only teach a pair if t_prev teaches an earlier pair)
+    teacher_groups = find_equivalent_teachers(school, teacher_indices)
+    for group in teacher_groups:
+        # all (class, subject) pairs the teachers of this group can teach, in a fixed order
+        subjects_of_group = next(
+            info["subjects"] for tid, info in school["teachers_info"].items() if teacher_indices[tid] == group[0]
+        )
+        pairs = [pair for pair in ordered_pairs if pair[1] in subjects_of_group]
+
+        for t_prev, t_next in zip(group, group[1:]):
+            # seen_prev: t_prev teaches one of the pairs before the current one
+            seen_prev = model.NewConstant(0)
+            for i, pair in enumerate(pairs):
+                uses_prev = model.NewBoolVar(f'uses_{t_prev}_{i}')
+                model.Add(constant_teacher[pair] == t_prev).OnlyEnforceIf(uses_prev)
+                model.Add(constant_teacher[pair] != t_prev).OnlyEnforceIf(uses_prev.Not())
+
+                model.Add(constant_teacher[pair] != t_next).OnlyEnforceIf(seen_prev.Not())
+
+                next_seen_prev = model.NewBoolVar(f'seen_{t_prev}_{i}')
+                model.AddBoolOr([seen_prev, uses_prev]).OnlyEnforceIf(next_seen_prev)
+                seen_prev = next_seen_prev
+
+    return {"class_groups": len(class_groups), "teacher_groups": len(teacher_groups)}
@@ -0,0 +1,230 @@
+from ortools.sat.python import cp_model
+from .model import build_timetable_model, unpack_school, MODEL_BACKENDS
+from .hints import add_solution_hints, teacher_hints
+from .instrumentation import measure, instrument, record_solve
+import time
+
+"""
+This module implements the decomposed (two-phase) timetable solve.
+
+Functionality:
+- `assign_teachers()`:
+  Phase 1. Picks a teacher for every (class, subject) pair with a small assignment model
+  built from the teacher qualifications and their `max_hours`.
+
+- `solve_two_phase()`:
+  Runs phase 1 and then phase 2, the placement of all lessons in time slots with the teachers
+  fixed (see `build_timetable_model(fixed_teachers=...)`). Phase 2 has no per-slot teacher
+  variables at all. If phase 2 is infeasible because of teacher clashes, the teachers involved
+  are determined via assumptions and their current assignment is excluded from phase 1
+  before the next round.
+
+- `minimize_core()`:
+  Shrinks the teachers of an infeasibility core by deletion. The core of a solve with several
+  workers is sufficient but rarely minimal, and a cut over too many teachers excludes little more
+  than the one assignment it was found for.
+
+Technologies:
+- OR-Tools (cp_model) for constraint solving
+"""
+
+
+def assign_teachers(school, excluded_assignments=(), max_time_in_seconds=10.0, num_workers=3, hints=None):
+    """
+    Phase 1: assigns one qualified teacher to every (class, subject) pair.
+
+    Args:
+        school (dict): School data snapshot (see solver/model.py).
+        excluded_assignments (list): Conflicts of earlier rounds, each a list of
+            ((class, subject), teacher index) that must not be chosen all together again.
+        max_time_in_seconds (float): Time limit for the assignment model.
+        num_workers (int): Number of search workers.
+        hints (dict, optional): {(class, subject): teacher index} of an earlier solution (warm start).
+
+    Returns:
+        {(class, subject): teacher index}, or None if no assignment exists.
+    """
+    classes = school["classes"]
+    class_subject_hours = school["class_subject_hours"]
+    teachers_info = school["teachers_info"]
+    slots_per_week = len(school["days"]) * school["hours_per_day"]
+    _, _, _, teacher_indices = unpack_school(school)
+
+    model = cp_model.CpModel()
+
+    # assigned[(class, subject, teacher index)] = True ⇔ the teacher teaches the subject in the class
+    assigned = {}
+    for c in classes:
+        for subject in class_subject_hours[c]:
+            options = []
+            for tid, info in teachers_info.items():
+                if subject in info["subjects"]:
+                    b = model.NewBoolVar(f'assign_{c}_{subject}_{tid}')
+                    assigned[(c, subject, teacher_indices[tid])] = b
+                    options.append(b)
+
+            # Every subject of a class is taught by exactly one teacher
+            model.AddExactlyOne(options)
+
+    # Weekly workload of every teacher within their max_hours (and within the slots of a week)
+    loads = []
+    for tid, info in teachers_info.items():
+        t_idx = teacher_indices[tid]
+        load = sum(
+            class_subject_hours[c][subject] * b
+            for (c, subject, t), b in assigned.items() if t == t_idx
+        )
+        model.Add(load <= min(info["max_hours"], slots_per_week))
+        loads.append(load)
+
+    # Conflicts found in phase 2: the same set of assignments must not be chosen again
+    for conflict in excluded_assignments:
+        model.AddBoolOr([assigned[(c, subject, t_idx)].Not() for (c, subject), t_idx in conflict])
+
+    # Warm start: prefer the teachers of the last timetable
+    hints = hints or {}
+    for (c, subject, t_idx), b in assigned.items():
+        if (c, subject) in hints:
+            model.AddHint(b, int(t_idx == hints[(c, subject)]))
+
+    # Spread the lessons over the teachers: the busiest teacher is the most likely to cause clashes
+    if loads:
+        max_load = model.NewIntVar(0, slots_per_week, 'max_load')
+        model.AddMaxEquality(max_load, loads)
+        model.Minimize(max_load)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = max_time_in_seconds
+    solver.parameters.num_search_workers = num_workers
+    status = solver.Solve(model)
+
+    if status not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+        return None
+
+    return {
+        (c, subject): t_idx
+        for (c, subject, t_idx), b in assigned.items()
+        if solver.BooleanValue(b)
+    }
+
+
+def minimize_core(model, clash_free, conflict_teachers, max_time_in_seconds):
+    """
+    Deletion-based minimization of an infeasibility core: every teacher whose clash constraints
+    can be dropped while phase 2 stays infeasible is removed from the core.
+
+    Every check is a solve with one worker (its core is read from its own conflict analysis) and
+    only the clash constraints of the remaining teachers as assumptions. A check that finds a
+    solution or runs out of time keeps the teacher, so the result is always a proven core.
+
+    Args:
+        model (cp_model.CpModel): Phase 2 model, its assumptions are replaced.
+        clash_free (dict): {teacher index: literal} of the clash constraints (see `build_timetable_model()`).
+        conflict_teachers (set): Teacher indices of the core found by the phase 2 solve.
+        max_time_in_seconds (float): Time limit for all checks together.
+
+    Returns:
+        set of teacher indices, a subset of `conflict_teachers`.
+    """
+    deadline = time.monotonic() + max_time_in_seconds
+    core = set(conflict_teachers)
+
+    for t_idx in sorted(conflict_teachers):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        if t_idx not in core or len(core) == 1:
+            continue
+
+        candidates = core - {t_idx}
+        model.ClearAssumptions()
+        model.AddAssumptions([clash_free[t] for t in sorted(candidates)])
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = remaining
+        solver.parameters.num_search_workers = 1
+        if solver.Solve(model) == cp_model.INFEASIBLE:
+            # infeasible without the teacher, the core of this solve may drop further teachers
+            found = set(solver.SufficientAssumptionsForInfeasibility())
+            core = {t for t in candidates if clash_free[t].Index() in found} or candidates
+
+    return core
+
+
+def solve_two_phase(school, model_backend=MODEL_BACKENDS[0], max_time_in_seconds=60.0, num_workers=3,
+                    solution_callback=None, max_rounds=5, snapshot=None, relative_gap_limit=0.0):
+    """
+    Solves the timetable in two phases: teacher assignment first, then time-slot scheduling.
+
+    Args:
+        school (dict): School data snapshot (see solver/model.py).
+        model_backend (str): Model formulation of phase 2, one of MODEL_BACKENDS.
+        max_time_in_seconds (float): Time limit for all rounds together.
+        num_workers (int): Number of search workers.
+        solution_callback (cp_model.CpSolverSolutionCallback, optional): Passed to the phase 2 solves.
+        max_rounds (int): Maximum number of phase 1 / phase 2 rounds.
+        snapshot (dict, optional): Earlier solution used as hints in both phases (see solver/hints.py).
+        relative_gap_limit (float): Phase 2 stops once within this relative gap of its optimum (0 to disable).
+
+    Returns:
+        (solver, status, variables, rounds) of the last phase 2 solve. variables is None
+        (and status INFEASIBLE) if phase 1 found no teacher assignment.
+    """
+    start = time.monotonic()
+    conflicts = []
+    solver, status, variables, rounds = cp_model.CpSolver(), cp_model.INFEASIBLE, None, 0
+    hints = teacher_hints(school, snapshot) if snapshot else None
+
+    for rounds in range(1, max_rounds + 1):
+        remaining = max_time_in_seconds - (time.monotonic() - start)
+        if remaining <= 0:
+            break
+
+        # Phase 1: teacher for every (class, subject), at most a tenth of the remaining time
+        with measure(solution_callback, "teacher_assignment"):
+            assignment = assign_teachers(school, conflicts, max(1.0, remaining / 10), num_workers, hints)
+        if assignment is None:
+            return solver, cp_model.INFEASIBLE, None, rounds
+
+        # Phase 2: place the lessons with fixed teachers
+        with measure(solution_callback, "model_build"):
+            variables = build_timetable_model(school, model_backend, fixed_teachers=assignment)
+            model = variables["model"]
+            if snapshot:
+                add_solution_hints(school, variables, snapshot)
+            clash_free = variables["teacher_clash_free"]
+            model.AddAssumptions(list(clash_free.values()))
+        if hasattr(solution_callback, "track"):
+            # the progress callback reports provisional timetables of this model (see solver/worker.py)
+            solution_callback.track(school, variables)
+
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = max(1.0, max_time_in_seconds - (time.monotonic() - start))
+        solver.parameters.num_search_workers = num_workers
+        solver.parameters.relative_gap_limit = relative_gap_limit
+        instrument(solver)
+        status = solver.Solve(model, solution_callback)
+        record_solve(solution_callback, solver)
+
+        if status != cp_model.INFEASIBLE:
+            return solver, status, variables, rounds
+
+        # Which teachers' clash constraints are part of the infeasibility?
+        core = set(solver.SufficientAssumptionsForInfeasibility())
+        conflict_teachers = {t_idx for t_idx, literal in clash_free.items() if literal.Index() in core}
+        if not conflict_teachers:
+            # infeasible regardless of the teacher assignment
+            return solver, status, variables, rounds
+
+        # The smaller the core, the more assignments the cut excludes; at most a tenth of the remaining time
+        with measure(solution_callback, "core_minimization"):
+            remaining = max_time_in_seconds - (time.monotonic() - start)
+            conflict_teachers = minimize_core(model, clash_free, conflict_teachers, remaining / 10)
+
+        # Feed the conflict back to phase 1
+        conflicts.append([
+            ((c, subject), t_idx)
+            for (c, subject), t_idx in assignment.items()
+            if t_idx in conflict_teachers
+        ])
+
+    return solver, status, variables, rounds
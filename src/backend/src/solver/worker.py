@@ -0,0 +1,415 @@
+from ortools.sat.python import cp_model
+from .model import MODEL_BACKENDS, extract_compact
+from .model_cache import build_cached_model
+from .hints import solution_snapshot, add_solution_hints
+from .incremental import solve_incremental
+from .two_phase import solve_two_phase
+from .portfolio import solve_portfolio, class_differences
+from .instrumentation import new_recording, measure, instrument, record_solve, model_size, recording
+import threading
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:  # not available on Windows, the limits are skipped there
+    resource = None
+
+"""
+This module contains the solve of one timetable job as it runs in a solver worker process
+(see utils/solver_pool.py). It only works on plain data (the school snapshot and the options)
+and returns plain data, so it can be executed in another process than the Flask API.
+
+Functionality:
+- `init_worker()`:
+  Initializer of a worker process. Imports OR-Tools once, sets the memory limit, the
+  queue the progress of the jobs is reported to and the cancellation requests of the API.
+
+- `serve()`:
+  Main loop of a worker process of the solver pool: runs the jobs received through a pipe one
+  after the other and sends their results (or exceptions) back.
+
+- `solve_school()`:
+  Builds and solves the timetable model of one job with the selected strategy and returns
+  the result (timetables and statistics) together with the snapshot for later warm starts.
+
+- `SolveProgress`:
+  Solution callback that counts the solutions, remembers when the first one was found and
+  reports solution count, objective, bound, gap and elapsed time of a job (at most every
+  PROGRESS_INTERVAL seconds) as (job_id, progress) to the progress queue. The first solution
+  and then the best one every PROVISIONAL_INTERVAL seconds (or longer for big models) are also
+  reported as provisional timetable ('timetable' of the progress, in the compact format of `extract_compact()`).
+  It also records the time of the phases and the CP-SAT statistics of the job (see solver/instrumentation.py).
+
+- `watch_stop_criteria()`:
+  Thread running next to the solve that stops the search if the job was cancelled by the API
+  (see utils/solver_pool.py) or the objective has not improved for `stagnation_seconds`.
+  Stopping at a relative optimality gap is left to CP-SAT (`relative_gap_limit`), which also
+  sees improvements of the bound between two solutions.
+
+Technologies:
+- OR-Tools (cp_model) for constraint solving
+- resource limits (RLIMIT_AS, RLIMIT_CPU) of the worker process
+"""
+
+
+# queue for the progress of the jobs (set by init_worker, read by utils/solver_pool.py)
+progress_queue = None
+
+# minimum time in seconds between two progress reports of a job
+PROGRESS_INTERVAL = 0.5
+
+# minimum time in seconds between two provisional timetables of a job; the search waits while the
+# timetable is extracted, so the interval is at least PROVISIONAL_COST_FACTOR times the extraction time
+PROVISIONAL_INTERVAL = 2.0
+PROVISIONAL_COST_FACTOR = 10
+
+# cancellation requests of the API process (job_id -> reason, set by init_worker)
+cancel_requests = None
+
+# seconds between two checks of the stop criteria of a running job
+STOP_CHECK_INTERVAL = 0.2
+
+
+class SolveProgress(cp_model.CpSolverSolutionCallback):
+    """
+    Solution callback that records the progress of a job and reports it to the progress queue.
+    The time of the first solution is used to compare the model formulations by time-to-first-feasible.
+    Provisional timetables are only reported for the model set by `track()`.
+    """
+
+    def __init__(self, job_id=None):
+        super().__init__()
+        self.job_id = job_id
+        self.start = time.monotonic()
+        self.solutions = 0
+        self.first_solution_time = None
+        self.last_report = None
+        # time of the last (improving) solution, and why the search was stopped early
+        self.last_solution = None
+        self.stop_reason = None
+        # model of the running solve, and when the next provisional timetable is due
+        self.school = None
+        self.variables = None
+        self.next_timetable = None
+        # seconds per phase and summed CP-SAT statistics of all solves of the job (see solver/instrumentation.py)
+        self.timings, self.solver_statistics = new_recording()
+
+    def track(self, school, variables):
+        """
+        Sets the school data and the variables (see solver/model.py) of the model solved next,
+        the provisional timetables are extracted from them.
+        """
+        self.school = school
+        self.variables = variables
+
+    def on_solution_callback(self):
+        self.solutions += 1
+        if self.first_solution_time is None:
+            self.first_solution_time = self.WallTime()
+
+        # every solution reported by CP-SAT improves the objective of its solve
+        now = time.monotonic()
+        self.last_solution = now
+        if progress_queue is None or self.job_id is None:
+            return
+
+        timetable_due = self.variables is not None and (self.next_timetable is None or now >= self.next_timetable)
+        if not timetable_due and self.last_report is not None and now - self.last_report < PROGRESS_INTERVAL:
+            return
+        self.last_report = now
+
+        objective = self.ObjectiveValue()
+        bound = self.BestObjectiveBound()
+        progress = {
+            "solutions": self.solutions,
+            "objective": objective,
+            "best_bound": bound,
+            # relative distance between the best timetable and the best possible one
+            "gap": round(abs(bound - objective) / max(1.0, abs(bound)), 4),
+            # since the start of the job (two-phase and incremental solves run several rounds)
+            "elapsed": round(now - self.start, 2)
+        }
+
+        if timetable_due:
+            # the callback offers the same Value() as the solver, so the final extraction is reused
+            progress["timetable"] = extract_compact(self, self.school, self.variables)
+            cost = time.monotonic() - now
+            self.next_timetable = time.monotonic() + max(PROVISIONAL_INTERVAL, PROVISIONAL_COST_FACTOR * cost)
+
+        progress_queue.put((self.job_id, progress))
+
+    def stop(self, reason):
+        """
+        Stops the running solve. The reason of the first stop is kept, later rounds of the
+        two-phase and incremental strategies are stopped the same way.
+        """
+        if self.stop_reason is None:
+            self.stop_reason = reason
+        self.StopSearch()
+
+
+def watch_stop_criteria(progress, stagnation_seconds, done):
+    """
+    Stops the solve of `progress` when the job is cancelled or the objective has not improved for
+    `stagnation_seconds` (0 to disable) after the first solution. Runs until `done` is set.
+    """
+    while not done.wait(STOP_CHECK_INTERVAL):
+        reason = None
+        if cancel_requests is not None and progress.job_id is not None:
+            reason = cancel_requests.get(progress.job_id)
+
+        if reason is None and progress.stop_reason is None and stagnation_seconds > 0 \
+                and progress.last_solution is not None \
+                and time.monotonic() - progress.last_solution > stagnation_seconds:
+            reason = 'stagnation'
+
+        # once stopped, every check stops the next round of the strategy as well
+        if reason is not None or progress.stop_reason is not None:
+            progress.stop(reason)
+
+
+def init_worker(memory_limit=0, queue=None, cancellations=None):
+    """
+    Initializes a worker process. Every job of the process may use at most `memory_limit` bytes
+    of address space (0 for no limit). The process runs one job at a time, so this is a per-job limit.
+    The progress of the jobs is reported to `queue`, `cancellations` (job_id -> reason) is shared
+    with the API process.
+    """
+    global progress_queue, cancel_requests
+    progress_queue = queue
+    cancel_requests = cancellations
+    if resource and memory_limit > 0:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard))
+
+
+def warm_up():
+    """
+    Empty job that makes the pool start a worker process (and import OR-Tools) ahead of the first solve.
+    """
+    return cp_model.CpModel() is not None
+
+
+def serve(connection, memory_limit=0, queue=None, cancellations=None):
+    """
+    Main loop of a worker process (see utils/solver_pool.py). Receives (function, args) through
+    `connection` and answers with ("result", value) or ("error", exception, traceback text),
+    until the pipe is closed or None is received.
+    """
+    init_worker(memory_limit, queue, cancellations)
+    warm_up()
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+
+        function, args = task
+        try:
+            answer = ("result", function(*args))
+        except Exception as e:
+            answer = ("error", e, traceback.format_exc())
+        try:
+            connection.send(answer)
+        except Exception as e:
+            # e.g. an exception that cannot be pickled, the API still has to learn about the failure
+            connection.send(("error", RuntimeError(repr(answer[1])), repr(e)))
+
+
+def set_cpu_time_limit(seconds):
+    """
+    Limits the CPU time of the current job to `seconds` (0 for no limit). RLIMIT_CPU counts the CPU time
+    of the whole process, so the limit is set relative to the time already used by earlier jobs.
+    The process is terminated by the operating system if the limit is exceeded.
+    """
+    if not resource:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if seconds <= 0:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def run_strategy(school, options, max_time_in_seconds, num_workers, previous, snapshot, progress):
+    """
+    Runs the solve strategy of a job (see `solve_school()`).
+
+    Returns:
+        (solver, status, variables, details) where details holds 'rounds', 'hints', 'free_classes',
+        'model_cache_hit' and 'alternatives' of the strategy (None where not applicable).
+    """
+    model_backend = options.get("model_backend", MODEL_BACKENDS[0])
+    strategy = options.get("strategy", "monolithic")
+    symmetry_breaking = options.get("symmetry_breaking", False)
+    stop_gap = options.get("stop_gap", 0.0)
+    details = {"rounds": None, "hints": None, "free_classes": None, "model_cache_hit": None, "alternatives": None}
+
+    if strategy == 'incremental' and previous:
+        # Keep the classes not touched by the changes, re-optimize the rest (see solver/incremental.py)
+        solver, status, variables, details["rounds"], details["free_classes"] = solve_incremental(
+            school, previous["school"], previous["snapshot"], model_backend,
+            max_time_in_seconds, num_workers, progress, relative_gap_limit=stop_gap
+        )
+
+    elif strategy == 'two_phase':
+        # Teacher assignment first, then time-slot scheduling with fixed teachers (see solver/two_phase.py)
+        solver, status, variables, details["rounds"] = solve_two_phase(
+            school, model_backend, max_time_in_seconds, num_workers, progress, snapshot=snapshot,
+            relative_gap_limit=stop_gap
+        )
+
+    elif strategy == 'portfolio':
+        # The k best distinct timetables from parallel searches (see solver/portfolio.py)
+        solver, status, variables, details["rounds"], details["alternatives"] = solve_portfolio(
+            school, model_backend, max_time_in_seconds, num_workers, progress,
+            alternatives=options.get("alternatives", 3), min_difference=options.get("min_difference"),
+            snapshot=snapshot, relative_gap_limit=stop_gap
+        )
+
+    else:
+        # Build the model (see solver/model.py for all constraints and soft preferences),
+        # or load it from the model cache if it was built for the same data before
+        with measure(progress, "model_build"):
+            variables, details["model_cache_hit"] = build_cached_model(school, model_backend, symmetry_breaking)
+            model = variables["model"]
+
+            # Warm start from the last timetable (only where classes, subjects and teachers still exist)
+            if snapshot:
+                details["hints"] = add_solution_hints(school, variables, snapshot)
+        progress.track(school, variables)
+
+        # Configure and run the solver
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = max_time_in_seconds
+        solver.parameters.num_search_workers = num_workers  # Number of CPU cores to use
+        # stop as soon as the timetable is proven to be within this relative distance of the optimum
+        solver.parameters.relative_gap_limit = stop_gap
+        # solver.parameters.linearization_level = 0  # Lower complexity (optional)
+        # solver.parameters.cp_model_presolve = True  # Use presolve (optional)
+        # the search log tells presolve and search time apart (only with SOLVER_SEARCH_LOG)
+        instrument(solver)
+
+        status = solver.Solve(model, progress)
+        record_solve(progress, solver)
+
+    return solver, status, variables, details
+
+
+def solve_school(school, options, max_time_in_seconds, num_workers, previous=None, snapshot=None, cpu_time_limit=0,
+                 job_id=None):
+    """
+    Solves the timetable of one school.
+
+    Args:
+        school (dict): School data snapshot (see solver/model.py).
+        options (dict): 'model_backend', 'strategy' and 'symmetry_breaking' of the job, the optional
+            stop criteria 'stop_gap' (relative optimality gap) and 'stagnation_seconds' (0 to disable), and
+            'alternatives' and 'min_difference' of the portfolio strategy.
+        max_time_in_seconds (float): Time limit of the solver.
+        num_workers (int): Number of search workers.
+        previous (dict, optional): {"school", "snapshot"} of the last successful run of the user
+            (required for the incremental strategy).
+        snapshot (dict, optional): Timetable used as warm start (see solver/hints.py).
+        cpu_time_limit (float): CPU time limit of the job in seconds (0 for no limit).
+        job_id (str, optional): ID of the job, used for its progress reports.
+
+    Returns:
+        dict with
+        - 'result': the job result with status 'success' (timetables, statistics) or 'no_solution'
+        - 'snapshot': snapshot of the found timetable, None without a solution
+    """
+    set_cpu_time_limit(cpu_time_limit)
+
+    model_backend = options.get("model_backend", MODEL_BACKENDS[0])
+    strategy = options.get("strategy", "monolithic")
+    symmetry_breaking = options.get("symmetry_breaking", False)
+    stop_gap = options.get("stop_gap", 0.0)
+    stagnation_seconds = options.get("stagnation_seconds", 0.0)
+
+    progress = SolveProgress(job_id)
+
+    # cancellation and stagnation are checked next to the solve, most runs find their final
+    # objective early and spend the rest of the time limit proving it
+    done = threading.Event()
+    threading.Thread(target=watch_stop_criteria, args=(progress, stagnation_seconds, done), daemon=True).start()
+    try:
+        solver, status, variables, details = run_strategy(
+            school, options, max_time_in_seconds, num_workers, previous, snapshot, progress
+        )
+    finally:
+        done.set()
+
+    # CP-SAT reports OPTIMAL when it stops at the gap limit, the timetable is then only near-optimal
+    if stop_gap > 0 and status == cp_model.OPTIMAL and solver.ObjectiveValue() != solver.BestObjectiveBound():
+        progress.stop_reason = progress.stop_reason or 'gap'
+
+    # key figures of the run, used to compare the model formulations on the same school data
+    statistics = {
+        "model": model_backend,
+        "strategy": strategy,
+        "rounds": details["rounds"],
+        "symmetry_breaking": symmetry_breaking,
+        "symmetry": variables["symmetry"] if variables else None,
+        "warm_start": snapshot is not None,
+        "hints": details["hints"],
+        "free_classes": details["free_classes"],
+        "model_cache_hit": details["model_cache_hit"],
+        "objective": solver.ObjectiveValue() if status in [cp_model.OPTIMAL, cp_model.FEASIBLE] else None,
+        "best_bound": solver.BestObjectiveBound(),
+        "solver_status": solver.StatusName(status),
+        "solutions": progress.solutions,
+        "first_solution_time": progress.first_solution_time,
+        "wall_time": solver.WallTime(),
+        # 'cancelled', 'superseded', 'gap' or 'stagnation' if the search was stopped early
+        "stop_reason": progress.stop_reason,
+        # size of the solved model, the time per phase follows once the timetables are extracted
+        "model_size": model_size(variables) if variables else None
+    }
+
+    # if solver found a solution that satisfies all constraints as optimal as possible,
+    # then he is done and we can extract the results.
+    # if time runs out, but the solver found a feasible solution, the solver will return it, which is also acceptable.
+
+    if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+        result = {
+            "status": "success",
+            "statistics": statistics,
+            "cached": False,
+            # only the monolithic model proves optimality for the whole timetable
+            "optimal": status == cp_model.OPTIMAL and strategy == 'monolithic' and progress.stop_reason is None
+        }
+
+        with measure(progress, "extraction"):
+            # Build the timetable for each class and teacher in the compact format, the job store keeps it
+            # that way and the API expands it into the format of the frontend (see utils/result_format.py)
+            result.update(extract_compact(solver, school, variables))
+
+            # the alternatives of the portfolio strategy, best first, with their differences to the best one
+            if details["alternatives"] is not None:
+                result["alternatives"] = [
+                    {
+                        "objective": alternative["objective"],
+                        "subject_grid": alternative["subject_grid"],
+                        "teacher_grid": alternative["teacher_grid"],
+                        "differences": class_differences(alternative, result)
+                    }
+                    for alternative in details["alternatives"]
+                ]
+
+            found = solution_snapshot(solver, school, variables)
+        statistics.update(recording(progress))
+
+        return {"result": result, "snapshot": found}
+
+    # in case the solver did not find a solution, no timetable has to be returned.
+    statistics.update(recording(progress))
+    return {"result": {"status": "no_solution", "statistics": statistics}, "snapshot": None}
+
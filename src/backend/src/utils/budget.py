@@ -0,0 +1,114 @@
+import math
+import os
+
+"""
+This module decides how many search workers and how much time a timetable computation gets.
+
+`max_time_for_solving` of the user settings is the time the user is willing to wait. A job gets
+that time as its time limit, and a big school solving alone at night may use the whole machine
+and more time. A small school, or any school while others wait in the queue, should not hold its
+workers that long once its timetable stops improving: it stops when the objective has stalled for
+a time derived from its size and the queue (a proven optimum ends every solve anyway).
+
+Functionality:
+- `instance_size()`:
+  Size of a school as classes x slots per week x subjects.
+
+- `allocate_budget()`:
+  Number of search workers from the free cores, the queue depth and the instance size, and
+  the time limit: the requested time, stretched for big schools on an idle server, and the
+  stagnation time after which a small school or a job on a busy server stops. Both limits are
+  bounded by the ceilings configured by the administrator, only SOLVER_MAX_TIME limits a job
+  to less than the requested time. Jobs computing several alternative
+  timetables (portfolio strategy) expect one solve per round of parallel searches.
+
+Configuration (environment variables):
+- SOLVER_MAX_WORKERS: maximum search workers of one job (default: number of CPU cores)
+- SOLVER_MAX_TIME: maximum time limit of one job in seconds (default: 600)
+- SOLVER_MIN_TIME: expected solve time of the smallest school in seconds, the base of the stretch,
+  and the shortest stagnation time (default: 5)
+- SOLVER_STALL_FACTOR: a job whose requested time exceeds this multiple of its expected time, or
+  that runs while others wait, stops after the objective has not improved for this multiple of its
+  expected time, shared with the queue (default: 2, 0 disables the stop)
+"""
+
+
+CPU_COUNT = os.cpu_count() or 1
+
+SOLVER_MAX_WORKERS = int(os.environ.get("SOLVER_MAX_WORKERS", CPU_COUNT))
+SOLVER_MAX_TIME = float(os.environ.get("SOLVER_MAX_TIME", 600))
+SOLVER_MIN_TIME = float(os.environ.get("SOLVER_MIN_TIME", 5))
+SOLVER_STALL_FACTOR = float(os.environ.get("SOLVER_STALL_FACTOR", 2))
+
+# instance sizes up to which a school counts as small or medium (classes x slots x subjects)
+SMALL_INSTANCE = 2000
+MEDIUM_INSTANCE = 10000
+
+# expected solve time: SOLVER_MIN_TIME plus one second per this many size units
+SIZE_PER_SECOND = 200
+
+# an idle server may give a big school up to this multiple of the requested time
+MAX_STRETCH = 2.0
+
+
+def instance_size(school):
+    """
+    Returns:
+        classes x slots per week x subjects of the school data (see solver/model.py).
+    """
+    slots = len(school["days"]) * school["hours_per_day"]
+    return len(school["classes"]) * slots * len(school["subjects"])
+
+
+def allocate_budget(school, requested_time, load, alternatives=1):
+    """
+    Args:
+        school (dict): School data snapshot (see solver/model.py).
+        requested_time (float): `max_time_for_solving` of the user settings.
+        load (dict): 'running' (other running jobs), 'queued' (waiting jobs) and
+            'allocated_workers' (search workers of the other running jobs), see SolveScheduler.load().
+        alternatives (int): Number of timetables of the job, searched in parallel on the workers (see solver/portfolio.py).
+
+    Returns:
+        (num_workers, time_limit, stagnation_seconds) of the job. The time limit is at least
+        `requested_time` unless that exceeds SOLVER_MAX_TIME, stagnation_seconds is 0 if the job
+        may use all of it.
+    """
+    size = instance_size(school)
+    idle = load["running"] == 0 and load["queued"] == 0
+
+    # Workers: small schools do not profit from many workers, big ones use what is free
+    if size <= SMALL_INSTANCE:
+        wanted = 2
+    elif size <= MEDIUM_INSTANCE:
+        wanted = 4
+    else:
+        wanted = CPU_COUNT
+
+    # leave a share of the free cores to the jobs waiting in the queue
+    free = max(0, CPU_COUNT - load["allocated_workers"])
+    share = free // (1 + load["queued"])
+    num_workers = max(1, min(wanted, share, SOLVER_MAX_WORKERS))
+
+    # Time: what a school of this size usually needs, once per round of parallel searches
+    expected = (SOLVER_MIN_TIME + size / SIZE_PER_SECOND) * math.ceil(alternatives / num_workers)
+
+    # the user gets at least the requested time, a job that finishes earlier frees its workers anyway
+    time_limit = requested_time
+
+    # a big school alone on the server may take longer than requested
+    if idle and expected > requested_time:
+        time_limit = min(expected, MAX_STRETCH * requested_time)
+
+    # the ceiling of the administrator is the only limit below the requested time
+    time_limit = min(time_limit, SOLVER_MAX_TIME)
+
+    # small schools and jobs with others waiting stop once their objective stalls,
+    # the stall time shrinks with the queue, but not below SOLVER_MIN_TIME
+    stagnation_seconds = 0.0
+    if SOLVER_STALL_FACTOR > 0 and (SOLVER_STALL_FACTOR * expected < time_limit or load["queued"] > 0):
+        stagnation_seconds = max(SOLVER_MIN_TIME, SOLVER_STALL_FACTOR * expected / (1 + load["queued"]))
+        if stagnation_seconds >= time_limit:
+            stagnation_seconds = 0.0
+
+    return num_workers, time_limit, stagnation_seconds
@@ -0,0 +1,81 @@
+from flask import request
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # optional, responses are only gzip compressed without it
+    brotli = None
+
+"""
+This module compresses the responses of the API.
+
+Clients poll `/status/<job_id>` while a job is running, and every answer holds the timetables of all
+classes and teachers. JSON of timetables compresses very well, so responses are compressed with
+brotli (if installed) or gzip, whichever the client prefers in its `Accept-Encoding` header.
+
+Functionality:
+- `register_compression()`:
+  Compresses every response of a Flask app that is large enough, of a compressible type and not
+  streamed (the Server-Sent Events of the status stream are sent as they are).
+
+Configuration (environment variables):
+- COMPRESSION_MIN_BYTES: smaller responses are sent uncompressed (default: 1024)
+- COMPRESSION_LEVEL: gzip level, 1 (fast) to 9 (small) (default: 6)
+- BROTLI_QUALITY: brotli quality, 0 (fast) to 11 (small) (default: 5)
+
+Technologies:
+- gzip (standard library)
+- brotli (optional package `brotli`)
+"""
+
+
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", 1024))
+COMPRESSION_LEVEL = int(os.environ.get("COMPRESSION_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 5))
+
+# content types worth compressing, images and the like are compressed already
+COMPRESSIBLE_TYPES = ("application/json", "text/plain", "text/html", "text/css", "application/javascript")
+
+
+def available_encodings():
+    """
+    Returns:
+        The content encodings this process can produce, preferred first.
+    """
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compress(data, encoding):
+    """
+    Returns:
+        `data` compressed with the content encoding 'br' or 'gzip'.
+    """
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESSION_LEVEL)
+
+
+def register_compression(app):
+    """
+    Compresses the responses of `app` in the encoding preferred by the client. Responses that are
+    not compressed because of the client still get `Vary: Accept-Encoding`, so caches keep both variants apart.
+    """
+    @app.after_request
+    def compress_response(response):
+        if response.mimetype not in COMPRESSIBLE_TYPES or response.is_streamed or response.direct_passthrough:
+            return response
+        response.vary.add("Accept-Encoding")
+
+        # 304 and error responses without body, and responses that are encoded already
+        if response.status_code != 200 or "Content-Encoding" in response.headers:
+            return response
+
+        encoding = request.accept_encodings.best_match(available_encodings())
+        data = response.get_data()
+        if encoding is None or len(data) < COMPRESSION_MIN_BYTES:
+            return response
+
+        response.set_data(compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        return response
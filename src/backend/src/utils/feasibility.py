@@ -0,0 +1,158 @@
+"""
+This module provides a static feasibility analysis of the school data used for
+timetable generation. It runs on the loaded data before any CP-SAT model is built
+and detects over-constrained schools within milliseconds, instead of letting the
+solver search for the full `max_time_for_solving` without finding a solution.
+
+Functionality:
+- `check_feasibility()`:
+  Checks the school data against necessary conditions of the timetable model and
+  returns a list of structured problems. An empty list means that no obvious
+  contradiction was found (the model may still turn out to be infeasible).
+
+Checks:
+- classes without curriculum and parallel limits of unknown subjects (malformed data the model cannot be built from)
+- subjects of a class curriculum that are not part of the school subjects
+- required hours of a class against the available slots per week
+- subjects of a class curriculum that no teacher is qualified for
+- weekly hours of a subject in a class against the maximum hours per day
+- weekly hours of a subject in a class against the largest qualified teacher
+- total demand of a subject against the capacity of all qualified teachers
+- total demand against the capacity of all teachers
+- total demand of a subject against its parallel limit
+"""
+
+
+def check_feasibility(classes, subjects, class_subject_hours, teachers_info,
+                      restricted_parallel_subjects, hours_per_day, max_hours_per_day, num_days=5):
+    """
+    Expects the school data as loaded for the timetable model:
+        classes: list of class names
+        subjects: list of subject names
+        class_subject_hours: {class_name: {subject: hours_per_week}}
+        teachers_info: {Tid: {"name": str, "max_hours": int, "subjects": [subject, ...]}}
+        restricted_parallel_subjects: [(subject, max_parallel), ...]
+        hours_per_day: number of teaching periods per day (without the break)
+        max_hours_per_day: maximum number of hours of one subject per day in a class
+        num_days: number of school days per week
+
+    Returns:
+        A list of problems, each a dict with a 'type', a human readable 'message'
+        and the entities involved. Empty if no contradiction was found.
+    """
+    problems = []
+    slots_per_week = num_days * hours_per_day
+
+    # subject -> [(Tid, max_hours)] of all teachers qualified for it
+    qualified = {}
+    for tid, info in teachers_info.items():
+        for subject in info["subjects"]:
+            qualified.setdefault(subject, []).append((tid, info["max_hours"]))
+
+    # subject -> total weekly hours over all classes
+    demand = {}
+
+    for c in classes:
+        if c not in class_subject_hours:
+            problems.append({
+                "type": "class_without_curriculum",
+                "message": f"Class {c} has no subject allocations.",
+                "class": c
+            })
+        curriculum = class_subject_hours.get(c, {})
+
+        required = sum(curriculum.values())
+        if required > slots_per_week:
+            problems.append({
+                "type": "class_hours_exceed_slots",
+                "message": f"Class {c} requires {required} hours per week, but only {slots_per_week} slots are available.",
+                "class": c,
+                "required": required,
+                "available": slots_per_week
+            })
+
+        for subject, hours in curriculum.items():
+            demand[subject] = demand.get(subject, 0) + hours
+
+            if subject not in subjects:
+                problems.append({
+                    "type": "unknown_subject",
+                    "message": f"Subject {subject} of class {c} is not part of the school subjects.",
+                    "class": c,
+                    "subject": subject
+                })
+
+            if hours > max_hours_per_day * num_days:
+                problems.append({
+                    "type": "subject_exceeds_daily_limit",
+                    "message": f"Class {c} requires {hours} hours of {subject}, but at most "
+                               f"{max_hours_per_day} hours per day ({max_hours_per_day * num_days} per week) are allowed.",
+                    "class": c,
+                    "subject": subject,
+                    "required": hours,
+                    "available": max_hours_per_day * num_days
+                })
+
+            if subject not in qualified:
+                problems.append({
+                    "type": "no_qualified_teacher",
+                    "message": f"No teacher is qualified for {subject}, which is required in class {c}.",
+                    "class": c,
+                    "subject": subject
+                })
+
+            # a subject is taught by the same teacher throughout the week, so one teacher has to carry all its hours
+            elif hours > max(max_hours for _, max_hours in qualified[subject]):
+                problems.append({
+                    "type": "no_teacher_with_enough_hours",
+                    "message": f"Class {c} requires {hours} hours of {subject}, but no qualified teacher "
+                               f"can teach that many hours per week.",
+                    "class": c,
+                    "subject": subject,
+                    "required": hours
+                })
+
+    for subject, required in demand.items():
+        capacity = sum(max_hours for _, max_hours in qualified.get(subject, []))
+        if subject in qualified and required > capacity:
+            problems.append({
+                "type": "subject_exceeds_teacher_capacity",
+                "message": f"{subject} is required for {required} hours per week, but all qualified teachers "
+                           f"together can only teach {capacity} hours.",
+                "subject": subject,
+                "required": required,
+                "available": capacity
+            })
+
+    total_demand = sum(demand.values())
+    total_capacity = sum(info["max_hours"] for info in teachers_info.values())
+    if total_demand > total_capacity:
+        problems.append({
+            "type": "demand_exceeds_teacher_capacity",
+            "message": f"All classes together require {total_demand} hours per week, but all teachers "
+                       f"together can only teach {total_capacity} hours.",
+            "required": total_demand,
+            "available": total_capacity
+        })
+
+    for subject, max_parallel in restricted_parallel_subjects:
+        if subject not in subjects:
+            problems.append({
+                "type": "unknown_parallel_limit_subject",
+                "message": f"The parallel limit of {subject} refers to a subject that is not part of the school subjects.",
+                "subject": subject
+            })
+            continue
+
+        capacity = max_parallel * slots_per_week
+        if demand.get(subject, 0) > capacity:
+            problems.append({
+                "type": "subject_exceeds_parallel_limit",
+                "message": f"{subject} is required for {demand[subject]} hours per week, but at most "
+                           f"{max_parallel} lessons can take place at the same time ({capacity} per week).",
+                "subject": subject,
+                "required": demand[subject],
+                "available": capacity
+            })
+
+    return problems
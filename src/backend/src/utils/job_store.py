@@ -0,0 +1,377 @@
+from .utils import get_db_connection
+from .result_format import expand_result
+from collections import OrderedDict
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+
+"""
+This module stores the status and results of the timetable computation jobs.
+
+Finished results hold the full timetables of all classes and teachers, so keeping them in
+plain dicts forever lets the memory of the API grow until a restart, which then loses every job.
+The job store limits the number and age of the stored jobs and keeps results compressed, with
+the timetables in the compact format the solver returns them in (see utils/result_format.py).
+
+Functionality:
+- `MemoryJobStore`:
+  In-process LRU store, bounded by number of jobs, compressed bytes and TTL.
+
+- `MariaDBJobStore`:
+  Durable store in the `Jobs` table of the existing database (see create_tables.py).
+  Jobs survive restarts and can be queried from any API process. Every process refreshes
+  `updated_at` of its queued and running jobs (heartbeat); jobs of a process that stopped
+  stop getting refreshed and end with status 'error' and the result {"status": "lost"}.
+
+- `create_job_store()`:
+  Creates the backend selected by the environment.
+
+Both backends offer the same methods:
+- `create(job_id, Uid, status='running')`: registers a new job ('queued' or 'running')
+- `update(job_id, status=None, result=None)`: sets the status and/or the result of a job
+- `set_progress(job_id, progress)`: sets the progress of a running job (see solver/worker.py)
+- `set_provisional(job_id, result)`: sets the best timetable so far as result of a job, ignored once
+  the job is no longer running (so a late report never replaces the final result)
+- `get(job_id, compact=False)`: returns {"status", "result", "progress"} of a job, or None if it is unknown
+  or expired; the result in the full format, or as stored in the compact format if `compact` is set
+
+Configuration (environment variables):
+- JOB_STORE: 'memory' (default) or 'mariadb'
+- JOB_STORE_MAX_JOBS: maximum number of stored jobs (default: 1000)
+- JOB_STORE_MAX_BYTES: maximum size of all compressed results, memory backend only (default: 256 MB)
+- JOB_STORE_TTL: time in seconds a job is kept after its last update (default: 86400)
+- JOB_STORE_HEARTBEAT: seconds between two heartbeats of the active jobs, mariadb backend only (default: 30)
+- JOB_STORE_LOST_AFTER: seconds without heartbeat after which an active job is lost, mariadb backend only (default: 120)
+
+Technologies:
+- zlib compression of the JSON encoded results (timetables in the compact format)
+- MariaDB (mysql-connector) for the durable backend
+"""
+
+
+JOB_STORE = os.environ.get("JOB_STORE", "memory")
+JOB_STORE_MAX_JOBS = int(os.environ.get("JOB_STORE_MAX_JOBS", 1000))
+JOB_STORE_MAX_BYTES = int(os.environ.get("JOB_STORE_MAX_BYTES", 256 * 1024 * 1024))
+JOB_STORE_TTL = float(os.environ.get("JOB_STORE_TTL", 24 * 60 * 60))
+JOB_STORE_HEARTBEAT = float(os.environ.get("JOB_STORE_HEARTBEAT", 30))
+JOB_STORE_LOST_AFTER = float(os.environ.get("JOB_STORE_LOST_AFTER", 120))
+
+# jobs with these states are never removed
+ACTIVE_STATUSES = ('queued', 'running')
+
+# result of an active job whose API process stopped (mariadb backend)
+LOST_RESULT = {"status": "lost", "error": "The API process of the job stopped before the job finished."}
+
+
+def compress_result(result):
+    """
+    Returns:
+        The result as zlib compressed JSON (timetables of the solver come in the compact format),
+        or None for no result.
+    """
+    if result is None:
+        return None
+    return zlib.compress(json.dumps(result).encode("utf-8"))
+
+
+def decompress_result(data, compact=False):
+    """
+    Returns:
+        The result of compressed JSON data in the full format (as stored if `compact` is set),
+        or None for no data.
+    """
+    if data is None:
+        return None
+    result = json.loads(zlib.decompress(data).decode("utf-8"))
+    return result if compact else expand_result(result)
+
+
+class MemoryJobStore:
+    """
+    Job store in the memory of the API process.
+    The least recently updated jobs are removed first; queued and running jobs are never removed.
+    """
+
+    def __init__(self, max_jobs=JOB_STORE_MAX_JOBS, max_bytes=JOB_STORE_MAX_BYTES, ttl=JOB_STORE_TTL):
+        self.max_jobs = max_jobs
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # job_id -> {"Uid", "status", "result" (compressed), "progress", "updated_at"}, least recently updated first
+        self.jobs = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def create(self, job_id, Uid, status="running"):
+        with self.lock:
+            self.jobs[job_id] = {"Uid": Uid, "status": status, "result": None, "progress": None, "updated_at": time.time()}
+            self.evict()
+
+    def update(self, job_id, status=None, result=None):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            if status is not None:
+                job["status"] = status
+            if result is not None:
+                self.size -= len(job["result"] or b"")
+                job["result"] = compress_result(result)
+                self.size += len(job["result"])
+            job["updated_at"] = time.time()
+            self.jobs.move_to_end(job_id)
+            self.evict()
+
+    def set_progress(self, job_id, progress):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                job["progress"] = progress
+
+    def set_provisional(self, job_id, result):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] != "running":
+                return
+            self.size -= len(job["result"] or b"")
+            job["result"] = compress_result(result)
+            self.size += len(job["result"])
+            self.evict()
+
+    def get(self, job_id, compact=False):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] not in ACTIVE_STATUSES and time.time() - job["updated_at"] > self.ttl:
+                self.remove(job_id)
+                return None
+            data, status, progress = job["result"], job["status"], job["progress"]
+        # decompressed outside the lock, the stored bytes are never changed in place
+        return {"status": status, "result": decompress_result(data, compact), "progress": progress}
+
+    def remove(self, job_id):
+        job = self.jobs.pop(job_id)
+        self.size -= len(job["result"] or b"")
+
+    def evict(self):
+        """
+        Removes expired jobs and then the least recently updated ones until the limits are met.
+        Expects the lock to be held.
+        """
+        now = time.time()
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job["status"] not in ACTIVE_STATUSES and now - job["updated_at"] > self.ttl]:
+            self.remove(job_id)
+
+        for job_id in [job_id for job_id, job in self.jobs.items() if job["status"] not in ACTIVE_STATUSES]:
+            if len(self.jobs) <= self.max_jobs and self.size <= self.max_bytes:
+                break
+            self.remove(job_id)
+
+
+class MariaDBJobStore:
+    """
+    Job store in the `Jobs` table of the database. Expired and surplus finished jobs are
+    removed whenever a new job is created. A heartbeat thread refreshes the queued and running
+    jobs of this process; active jobs without heartbeat (of a stopped process) are marked as
+    lost when the store is created, whenever a new job is created and when they are read.
+    """
+
+    def __init__(self, max_jobs=JOB_STORE_MAX_JOBS, ttl=JOB_STORE_TTL, heartbeat=JOB_STORE_HEARTBEAT,
+                 lost_after=JOB_STORE_LOST_AFTER):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.lost_after = lost_after
+        # queued and running jobs of this process, refreshed by the heartbeat thread
+        self.active = set()
+        self.lock = threading.Lock()
+        self.heartbeat_thread = None
+
+        # jobs left active by an earlier run of the API end now (if the database is reachable yet)
+        conn = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor(buffered=True)
+            self.expire_lost(cursor)
+            conn.commit()
+            cursor.close()
+        except Exception:
+            logging.exception("Lost jobs of earlier API processes could not be marked")
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def expire_lost(self, cursor):
+        """
+        Marks the queued and running jobs without heartbeat as lost (status 'error').
+        """
+        cursor.execute("""
+            UPDATE Jobs
+            SET status = 'error', result = %s, updated_at = NOW()
+            WHERE status IN ('queued', 'running') AND updated_at < NOW() - INTERVAL %s SECOND
+        """, (compress_result(LOST_RESULT), int(self.lost_after)))
+
+    def track(self, job_id, status):
+        """
+        Adds an active job to the heartbeat (starting the heartbeat thread) or removes a finished one.
+        """
+        with self.lock:
+            if status not in ACTIVE_STATUSES:
+                self.active.discard(job_id)
+                return
+            self.active.add(job_id)
+            if self.heartbeat_thread is None:
+                self.heartbeat_thread = threading.Thread(target=self.beat, daemon=True)
+                self.heartbeat_thread.start()
+
+    def beat(self):
+        """
+        Heartbeat thread: refreshes `updated_at` of the active jobs of this process.
+        """
+        while True:
+            time.sleep(self.heartbeat)
+            try:
+                self.refresh()
+            except Exception:
+                logging.exception("Heartbeat of the active jobs failed")
+
+    def refresh(self):
+        """
+        Refreshes `updated_at` of the active jobs of this process once.
+        """
+        with self.lock:
+            job_ids = list(self.active)
+        if not job_ids:
+            return
+
+        conn = get_db_connection()
+        cursor = conn.cursor(buffered=True)
+        try:
+            cursor.execute(f"""
+                UPDATE Jobs
+                SET updated_at = NOW()
+                WHERE status IN ('queued', 'running') AND job_id IN ({", ".join(["%s"] * len(job_ids))})
+            """, tuple(job_ids))
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def create(self, job_id, Uid, status="running"):
+        conn = get_db_connection()
+        cursor = conn.cursor(buffered=True)
+        try:
+            cursor.execute("""
+                INSERT INTO Jobs (job_id, Uid, status, result, updated_at)
+                VALUES (%s, %s, %s, NULL, NOW())
+            """, (job_id, Uid, status))
+
+            # jobs of stopped API processes
+            self.expire_lost(cursor)
+
+            # remove expired jobs
+            cursor.execute("""
+                DELETE FROM Jobs
+                WHERE status NOT IN ('queued', 'running') AND updated_at < NOW() - INTERVAL %s SECOND
+            """, (int(self.ttl),))
+
+            # remove the least recently updated finished jobs above the limit
+            cursor.execute("SELECT COUNT(*) FROM Jobs")
+            surplus = cursor.fetchone()[0] - self.max_jobs
+            if surplus > 0:
+                cursor.execute("""
+                    DELETE FROM Jobs
+                    WHERE status NOT IN ('queued', 'running')
+                    ORDER BY updated_at
+                    LIMIT %s
+                """, (surplus,))
+
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+        self.track(job_id, status)
+
+    def update(self, job_id, status=None, result=None):
+        conn = get_db_connection()
+        cursor = conn.cursor(buffered=True)
+        try:
+            cursor.execute("""
+                UPDATE Jobs
+                SET status = COALESCE(%s, status), result = COALESCE(%s, result), updated_at = NOW()
+                WHERE job_id = %s
+            """, (status, compress_result(result), job_id))
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+        if status is not None:
+            self.track(job_id, status)
+
+    def set_progress(self, job_id, progress):
+        conn = get_db_connection()
+        cursor = conn.cursor(buffered=True)
+        try:
+            cursor.execute("UPDATE Jobs SET progress = %s WHERE job_id = %s", (json.dumps(progress), job_id))
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def set_provisional(self, job_id, result):
+        conn = get_db_connection()
+        cursor = conn.cursor(buffered=True)
+        try:
+            cursor.execute(
+                "UPDATE Jobs SET result = %s WHERE job_id = %s AND status = 'running'",
+                (compress_result(result), job_id)
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def get(self, job_id, compact=False):
+        conn = get_db_connection()
+        cursor = conn.cursor(buffered=True)
+        try:
+            cursor.execute("""
+                SELECT status, result, progress, updated_at < NOW() - INTERVAL %s SECOND
+                FROM Jobs
+                WHERE job_id = %s AND (status IN ('queued', 'running') OR updated_at >= NOW() - INTERVAL %s SECOND)
+            """, (int(self.lost_after), job_id, int(self.ttl)))
+            job = cursor.fetchone()
+        finally:
+            cursor.close()
+            conn.close()
+
+        if not job:
+            return None
+        if job[0] in ACTIVE_STATUSES and job[3]:
+            # no heartbeat anymore, marked in the table with the next created job
+            return {
+                "status": "error",
+                "result": dict(LOST_RESULT),
+                "progress": json.loads(job[2]) if job[2] else None
+            }
+        return {
+            "status": job[0],
+            "result": decompress_result(job[1], compact),
+            "progress": json.loads(job[2]) if job[2] else None
+        }
+
+
+def create_job_store():
+    """
+    Returns:
+        The job store backend selected by JOB_STORE.
+    """
+    if JOB_STORE == "mariadb":
+        return MariaDBJobStore()
+    if JOB_STORE == "memory":
+        return MemoryJobStore()
+    raise ValueError(f"Unknown JOB_STORE '{JOB_STORE}', expected 'memory' or 'mariadb'")
@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+"""
+This module keeps the last successful run of every user for warm starts and incremental re-solves.
+
+Every entry holds the school data of the run and the snapshot of its timetable (see `solver/hints.py`),
+so it is as large as a timetable. Users come and go, so the entries are bounded like the cached
+results (see `utils/result_cache.py`): the least recently used users are evicted and old runs expire.
+
+Functionality:
+- `get_last_solution()`:
+  Returns the last run of a user, if it exists and is not expired.
+
+- `store_last_solution()`:
+  Stores the last run of a user and evicts the least recently used entries.
+
+Configuration (environment variables):
+- LAST_SOLUTIONS_SIZE: maximum number of users with a stored run (default: 256, 0 disables warm starts from earlier runs)
+- LAST_SOLUTIONS_TTL: time in seconds a run stays usable (default: 604800, one week)
+
+Technologies:
+- In-memory storage (OrderedDict as LRU) shared by all jobs of the process
+"""
+
+
+LAST_SOLUTIONS_SIZE = int(os.environ.get("LAST_SOLUTIONS_SIZE", 256))
+LAST_SOLUTIONS_TTL = float(os.environ.get("LAST_SOLUTIONS_TTL", 7 * 24 * 60 * 60))
+
+# Uid -> {"stored_at", "school", "snapshot"}, least recently used first
+last_solutions = OrderedDict()
+last_solutions_lock = threading.Lock()
+
+
+def get_last_solution(Uid):
+    """
+    Returns:
+        dict with the keys 'school' and 'snapshot' of the last successful run of the user,
+        or None if there is none or it expired.
+    """
+    with last_solutions_lock:
+        entry = last_solutions.get(Uid)
+        if entry is None:
+            return None
+
+        if time.time() - entry["stored_at"] > LAST_SOLUTIONS_TTL:
+            del last_solutions[Uid]
+            return None
+
+        last_solutions.move_to_end(Uid)
+        return {"school": entry["school"], "snapshot": entry["snapshot"]}
+
+
+def store_last_solution(Uid, school, snapshot):
+    """
+    Stores the school data and the snapshot of the last successful run of the user.
+    """
+    if LAST_SOLUTIONS_SIZE <= 0:
+        return
+
+    with last_solutions_lock:
+        last_solutions[Uid] = {"stored_at": time.time(), "school": school, "snapshot": snapshot}
+        last_solutions.move_to_end(Uid)
+
+        while len(last_solutions) > LAST_SOLUTIONS_SIZE:
+            last_solutions.popitem(last=False)
@@ -0,0 +1,198 @@
+from flask import request, g
+import threading
+import time
+
+"""
+This module keeps the operational metrics of the API process and renders them in the
+Prometheus text format (served by api_endpoints/Metrics.py).
+
+The metrics are kept in memory per API process, like the scheduler. With several API processes
+every process has to be scraped on its own (Prometheus adds them up).
+
+Functionality:
+- `Counter`, `Histogram`:
+  Minimal thread-safe metric types with optional labels, rendered by `render_metrics()`.
+
+- `register_request_metrics()`:
+  Measures the latency of every request of a Flask app per endpoint, method and status code.
+
+- `render_metrics()`:
+  All metrics of this module in the Prometheus text exposition format (version 0.0.4).
+
+Metrics:
+- fottg_jobs_started_total: jobs taken from the queue by a scheduler worker
+- fottg_jobs_finished_total{status}: finished jobs by the status of their result
+  (success, no_solution, infeasible, cancelled)
+- fottg_jobs_failed_total: jobs that ended with an error
+- fottg_job_queue_seconds: time between the request and the start of a job
+- fottg_job_solve_seconds: time of model building and solving in the solver pool
+- fottg_http_request_duration_seconds{endpoint, method, status}: latency of the API requests
+  (for the status stream the time until the stream starts)
+
+Technologies:
+- Prometheus text exposition format
+"""
+
+
+# content type of the Prometheus text format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# upper bounds of the histogram buckets in seconds
+JOB_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# all metrics in the order they are rendered
+registry = []
+
+
+def escape_label(value):
+    """
+    Returns:
+        The label value with backslash, double quote and line feed escaped.
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def escape_help(text):
+    """
+    Returns:
+        The help text with backslash and line feed escaped.
+    """
+    return str(text).replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def format_labels(names, values, extra=()):
+    """
+    Returns:
+        The label set `{name="value",...}` of a sample, empty without labels.
+    """
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}"
+
+
+def format_value(value):
+    """
+    Returns:
+        The value as Prometheus float (+Inf and -Inf for infinity, NaN).
+    """
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+class Counter:
+    """
+    Monotonically increasing count, one per combination of label values.
+    """
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {escape_help(self.documentation)}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            values = dict(self.values)
+        if not values and not self.labels:
+            values[()] = 0
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{format_labels(self.labels, key)} {format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    Distribution of observed values in cumulative buckets, with their sum and count,
+    one per combination of label values.
+    """
+
+    def __init__(self, name, documentation, buckets, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self.labels = tuple(labels)
+        self.values = {}  # label values -> (bucket counts, sum, count)
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self.lock:
+            counts, total, count = self.values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.values[key] = (counts, total + value, count + 1)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {escape_help(self.documentation)}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self.values.items()}
+        if not values and not self.labels:
+            values[()] = ([0] * len(self.buckets), 0.0, 0)
+        for key, (counts, total, count) in sorted(values.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels = format_labels(self.labels, key, [("le", format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {format_value(bucket_count)}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {format_value(count)}")
+        return lines
+
+
+# metrics of the timetable jobs (recorded in api_endpoints/AsyncCompute.py)
+jobs_started = Counter("fottg_jobs_started_total", "Timetable jobs started by a scheduler worker.")
+jobs_finished = Counter("fottg_jobs_finished_total", "Timetable jobs finished, by result status.", ("status",))
+jobs_failed = Counter("fottg_jobs_failed_total", "Timetable jobs that ended with an error.")
+job_queue_seconds = Histogram("fottg_job_queue_seconds", "Time between the request and the start of a job.", JOB_BUCKETS)
+job_solve_seconds = Histogram("fottg_job_solve_seconds", "Time of model building and solving of a job.", JOB_BUCKETS)
+
+# latency of the API requests (recorded by register_request_metrics)
+request_seconds = Histogram(
+    "fottg_http_request_duration_seconds", "Latency of the API requests.", REQUEST_BUCKETS,
+    ("endpoint", "method", "status")
+)
+
+
+def register_request_metrics(app):
+    """
+    Measures every request of `app` in `fottg_http_request_duration_seconds`. Requests without
+    a matching route are counted under the endpoint 'unknown', so random paths add no new series.
+    """
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            request_seconds.observe(
+                time.perf_counter() - started,
+                endpoint=request.endpoint or "unknown", method=request.method, status=response.status_code
+            )
+        return response
+
+
+def render_metrics():
+    """
+    Returns:
+        All metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,107 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+"""
+This module caches the results of timetable computations by a fingerprint of the
+school data (see `solver/model_cache.py`).
+
+Users often press "generate" again without changing anything. If the last computation
+for the same data was proven optimal, the stored timetable is returned immediately
+instead of running the whole search again. Feasible (not proven optimal) results are
+kept as well and can be used as a warm start or returned on request.
+
+Functionality:
+- `get_cached_result()`:
+  Returns the cached entry for a fingerprint, if it exists and is not expired.
+
+- `store_result()`:
+  Stores a successful result and evicts the least recently used entries.
+
+- `served_result()`:
+  The result of a cache entry as returned to a job: marked with "cached": true, the statistics of
+  the solve that computed it (possibly for another user) replaced by the phases of the job itself.
+
+Configuration (environment variables):
+- RESULT_CACHE_SIZE: maximum number of cached results (default: 128, 0 disables the cache)
+- RESULT_CACHE_TTL: time in seconds a result stays valid (default: 86400)
+
+Technologies:
+- In-memory storage (OrderedDict as LRU) shared by all jobs of the process
+"""
+
+
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 128))
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", 24 * 60 * 60))
+
+# statistics of a cached result that describe its timetable, all others belong to the solve that computed it
+CACHED_STATISTICS = ("model", "strategy", "objective", "best_bound", "solver_status")
+
+# fingerprint -> {"stored_at", "optimal", "result", "school", "snapshot"}, least recently used first
+result_cache = OrderedDict()
+result_cache_lock = threading.Lock()
+
+
+def get_cached_result(fingerprint):
+    """
+    Returns:
+        A copy of the cached entry with the keys 'optimal' (bool), 'result' (the result of the job),
+        'school' and 'snapshot' (see solver/hints.py), or None if nothing valid is cached.
+    """
+    with result_cache_lock:
+        entry = result_cache.get(fingerprint)
+        if entry is None:
+            return None
+
+        if time.time() - entry["stored_at"] > RESULT_CACHE_TTL:
+            del result_cache[fingerprint]
+            return None
+
+        result_cache.move_to_end(fingerprint)
+        return copy.deepcopy(entry)
+
+
+def store_result(fingerprint, result, optimal, school, snapshot):
+    """
+    Stores a successful result. A feasible result never replaces an optimal one for the same data.
+    """
+    if RESULT_CACHE_SIZE <= 0:
+        return
+
+    with result_cache_lock:
+        existing = result_cache.get(fingerprint)
+        if existing is not None and existing["optimal"] and not optimal \
+                and time.time() - existing["stored_at"] <= RESULT_CACHE_TTL:
+            return
+
+        result_cache[fingerprint] = {
+            "stored_at": time.time(),
+            "optimal": optimal,
+            "result": copy.deepcopy(result),
+            "school": school,
+            "snapshot": snapshot
+        }
+        result_cache.move_to_end(fingerprint)
+
+        while len(result_cache) > RESULT_CACHE_SIZE:
+            result_cache.popitem(last=False)
+
+
+def served_result(entry, timings):
+    """
+    Args:
+        entry (dict): Entry returned by `get_cached_result()`.
+        timings (dict): Seconds per phase of the job that is answered from the cache.
+
+    Returns:
+        The cached result with "cached": true and only the statistics that describe the timetable,
+        plus the timings of the job.
+    """
+    result = entry["result"]
+    statistics = result.get("statistics") or {}
+    result["statistics"] = {key: statistics[key] for key in CACHED_STATISTICS if key in statistics}
+    result["statistics"]["timings"] = dict(timings)
+    result["cached"] = True
+    return result
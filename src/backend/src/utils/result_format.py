@@ -0,0 +1,84 @@
+"""
+This module converts job results from the compact, dictionary-encoded timetable format into the
+full one.
+
+In the full format (see `extract_timetable()` in solver/model.py) every period is a string like
+"Math (Maier)" in the class view and "Math (5a)" in the teacher view, so the names of subjects,
+teachers and classes are repeated thousands of times. The compact format (see `extract_compact()`
+in solver/model.py) names every subject, teacher and class once and keeps the timetable of each
+class as integer index grids; the teacher view is derived from the class grids (a teacher teaches
+one class per period).
+
+Compact format (all other keys of the result are kept as they are):
+- 'format': "compact"
+- 'days', 'classes', 'teachers', 'subjects': the dictionaries, lists of names
+- 'subject_grid', 'teacher_grid': [class][day][period] index into 'subjects' and 'teachers',
+  -1 for free periods (the break included, so the periods line up with the full format)
+- 'alternatives' (portfolio strategy): the same grids per alternative, with the dictionaries
+  of the result
+
+Functionality:
+- `expand_result()`:
+  Decodes a compact result into the full format, other results are returned unchanged.
+
+The solver returns the timetables of its results and progress reports in the compact format, the
+job store keeps them that way (see utils/job_store.py), `/status/<job_id>` returns them in the full
+format unless `format=compact` is requested.
+"""
+
+
+# entry of a free period in the full format
+FREE = "free"
+
+
+def decode_views(compact, subject_grid, teacher_grid):
+    """
+    Returns:
+        {"classes": {class: {day: [entry]}}, "teachers": {teacher: {day: [entry]}}} of the grids,
+        with the dictionaries of `compact`.
+    """
+    days, classes, teachers, subjects = compact["days"], compact["classes"], compact["teachers"], compact["subjects"]
+    periods = len(subject_grid[0][0]) if subject_grid and subject_grid[0] else 0
+
+    class_view = {}
+    teacher_view = {teacher: {day: [FREE] * periods for day in days} for teacher in teachers}
+    for c_index, c in enumerate(classes):
+        class_days = {}
+        for d_index, day in enumerate(days):
+            entries = []
+            for h, (s_idx, t_idx) in enumerate(zip(subject_grid[c_index][d_index], teacher_grid[c_index][d_index])):
+                if s_idx < 0 or t_idx < 0:
+                    entries.append(FREE)
+                    continue
+                entries.append(f"{subjects[s_idx]} ({teachers[t_idx]})")
+                # like the extraction, the first class in class order is shown if a teacher had several
+                teacher_periods = teacher_view[teachers[t_idx]][day]
+                if teacher_periods[h] == FREE:
+                    teacher_periods[h] = f"{subjects[s_idx]} ({c})"
+            class_days[day] = entries
+        class_view[c] = class_days
+    return {"classes": class_view, "teachers": teacher_view}
+
+
+def expand_result(result):
+    """
+    Returns:
+        The result in the full format (results that are not compact are returned unchanged).
+    """
+    if not isinstance(result, dict) or result.get("format") != "compact":
+        return result
+
+    expanded = {
+        key: value for key, value in result.items()
+        if key not in ("format", "days", "subjects", "subject_grid", "teacher_grid", "alternatives")
+    }
+    expanded.update(decode_views(result, result["subject_grid"], result["teacher_grid"]))
+    if "alternatives" in result:
+        expanded["alternatives"] = [
+            {
+                **{key: value for key, value in alternative.items() if key not in ("subject_grid", "teacher_grid")},
+                **decode_views(result, alternative["subject_grid"], alternative["teacher_grid"])
+            }
+            for alternative in result["alternatives"]
+        ]
+    return expanded
@@ -0,0 +1,263 @@
+from collections import OrderedDict
+import heapq
+import logging
+import os
+import threading
+import time
+
+"""
+This module schedules the timetable computations of all users on a bounded number of
+solver threads.
+
+Every solve uses several CPU cores (`num_search_workers`). Starting a thread per request
+oversubscribes the machine as soon as a few users generate at the same time, and every
+job gets slower. The scheduler runs at most `MAX_CONCURRENT_SOLVES` jobs at once and
+queues the rest.
+
+Functionality:
+- `SolveScheduler.submit()`:
+  Queues a job. Every user holds at most one place in the queue (per-user fairness of the
+  FIFO queue): a queued job of the same user with the same options is reused, any other
+  queued or running job of the user is superseded (cancelled) by the new one.
+  Raises `QueueFull` if `MAX_QUEUED_JOBS` jobs are already waiting.
+
+- `SolveScheduler.cancel()`:
+  Removes a queued job from the queue, or marks a running job as cancelled and asks it to
+  stop its search (see `cancel_solve()` in utils/solver_pool.py).
+
+- `SolveScheduler.reserve()`:
+  Reserves the search workers of a running job, decided from the current load (see utils/budget.py).
+
+- `SolveScheduler.release()`:
+  Called by a job right before it stores its final result.
+
+- `SolveScheduler.queue_info()`:
+  Position of a queued job and the estimated time until it starts, based on the average
+  duration of the last jobs.
+
+Configuration (environment variables):
+- MAX_CONCURRENT_SOLVES: number of jobs solved at the same time
+  (default: number of CPU cores / SOLVER_NUM_WORKERS, at least 1)
+- MAX_QUEUED_JOBS: maximum number of waiting jobs (default: 50)
+
+Technologies:
+- Multithreading (fixed pool of worker threads and a condition variable)
+"""
+
+
+# search workers of one solve, the solver uses this many cores per job
+SOLVER_NUM_WORKERS = 3
+
+MAX_CONCURRENT_SOLVES = int(os.environ.get("MAX_CONCURRENT_SOLVES", max(1, (os.cpu_count() or 1) // SOLVER_NUM_WORKERS)))
+MAX_QUEUED_JOBS = int(os.environ.get("MAX_QUEUED_JOBS", 50))
+
+
+class QueueFull(Exception):
+    """
+    Raised by `SolveScheduler.submit()` if the queue has reached its limit.
+    """
+    pass
+
+
+class SolveScheduler:
+    """
+    FIFO queue of jobs with a fixed number of worker threads.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_SOLVES, max_queued=MAX_QUEUED_JOBS, expected_duration=60.0,
+                 stop=None):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        # moving average of the job durations, used to estimate start times
+        self.expected_duration = expected_duration
+        # stop(job_id, reason) stops the search of a cancelled running job
+        self.stop = stop
+
+        # job_id -> (Uid, target, args, key), in submission order
+        self.queue = OrderedDict()
+        # job_id -> start time of the running jobs
+        self.running = {}
+        # job_id -> search workers reserved by the running jobs
+        self.workers_of = {}
+        # Uid -> job_id of the queued or running job of the user
+        self.active = {}
+        # job_id -> reason ('cancelled' or 'superseded') of the cancelled running jobs
+        self.cancelled = {}
+
+        self.condition = threading.Condition()
+        self.workers = []
+
+    def submit(self, job_id, Uid, target, args=(), register=None, key=None):
+        """
+        Queues `target(*args)` as job `job_id` of user `Uid`.
+
+        Args:
+            register (callable, optional): Called with the lock held before the job is queued
+                (e.g. to create the job in the job store before any worker can start it).
+            key (hashable, optional): Options of the job, a queued job of the user is only reused
+                if its key is the same.
+
+        Returns:
+            (job_id, reused, superseded): the ID of the job that computes the timetable of the user,
+            whether it is an already queued job, and (job_id, 'queued' or 'running') of the job of
+            the user that was cancelled in favour of the new one, or None.
+
+        Raises:
+            QueueFull: if MAX_QUEUED_JOBS jobs are already waiting.
+        """
+        with self.condition:
+            superseded = None
+            previous = self.active.get(Uid) if Uid is not None else None
+
+            # the queued job loads the data of the user only when it starts, so it computes the same
+            if previous in self.queue and self.queue[previous][3] == key:
+                return previous, True, None
+
+            # a queued job of the user gives its place to the new one
+            if len(self.queue) - (previous in self.queue) >= self.max_queued:
+                raise QueueFull()
+
+            # a newer request of the user replaces the old job (e.g. after the data was changed)
+            if previous is not None:
+                superseded = (previous, self.cancel(previous, 'superseded'))
+
+            if register:
+                register()
+
+            self.queue[job_id] = (Uid, target, args, key)
+            if Uid is not None:
+                self.active[Uid] = job_id
+
+            # start the worker threads with the first job
+            while len(self.workers) < self.max_concurrent:
+                worker = threading.Thread(target=self.work, daemon=True)
+                worker.start()
+                self.workers.append(worker)
+
+            self.condition.notify()
+            return job_id, False, superseded
+
+    def cancel(self, job_id, reason='cancelled', Uid=None):
+        """
+        Cancels a queued or running job. A queued job is removed from the queue, a running job is
+        marked as cancelled and stopped via `stop(job_id, reason)`; it stores its result itself.
+
+        Args:
+            Uid (optional): Only cancel the job if it is the current job of this user.
+
+        Returns:
+            'queued' or 'running' (the state of the cancelled job), or None if the job is not
+            queued or running in this process (or was already released).
+        """
+        with self.condition:
+            if job_id in self.queue:
+                owner = self.queue[job_id][0]
+                if Uid is not None and owner != Uid:
+                    return None
+                del self.queue[job_id]
+                self.release(owner, job_id)
+                return 'queued'
+
+            # a running job is only stopped before it released the user, so the stop never outlives the job
+            if job_id in self.running and job_id in self.active.values() \
+                    and (Uid is None or self.active.get(Uid) == job_id):
+                self.cancelled.setdefault(job_id, reason)
+                if self.stop:
+                    self.stop(job_id, self.cancelled[job_id])
+                return 'running'
+
+            return None
+
+    def cancellation(self, job_id):
+        """
+        Returns:
+            The reason ('cancelled' or 'superseded') if the running job was cancelled, otherwise None.
+        """
+        with self.condition:
+            return self.cancelled.get(job_id)
+
+    def work(self):
+        """
+        Worker thread: runs the queued jobs in order. Exceptions of a job are logged, the thread
+        keeps working on the queue.
+        """
+        while True:
+            with self.condition:
+                while not self.queue:
+                    self.condition.wait()
+                job_id, (Uid, target, args, _) = self.queue.popitem(last=False)
+                self.running[job_id] = time.time()
+
+            try:
+                target(*args)
+            except Exception:
+                # a failing job must not end the worker, the queued jobs behind it would never start
+                logging.exception("Job %s failed outside of its own error handling", job_id)
+            finally:
+                self.release(Uid, job_id)
+                with self.condition:
+                    self.workers_of.pop(job_id, None)
+                    self.cancelled.pop(job_id, None)
+                    duration = time.time() - self.running.pop(job_id)
+                    self.expected_duration = 0.8 * self.expected_duration + 0.2 * duration
+
+    def load(self, job_id=None):
+        """
+        Returns:
+            {"running", "queued", "allocated_workers"}: the running jobs (except `job_id`), the waiting
+            jobs and the search workers reserved by the running jobs (except `job_id`).
+        """
+        with self.condition:
+            return {
+                "running": len([other for other in self.running if other != job_id]),
+                "queued": len(self.queue),
+                "allocated_workers": sum(n for other, n in self.workers_of.items() if other != job_id)
+            }
+
+    def reserve(self, job_id, allocate):
+        """
+        Decides and reserves the search workers of a running job in one step, so two jobs starting at
+        the same time do not count the same free cores.
+
+        Args:
+            allocate (callable): Called with `load(job_id)`, returns (num_workers, ...), e.g.
+                (num_workers, time_limit, stagnation_seconds) of `allocate_budget()`.
+
+        Returns:
+            The budget returned by `allocate`.
+        """
+        with self.condition:
+            budget = allocate(self.load(job_id))
+            self.workers_of[job_id] = budget[0]
+            return budget
+
+    def release(self, Uid, job_id):
+        """
+        Marks the job of the user as done, so the next `submit()` of the user starts a new job.
+        Jobs call this before they store their final result, so a finished job is never reused.
+        """
+        with self.condition:
+            if self.active.get(Uid) == job_id:
+                del self.active[Uid]
+
+    def queue_info(self, job_id):
+        """
+        Returns:
+            {"queue_position": 1-based position, "estimated_start_in": seconds} for a queued job,
+            or None if the job is not queued (running, finished or unknown to this process).
+        """
+        with self.condition:
+            if job_id not in self.queue:
+                return None
+
+            # simulate the queue: every job takes the worker that becomes free first
+            now = time.time()
+            free_at = [max(now, start + self.expected_duration) for start in self.running.values()]
+            free_at += [now] * (self.max_concurrent - len(free_at))
+            heapq.heapify(free_at)
+
+            for position, queued_id in enumerate(self.queue, start=1):
+                start = heapq.heappop(free_at)
+                if queued_id == job_id:
+                    return {"queue_position": position, "estimated_start_in": round(start - now, 1)}
+                heapq.heappush(free_at, start + self.expected_duration)
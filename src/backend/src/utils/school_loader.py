@@ -0,0 +1,133 @@
+from .utils import get_db_connection
+from ..solver.school import build_school
+import ast
+
+"""
+This module loads the school data of a user from the database into the plain school snapshot
+of the solver (see solver/school.py and solver/model.py). Everything after loading works on the
+snapshot only.
+
+Functionality:
+- `load_school()`:
+  Reads settings, school structure, teachers, curriculum, parallel limits and block preferences
+  of a user and returns the school snapshot together with the requested solving time.
+
+Technologies:
+- MariaDB
+"""
+
+
+class SchoolDataMissing(Exception):
+    """
+    Raised by `load_school()` if the settings or the school structure of the user were never stored.
+    """
+    pass
+
+
+def load_school(Uid):
+    """
+    Args:
+        Uid: ID of the user, each user manages exactly one school dataset (Uid == school_id).
+
+    Returns:
+        (school, max_time_for_solving), see `solver.school.build_school()`.
+
+    Raises:
+        SchoolDataMissing: if there are no settings or no school data for this user.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        # Fetch scheduling preferences for the current user
+        cursor.execute("""
+            SELECT
+                prefer_early_hours,
+                allow_block_scheduling,
+                max_hours_per_day,
+                global_break,
+                weight_block_scheduling,
+                weight_time_of_hours,
+                max_time_for_solving
+            FROM Settings
+            WHERE Uid = %s""", (Uid,))
+        row = cursor.fetchone()
+        if not row:
+            raise SchoolDataMissing("No settings found for this user.")
+        settings = dict(zip((
+            "prefer_early_hours", "allow_block_scheduling", "max_hours_per_day", "global_break",
+            "weight_block_scheduling", "weight_time_of_hours", "max_time_for_solving"
+        ), row))
+
+        # Fetch restricted parallel subjects (e.g. lab subjects, gym)
+        cursor.execute("""
+            SELECT subject_name, max_parallel
+            FROM SubjectParallelLimits
+            WHERE Uid = %s
+        """, (Uid,))
+        restricted_parallel_subjects = cursor.fetchall()
+
+        # Fetch subjects that strongly prefer block periods
+        cursor.execute("""
+            SELECT subject_name, weight
+            FROM PreferBlockSubjects
+            WHERE Uid = %s
+        """, (Uid,))
+        prefer_block_subjects = {row[0]: row[1] for row in cursor.fetchall()}
+
+        # Fetch class and subject list from the school data
+        cursor.execute("""
+            SELECT
+                classes,
+                subjects,
+                hours_per_day
+            FROM School
+            WHERE Uid = %s
+        """, (Uid,))
+        school_data = cursor.fetchone()
+        if not school_data:
+            raise SchoolDataMissing("No school data found for this user.")
+
+        classes = ast.literal_eval(school_data[0])    # List of classes e.g. ['C1', 'C2', 'C3'] >> converted from string to list
+        subjects = ast.literal_eval(school_data[1])   # List of subjects e.g. ['Math', 'English', 'History']
+
+        # Fetch all teachers that belong to the current school
+        cursor.execute("SELECT Tid, name, max_hours FROM Teachers WHERE Uid = %s", (Uid,))
+        teachers_info = {
+            row[0]: {"name": row[1], "max_hours": row[2], "subjects": []}
+            for row in cursor.fetchall()
+        }
+        # Get all teacher IDs
+        teacher_ids = tuple(teachers_info.keys())
+
+        # Fetch and assign subjects to each teacher
+        if teacher_ids:
+            sql = f"""
+                SELECT Tid, subject
+                FROM TeacherSubjects
+                WHERE Tid IN ({','.join(['%s'] * len(teacher_ids))})
+            """
+            cursor.execute(sql, teacher_ids)
+            for t_id, subject in cursor.fetchall():
+                teachers_info[t_id]["subjects"].append(subject)
+
+        # Fetch subject-hour assignments for each class at the current school
+        cursor.execute("""
+            SELECT class_name, subject, hours_per_week
+            FROM Classes
+            WHERE Uid = %s""", (Uid,))
+
+        # Build a nested dictionary: {class_name: {subject: hours_per_week}}
+        class_subject_hours = {}
+        for class_name, subject, hours in cursor.fetchall():
+            if class_name not in class_subject_hours:
+                class_subject_hours[class_name] = {}
+            class_subject_hours[class_name][subject] = hours
+
+    finally:
+        cursor.close()
+        conn.close()
+
+    return build_school(
+        settings, classes, subjects, school_data[2], teachers_info, class_subject_hours,
+        restricted_parallel_subjects, prefer_block_subjects
+    )
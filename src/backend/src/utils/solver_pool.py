@@ -0,0 +1,328 @@
+from ..solver import worker
+from ..solver.worker import serve, solve_school
+from .scheduler import MAX_CONCURRENT_SOLVES
+from concurrent.futures import Future
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+
+"""
+This module runs the timetable solves in a pool of worker processes.
+
+Building the model is pure Python code holding the GIL, so solving in threads of the API
+process slows down every other request. A crash of OR-Tools would take down the whole API.
+The solver pool keeps the solves in separate processes that import OR-Tools once and are
+reused for many jobs.
+
+Every worker process runs one job at a time and is supervised on its own: if it dies (e.g. because
+the memory or CPU time limit of its job was exceeded), only the job it was running fails and a new
+process takes its place. The jobs of the other workers keep running.
+
+Functionality:
+- `SolverPool`:
+  Supervised worker processes. `submit()` runs a function in the next free worker and returns
+  a future; a job whose worker dies fails with `SolverCrashed`.
+
+- `start_pool()`:
+  Starts the worker processes of the API ahead of the first job (called on startup of the app).
+
+- `run_solve()`:
+  Runs `solver.worker.solve_school()` for one job in a worker process and returns its result.
+  If the worker process dies, `SolverCrashed` is raised for this job only.
+
+- `set_progress_handler()`:
+  Registers the function that receives the progress reports (job_id, progress) of the running
+  jobs. The reports of all workers arrive through one queue read by a listener thread.
+
+Configuration (environment variables):
+- SOLVER_PROCESSES: number of worker processes (default: MAX_CONCURRENT_SOLVES,
+  0 runs the solves in the calling thread)
+- SOLVER_MEMORY_LIMIT_MB: address space limit of every job (default: 4096, 0 for no limit)
+- SOLVER_CPU_TIME_FACTOR: CPU time limit of every job as multiple of its time limit times its
+  search workers (default: 2, 0 for no limit)
+
+Technologies:
+- multiprocessing (spawned processes with a pipe each, queue for the progress, manager dict
+  for the cancellation requests)
+- concurrent.futures (futures of the submitted jobs)
+"""
+
+
+SOLVER_PROCESSES = int(os.environ.get("SOLVER_PROCESSES", MAX_CONCURRENT_SOLVES))
+SOLVER_MEMORY_LIMIT_MB = int(os.environ.get("SOLVER_MEMORY_LIMIT_MB", 4096))
+SOLVER_CPU_TIME_FACTOR = float(os.environ.get("SOLVER_CPU_TIME_FACTOR", 2))
+
+# CPU time for model building and result extraction on top of the search
+CPU_TIME_MARGIN = 60
+
+pool = None
+pool_lock = threading.Lock()
+
+# progress reports of the workers and the function handling them in the API process
+progress_queue = None
+progress_handler = None
+
+# job_id -> reason ('cancelled' or 'superseded') of the jobs that should stop their search
+cancel_requests = None
+
+
+class SolverCrashed(Exception):
+    """
+    Raised by `run_solve()` if the worker process of a job terminated unexpectedly.
+    """
+    pass
+
+
+class RemoteTraceback(Exception):
+    """
+    Traceback of an exception raised in a worker process, set as cause of the re-raised exception.
+    """
+
+    def __init__(self, text):
+        super().__init__(text)
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+
+class WorkerProcess:
+    """
+    One spawned worker process running `solver.worker.serve()`, connected by a pipe.
+    """
+
+    def __init__(self, context, initargs):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=serve, args=(child,) + tuple(initargs), daemon=True)
+        self.process.start()
+        # only the worker holds the other end now, so a dead worker closes the pipe
+        child.close()
+
+    def run(self, function, args):
+        """
+        Returns:
+            The result of `function(*args)` in the worker process.
+
+        Raises:
+            SolverCrashed: if the process terminated during the job.
+            The exception of the function, with its traceback in the worker as cause.
+        """
+        try:
+            self.connection.send((function, args))
+            answer = self.connection.recv()
+        except (EOFError, OSError):
+            raise SolverCrashed(
+                "The solver process terminated unexpectedly (memory or CPU time limit exceeded)."
+            )
+        if answer[0] == "result":
+            return answer[1]
+        raise answer[1] from RemoteTraceback(answer[2])
+
+    def alive(self):
+        return self.process.is_alive()
+
+    def stop(self, wait=True):
+        """
+        Ends the process, after its current job if `wait` is set, otherwise immediately.
+        """
+        if wait and self.alive():
+            try:
+                self.connection.send(None)
+            except OSError:
+                pass
+            self.process.join(timeout=5)
+        if self.alive():
+            self.process.terminate()
+            self.process.join()
+        self.connection.close()
+
+
+class SolverPool:
+    """
+    A fixed number of supervised worker processes. Every process runs one job at a time, a job waits
+    for the next free process. A process that dies only fails its own job and is replaced.
+    """
+
+    def __init__(self, processes, initargs=(), context=None):
+        """
+        Args:
+            processes (int): Number of worker processes.
+            initargs (tuple): (memory_limit, progress queue, cancellation requests) of `init_worker()`.
+            context: multiprocessing context (default: spawn, the processes do not inherit the
+                threads and locks of the Flask process).
+        """
+        self.context = context or multiprocessing.get_context("spawn")
+        self.initargs = tuple(initargs)
+        self.idle = queue.Queue()
+        self.workers = set()
+        self.lock = threading.Lock()
+        self.closed = False
+        # the processes start (and import OR-Tools) now, ahead of the first job
+        for _ in range(processes):
+            self.idle.put(self.start_worker())
+
+    def start_worker(self):
+        worker_process = WorkerProcess(self.context, self.initargs)
+        with self.lock:
+            self.workers.add(worker_process)
+        return worker_process
+
+    def replace(self, worker_process):
+        """
+        Returns:
+            A new worker process in place of a dead one.
+        """
+        with self.lock:
+            self.workers.discard(worker_process)
+        worker_process.stop(wait=False)
+        return self.start_worker()
+
+    def submit(self, function, *args):
+        """
+        Returns:
+            A future of `function(*args)`, run in the next free worker process. The future fails with
+            `SolverCrashed` if that process dies during the job.
+        """
+        if self.closed:
+            raise RuntimeError("The solver pool is shut down.")
+        future = Future()
+        threading.Thread(target=self.run, args=(future, function, args), daemon=True).start()
+        return future
+
+    def run(self, future, function, args):
+        """
+        Runs one submitted job (in a thread of the API process that waits for its worker).
+        """
+        worker_process = self.idle.get()
+        try:
+            if not future.set_running_or_notify_cancel() or self.closed:
+                return
+            # a process that died while idle (e.g. killed from outside) is replaced before it gets a job
+            if not worker_process.alive():
+                worker_process = self.replace(worker_process)
+            try:
+                future.set_result(worker_process.run(function, args))
+            except SolverCrashed as e:
+                worker_process = self.replace(worker_process)
+                future.set_exception(e)
+            except Exception as e:
+                future.set_exception(e)
+        finally:
+            self.idle.put(worker_process)
+
+    def shutdown(self, wait=True):
+        """
+        Ends all worker processes; with `wait` running jobs are finished first, otherwise they are terminated.
+        """
+        self.closed = True
+        with self.lock:
+            workers = list(self.workers)
+            self.workers.clear()
+        for worker_process in workers:
+            worker_process.stop(wait)
+
+
+def set_progress_handler(handler):
+    """
+    Registers `handler(job_id, progress)` for the progress reports of the jobs (see solver/worker.py).
+    """
+    global progress_handler
+    progress_handler = handler
+
+
+def listen_for_progress(reports):
+    """
+    Listener thread: passes the progress reports of all jobs to the progress handler.
+    """
+    while True:
+        job_id, progress = reports.get()
+        if progress_handler is None:
+            continue
+        try:
+            progress_handler(job_id, progress)
+        except Exception:
+            # a lost progress report must not stop the listener
+            logging.exception("Progress report of job %s failed", job_id)
+
+
+def start_progress_queue(context=None):
+    """
+    Creates the progress queue and its listener thread on the first call. Expects the pool lock to be held.
+    """
+    global progress_queue
+    if progress_queue is None:
+        progress_queue = context.Queue() if context else queue.Queue()
+        threading.Thread(target=listen_for_progress, args=(progress_queue,), daemon=True).start()
+    return progress_queue
+
+
+def start_cancel_requests(context=None):
+    """
+    Creates the shared cancellation requests on the first call. Expects the pool lock to be held.
+    """
+    global cancel_requests
+    if cancel_requests is None:
+        # the manager process outlives replaced pools, so pending requests are not lost
+        cancel_requests = context.Manager().dict() if context else {}
+    return cancel_requests
+
+
+def cancel_solve(job_id, reason="cancelled"):
+    """
+    Stops the search of a running job within a fraction of a second. The job returns the best
+    timetable found so far. Call `forget_cancel()` once the job is done.
+    """
+    with pool_lock:
+        requests = start_cancel_requests(multiprocessing.get_context("spawn") if SOLVER_PROCESSES > 0 else None)
+    requests[job_id] = reason
+
+
+def forget_cancel(job_id):
+    """
+    Removes the cancellation request of a finished job.
+    """
+    with pool_lock:
+        requests = cancel_requests
+    if requests is not None:
+        requests.pop(job_id, None)
+
+
+def start_pool():
+    """
+    Returns:
+        The solver pool of the API, created (and pre-warmed) on the first call.
+    """
+    global pool
+    with pool_lock:
+        if pool is None:
+            context = multiprocessing.get_context("spawn")
+            pool = SolverPool(SOLVER_PROCESSES, (
+                SOLVER_MEMORY_LIMIT_MB * 1024 * 1024, start_progress_queue(context), start_cancel_requests(context)
+            ), context)
+        return pool
+
+
+def run_solve(school, options, max_time_in_seconds, num_workers, previous=None, snapshot=None, job_id=None):
+    """
+    Solves one job in a worker process. Same arguments and result as `solver.worker.solve_school()`.
+
+    Raises:
+        SolverCrashed: if the worker process terminated during the job (the other jobs are not affected).
+    """
+    cpu_time_limit = 0
+    if SOLVER_CPU_TIME_FACTOR > 0:
+        cpu_time_limit = SOLVER_CPU_TIME_FACTOR * max_time_in_seconds * num_workers + CPU_TIME_MARGIN
+
+    if SOLVER_PROCESSES <= 0:
+        # solve in the calling thread, the progress and the cancellations use plain objects of this process
+        with pool_lock:
+            worker.progress_queue = start_progress_queue()
+            worker.cancel_requests = start_cancel_requests()
+        return solve_school(school, options, max_time_in_seconds, num_workers, previous, snapshot, 0, job_id)
+
+    future = start_pool().submit(
+        solve_school, school, options, max_time_in_seconds, num_workers, previous, snapshot, cpu_time_limit, job_id
+    )
+    return future.result()
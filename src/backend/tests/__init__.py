@@ -0,0 +1 @@
+#only needed to make all imports work
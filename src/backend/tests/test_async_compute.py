@@ -0,0 +1,20 @@
+from flask import Flask
+from src.api_endpoints import AsyncCompute as async_compute
+import pytest
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(async_compute.AsyncCompute)
+    return app.test_client()
+
+
+def test_start_computing_without_session_is_rejected_before_queueing(client, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(async_compute.scheduler, "submit", lambda *args, **kwargs: submitted.append(args))
+
+    response = client.get("/start_computing")
+    assert response.status_code == 401
+    assert submitted == []
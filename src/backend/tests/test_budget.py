@@ -0,0 +1,62 @@
+from src.utils import budget
+import pytest
+
+IDLE = {"running": 0, "queued": 0, "allocated_workers": 0}
+BUSY = {"running": 2, "queued": 5, "allocated_workers": 2}
+
+
+def school(classes, subjects=6):
+    return {
+        "classes": [f"{i}a" for i in range(classes)],
+        "days": ["Mon", "Tue", "Wed", "Thu", "Fri"],
+        "hours_per_day": 6,
+        "subjects": [f"subject{i}" for i in range(subjects)]
+    }
+
+
+@pytest.mark.parametrize("load", [IDLE, BUSY])
+@pytest.mark.parametrize("classes", [1, 10, 100])
+def test_time_limit_is_at_least_the_requested_time(load, classes):
+    _, time_limit, _ = budget.allocate_budget(school(classes), 120, load)
+    assert time_limit >= 120
+
+
+def test_big_school_on_idle_server_gets_more_time():
+    _, idle, _ = budget.allocate_budget(school(100), 30, IDLE)
+    _, busy, _ = budget.allocate_budget(school(100), 30, BUSY)
+    assert idle == budget.MAX_STRETCH * 30
+    assert busy == 30
+
+
+def test_ceiling_of_the_administrator(monkeypatch):
+    monkeypatch.setattr(budget, "SOLVER_MAX_TIME", 60)
+    assert budget.allocate_budget(school(1), 300, IDLE)[1] == 60
+
+
+def test_workers_are_shared_with_the_queue(monkeypatch):
+    monkeypatch.setattr(budget, "CPU_COUNT", 8)
+    monkeypatch.setattr(budget, "SOLVER_MAX_WORKERS", 8)
+    assert budget.allocate_budget(school(100), 60, IDLE)[0] == 8
+    assert budget.allocate_budget(school(100), 60, {"running": 1, "queued": 3, "allocated_workers": 4})[0] == 1
+    assert budget.allocate_budget(school(1), 60, IDLE)[0] == 2
+
+
+def test_small_school_stops_when_its_objective_stalls():
+    _, time_limit, stagnation = budget.allocate_budget(school(3), 300, IDLE)
+    assert time_limit == 300
+    assert budget.SOLVER_MIN_TIME <= stagnation < 60
+
+
+def test_stall_time_shrinks_with_the_queue():
+    _, _, alone = budget.allocate_budget(school(3), 300, IDLE)
+    _, _, busy = budget.allocate_budget(school(3), 300, BUSY)
+    assert budget.SOLVER_MIN_TIME <= busy < alone
+
+
+def test_big_school_alone_uses_all_of_its_time():
+    assert budget.allocate_budget(school(100), 30, IDLE)[2] == 0
+
+
+def test_stall_stop_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(budget, "SOLVER_STALL_FACTOR", 0)
+    assert budget.allocate_budget(school(3), 300, BUSY)[2] == 0
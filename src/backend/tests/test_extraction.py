@@ -0,0 +1,92 @@
+from ortools.sat.python import cp_model
+from src.solver.model import MODEL_BACKENDS, build_timetable_model, extract_compact, extract_timetable
+from src.utils.result_format import expand_result
+from src.benchmarks.extraction import extract_per_value, recorded_solution
+from src.benchmarks.generator import generate_school
+import pytest
+
+
+class ValuesOnly:
+    """
+    A solution that only offers `Value()`, like objects without a response.
+    """
+
+    def __init__(self, solution):
+        self.solution = solution
+
+    def Value(self, expression):
+        return self.solution.Value(expression)
+
+
+class FirstSolution(cp_model.CpSolverSolutionCallback):
+    """
+    Extracts the compact timetable of the first solution inside the callback, like the provisional
+    timetables of a running job, and the reference of the same solution.
+    """
+
+    def __init__(self, school, variables):
+        super().__init__()
+        self.school = school
+        self.variables = variables
+        self.timetables = None
+
+    def on_solution_callback(self):
+        if self.timetables is None:
+            self.timetables = (
+                expand_result(extract_compact(self, self.school, self.variables)),
+                extract_per_value(self, self.school, self.variables)
+            )
+            self.StopSearch()
+
+
+@pytest.mark.parametrize("model_backend", MODEL_BACKENDS)
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_recorded_solution_matches_reference(model_backend, seed):
+    school = generate_school(seed=seed, classes=4, teachers=6, qualification_density=0.6)
+    variables = build_timetable_model(school, model_backend)
+    solution = recorded_solution(school, variables, seed)
+
+    expected = extract_per_value(solution, school, variables)
+    assert extract_timetable(solution, school, variables) == expected
+    # the extraction plan kept in `variables` gives the same timetable again
+    assert extract_timetable(solution, school, variables) == expected
+    # objects without a response are asked for every value
+    assert extract_timetable(ValuesOnly(solution), school, variables) == expected
+    # the compact format of the job store holds the same timetables
+    assert expand_result(extract_compact(solution, school, variables)) == expected
+
+
+@pytest.mark.parametrize("model_backend", MODEL_BACKENDS)
+def test_solved_model_matches_reference(model_backend):
+    school = generate_school(seed=3, classes=2, teachers=4, qualification_density=1.0, fill_rate=0.4)
+    variables = build_timetable_model(school, model_backend)
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = 30
+    solver.parameters.num_workers = 1
+    callback = FirstSolution(school, variables)
+
+    status = solver.Solve(variables["model"], callback)
+    assert status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    assert callback.timetables[0] == callback.timetables[1]
+    assert extract_timetable(solver, school, variables) == extract_per_value(solver, school, variables)
+
+
+def test_slot_with_teacher_but_without_subject_is_free():
+    school = generate_school(seed=0, classes=4, teachers=6, qualification_density=0.6)
+    variables = build_timetable_model(school, "integer")
+    solution = recorded_solution(school, variables, fill_rate=1.0)
+
+    # the teacher stays assigned, the subject of the first slot is removed
+    c, d, h = school["classes"][0], 0, 0
+    t_idx = solution.Value(variables["teacher_schedule"][(c, d, h)])
+    assert t_idx >= 0
+    solution.response.solution[variables["schedule"][(c, d, h)].Index()] = -1
+
+    expected = extract_per_value(solution, school, variables)
+    timetable = extract_timetable(solution, school, variables)
+    assert timetable == expected
+    assert expand_result(extract_compact(solution, school, variables)) == expected
+
+    teacher = list(timetable["teachers"])[t_idx]
+    assert timetable["classes"][c][school["days"][d]][h] == "free"
+    assert not timetable["teachers"][teacher][school["days"][d]][h].endswith(f"({c})")
@@ -0,0 +1,84 @@
+from src.utils.feasibility import check_feasibility
+from src.solver.school import school_problems
+from src.benchmarks.generator import generate_school
+import pytest
+
+
+def school(**changes):
+    """
+    Returns:
+        The arguments of `check_feasibility()` for a small feasible school, with `changes` applied.
+    """
+    data = {
+        "classes": ["5a", "5b"],
+        "subjects": ["Math", "English", "PE"],
+        "class_subject_hours": {
+            "5a": {"Math": 4, "English": 3, "PE": 2},
+            "5b": {"Math": 4, "English": 3, "PE": 2}
+        },
+        "teachers_info": {
+            1: {"name": "Maier", "max_hours": 10, "subjects": ["Math"]},
+            2: {"name": "Huber", "max_hours": 10, "subjects": ["English", "PE"]},
+            3: {"name": "Berg", "max_hours": 10, "subjects": ["PE", "Math"]}
+        },
+        "restricted_parallel_subjects": [("PE", 1)],
+        "hours_per_day": 5,
+        "max_hours_per_day": 2,
+        "num_days": 5
+    }
+    data.update(changes)
+    return data
+
+
+def problem_types(**changes):
+    return [problem["type"] for problem in check_feasibility(**school(**changes))]
+
+
+def test_feasible_school_has_no_problems():
+    assert problem_types() == []
+
+
+@pytest.mark.parametrize("changes, expected", [
+    # 2 days with 4 periods are 8 slots for 9 hours
+    ({"hours_per_day": 4, "num_days": 2, "max_hours_per_day": 4}, "class_hours_exceed_slots"),
+    ({"class_subject_hours": {"5a": {"Math": 4, "Latin": 1}, "5b": {"Math": 4}}}, "unknown_subject"),
+    ({"class_subject_hours": {"5a": {"Math": 11}, "5b": {}}}, "subject_exceeds_daily_limit"),
+    ({"teachers_info": {1: {"name": "Maier", "max_hours": 30, "subjects": ["Math", "PE"]}}}, "no_qualified_teacher"),
+    ({"class_subject_hours": {"5a": {"Math": 9}, "5b": {}}, "teachers_info": {
+        1: {"name": "Maier", "max_hours": 8, "subjects": ["Math"]},
+        2: {"name": "Berg", "max_hours": 8, "subjects": ["Math"]}
+    }, "max_hours_per_day": 3}, "no_teacher_with_enough_hours"),
+    ({"teachers_info": {
+        1: {"name": "Maier", "max_hours": 4, "subjects": ["Math"]},
+        2: {"name": "Huber", "max_hours": 20, "subjects": ["English", "PE"]},
+        3: {"name": "Berg", "max_hours": 3, "subjects": ["Math"]}
+    }}, "subject_exceeds_teacher_capacity"),
+    ({"teachers_info": {
+        1: {"name": "Maier", "max_hours": 8, "subjects": ["Math"]},
+        2: {"name": "Huber", "max_hours": 8, "subjects": ["English", "PE", "Math"]}
+    }}, "demand_exceeds_teacher_capacity"),
+    ({"class_subject_hours": {c: {"PE": 8} for c in ["5a", "5b", "5c", "5d"]},
+      "classes": ["5a", "5b", "5c", "5d"], "max_hours_per_day": 2, "hours_per_day": 6,
+      "teachers_info": {t: {"name": f"T{t}", "max_hours": 8, "subjects": ["PE"]} for t in range(4)}},
+     "subject_exceeds_parallel_limit"),
+    ({"class_subject_hours": {"5a": {"Math": 4}}}, "class_without_curriculum"),
+    ({"restricted_parallel_subjects": [("Latin", 1)]}, "unknown_parallel_limit_subject"),
+])
+def test_each_rejection_reason(changes, expected):
+    assert expected in problem_types(**changes)
+
+
+def test_problems_name_the_entities():
+    problems = check_feasibility(**school(class_subject_hours={"5a": {"Math": 4}},
+                                          restricted_parallel_subjects=[("Latin", 2)]))
+    assert {"type": "class_without_curriculum", "class": "5b"}.items() <= problems[0].items()
+    assert problems[-1]["subject"] == "Latin"
+    assert all(problem["message"] for problem in problems)
+
+
+@pytest.mark.parametrize("classes", [1, 5, 20, 40])
+@pytest.mark.parametrize("qualification_density", [0.1, 0.3, 1.0])
+def test_generated_schools_are_feasible(classes, qualification_density):
+    for seed in range(5):
+        school = generate_school(seed=seed, classes=classes, qualification_density=qualification_density)
+        assert school_problems(school) == []
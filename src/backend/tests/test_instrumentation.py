@@ -0,0 +1,47 @@
+from ortools.sat.python import cp_model
+from src.solver import instrumentation
+import pytest
+
+
+class Recorder:
+    def __init__(self):
+        self.timings, self.solver_statistics = instrumentation.new_recording()
+
+
+def solve(search_log, monkeypatch):
+    monkeypatch.setattr(instrumentation, "SOLVER_SEARCH_LOG", search_log)
+    model = cp_model.CpModel()
+    x = [model.NewIntVar(0, 10, f"x{i}") for i in range(5)]
+    model.Add(sum(x) == 17)
+    model.AddAllDifferent(x)
+    model.Maximize(x[0] * 3 - x[1])
+
+    recorder = Recorder()
+    solver = cp_model.CpSolver()
+    solver.parameters.num_search_workers = 1
+    instrumentation.instrument(solver)
+    solver.Solve(model)
+    instrumentation.record_solve(recorder, solver)
+    return recorder, solver
+
+
+def test_solve_time_without_search_log(monkeypatch):
+    recorder, solver = solve(0, monkeypatch)
+    assert not solver.parameters.log_search_progress
+    assert solver.ResponseProto().solve_log == ""
+    assert set(recorder.timings) == {"model_build", "solve", "extraction"}
+    assert recorder.timings["solve"] == pytest.approx(solver.WallTime())
+    assert recorder.solver_statistics["solves"] == 1
+
+
+def test_presolve_and_search_with_search_log(monkeypatch):
+    recorder, solver = solve(1, monkeypatch)
+    assert solver.ResponseProto().solve_log
+    assert set(recorder.timings) == {"model_build", "presolve", "search", "extraction"}
+    # the times of the log are rounded to hundredths of a second
+    assert recorder.timings["presolve"] + recorder.timings["search"] == pytest.approx(solver.WallTime(), abs=0.02)
+
+
+def test_recorder_without_timings_is_ignored(monkeypatch):
+    _, solver = solve(0, monkeypatch)
+    instrumentation.record_solve(None, solver)
@@ -0,0 +1,223 @@
+from src.utils import job_store
+from src.utils.job_store import MemoryJobStore, compress_result
+import re
+import sqlite3
+import pytest
+
+
+def timetable_result(name="Math"):
+    return {
+        "status": "success",
+        "classes": {"5a": {"Mo": [f"{name} (Maier)", "free"]}},
+        "teachers": {"Maier": {"Mo": [f"{name} (5a)", "free"]}},
+        "statistics": {"objective": 3}
+    }
+
+
+def compact_timetable_result(name="Math"):
+    """
+    Returns:
+        `timetable_result()` in the compact format, as the solver returns it.
+    """
+    return {
+        "status": "success",
+        "statistics": {"objective": 3},
+        "format": "compact",
+        "days": ["Mo"],
+        "classes": ["5a"],
+        "teachers": ["Maier"],
+        "subjects": [name],
+        "subject_grid": [[[0, -1]]],
+        "teacher_grid": [[[0, -1]]]
+    }
+
+
+def stored_size(store):
+    return sum(len(job["result"] or b"") for job in store.jobs.values())
+
+
+def test_update_and_get():
+    store = MemoryJobStore()
+    store.create("a", 1, "queued")
+    assert store.get("a") == {"status": "queued", "result": None, "progress": None}
+
+    store.update("a", "running")
+    store.set_progress("a", {"solutions": 1})
+    store.update("a", "finished", timetable_result())
+    assert store.get("a") == {"status": "finished", "result": timetable_result(), "progress": {"solutions": 1}}
+    assert store.get("unknown") is None
+
+
+def test_compact_result_is_stored_and_expanded():
+    store = MemoryJobStore()
+    store.create("a", 1)
+    store.update("a", "finished", compact_timetable_result())
+    assert store.get("a", compact=True)["result"] == compact_timetable_result()
+    assert store.get("a")["result"] == timetable_result()
+
+    # results in the full format are stored and returned as they are
+    store.update("a", "finished", timetable_result())
+    assert store.get("a", compact=True)["result"] == timetable_result()
+
+
+def test_size_accounting_follows_every_change():
+    store = MemoryJobStore()
+    store.create("a", 1)
+    store.set_provisional("a", timetable_result("English"))
+    assert store.size == stored_size(store)
+
+    store.update("a", "finished", timetable_result())
+    store.create("b", 1)
+    store.update("b", "error", {"error": "failed"})
+    assert store.size == stored_size(store) > 0
+
+    store.remove("a")
+    assert store.size == stored_size(store)
+
+
+def test_set_provisional_ignores_jobs_that_are_not_running():
+    store = MemoryJobStore()
+    store.create("queued", 1, "queued")
+    store.set_provisional("queued", timetable_result("English"))
+    assert store.get("queued")["result"] is None
+
+    store.create("a", 1, "running")
+    store.set_provisional("a", timetable_result("English"))
+    assert store.get("a")["result"] == timetable_result("English")
+
+    # a late report after the final result must not replace it
+    store.update("a", "finished", timetable_result())
+    store.set_provisional("a", timetable_result("English"))
+    assert store.get("a")["result"] == timetable_result()
+    store.set_provisional("unknown", timetable_result())
+    assert store.get("unknown") is None
+
+
+def test_eviction_by_number_keeps_active_jobs():
+    store = MemoryJobStore(max_jobs=2)
+    store.create("running", 1, "running")
+    store.create("old", 1)
+    store.update("old", "finished", timetable_result())
+    store.create("new", 1)
+    store.update("new", "finished", timetable_result())
+
+    # the least recently updated finished job goes, the running one stays although it is older
+    assert store.get("old") is None
+    assert store.get("running") is not None and store.get("new") is not None
+    assert store.size == stored_size(store)
+
+
+def test_eviction_by_bytes():
+    size = len(compress_result(timetable_result()))
+    store = MemoryJobStore(max_bytes=2 * size)
+    for job_id in ["a", "b", "c"]:
+        store.create(job_id, 1)
+        store.update(job_id, "finished", timetable_result())
+
+    assert store.get("a") is None
+    assert store.get("b") is not None and store.get("c") is not None
+    assert store.size <= 2 * size
+
+
+def test_expired_jobs_are_removed(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.utils.job_store.time.time", lambda: now[0])
+    store = MemoryJobStore(ttl=60)
+    store.create("finished", 1)
+    store.update("finished", "finished", timetable_result())
+    store.create("running", 1, "running")
+
+    now[0] += 61
+    assert store.get("finished") is None
+    assert store.get("running") is not None
+    assert store.size == 0
+
+
+class SQLiteCursor:
+    """
+    Cursor of the MariaDB connector on top of sqlite: the placeholders and the date arithmetic
+    of the statements of `MariaDBJobStore` are translated.
+    """
+
+    def __init__(self, database):
+        self.cursor = database.cursor()
+
+    def execute(self, statement, parameters=()):
+        statement = re.sub(r"NOW\(\) - INTERVAL %s SECOND", "datetime('now', '-' || %s || ' seconds')", statement)
+        statement = statement.replace("NOW()", "datetime('now')").replace("%s", "?")
+        self.cursor.execute(statement, parameters)
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def close(self):
+        self.cursor.close()
+
+
+class SQLiteConnection:
+    def __init__(self, database):
+        self.database = database
+
+    def cursor(self, buffered=False):
+        return SQLiteCursor(self.database)
+
+    def commit(self):
+        self.database.commit()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = sqlite3.connect(":memory:", check_same_thread=False)
+    database.execute("""
+        CREATE TABLE Jobs (
+            job_id VARCHAR(36) PRIMARY KEY, Uid INTEGER, status VARCHAR(16) NOT NULL,
+            result BLOB, progress TEXT, updated_at DATETIME NOT NULL
+        )
+    """)
+    monkeypatch.setattr(job_store, "get_db_connection", lambda: SQLiteConnection(database))
+    return database
+
+
+def add_job(database, job_id, status, seconds_ago):
+    database.execute(
+        "INSERT INTO Jobs (job_id, Uid, status, updated_at) VALUES (?, 1, ?, datetime('now', ?))",
+        (job_id, status, f"-{seconds_ago} seconds")
+    )
+    database.commit()
+
+
+def test_restart_marks_jobs_of_stopped_processes_as_lost(database):
+    # left running and queued by a process that stopped, and running in a process that is alive
+    add_job(database, "stopped-running", "running", 600)
+    add_job(database, "stopped-queued", "queued", 600)
+    add_job(database, "alive", "running", 10)
+
+    store = job_store.MariaDBJobStore(lost_after=120)
+    for job_id in ("stopped-running", "stopped-queued"):
+        assert store.get(job_id) == {"status": "error", "result": job_store.LOST_RESULT, "progress": None}
+    assert store.get("alive")["status"] == "running"
+    assert database.execute("SELECT status FROM Jobs WHERE job_id = 'stopped-running'").fetchone() == ("error",)
+
+
+def test_job_without_heartbeat_is_reported_lost_before_it_is_marked(database):
+    store = job_store.MariaDBJobStore(lost_after=120)
+    add_job(database, "stopped", "running", 600)
+    assert store.get("stopped")["result"] == job_store.LOST_RESULT
+
+
+def test_heartbeat_keeps_the_active_jobs_of_the_process(database):
+    store = job_store.MariaDBJobStore(heartbeat=3600, lost_after=120)
+    store.create("a", 1, "queued")
+    store.create("b", 1, "running")
+    store.update("b", "finished", timetable_result())
+    database.execute("UPDATE Jobs SET updated_at = datetime('now', '-600 seconds')")
+    database.commit()
+
+    store.refresh()
+    assert store.get("a")["status"] == "queued"
+    # finished jobs get no heartbeat, they expire with the TTL
+    assert store.get("b")["status"] == "finished"
+    assert database.execute("SELECT updated_at < datetime('now', '-300 seconds') FROM Jobs WHERE job_id = 'b'").fetchone() == (1,)
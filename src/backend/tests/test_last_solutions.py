@@ -0,0 +1,42 @@
+from src.utils import last_solutions
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def empty(monkeypatch):
+    monkeypatch.setattr(last_solutions, "last_solutions", type(last_solutions.last_solutions)())
+    monkeypatch.setattr(last_solutions, "LAST_SOLUTIONS_SIZE", 2)
+
+
+def test_store_and_get():
+    last_solutions.store_last_solution(1, {"classes": ["5a"]}, {"slots": []})
+    assert last_solutions.get_last_solution(1) == {"school": {"classes": ["5a"]}, "snapshot": {"slots": []}}
+    assert last_solutions.get_last_solution(2) is None
+
+
+def test_least_recently_used_user_is_evicted():
+    last_solutions.store_last_solution(1, {}, "first")
+    last_solutions.store_last_solution(2, {}, "second")
+    # user 1 was used after user 2
+    last_solutions.get_last_solution(1)
+    last_solutions.store_last_solution(3, {}, "third")
+
+    assert last_solutions.get_last_solution(2) is None
+    assert last_solutions.get_last_solution(1)["snapshot"] == "first"
+    assert len(last_solutions.last_solutions) == 2
+
+
+def test_old_runs_expire(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(last_solutions.time, "time", lambda: now)
+    last_solutions.store_last_solution(1, {}, "first")
+
+    now += last_solutions.LAST_SOLUTIONS_TTL + 1
+    assert last_solutions.get_last_solution(1) is None
+    assert 1 not in last_solutions.last_solutions
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(last_solutions, "LAST_SOLUTIONS_SIZE", 0)
+    last_solutions.store_last_solution(1, {}, "first")
+    assert last_solutions.get_last_solution(1) is None
@@ -0,0 +1,108 @@
+from src.utils import metrics
+import math
+import re
+import pytest
+
+# grammar of the Prometheus text exposition format (version 0.0.4)
+METRIC_NAME = r"[a-zA-Z_:][a-zA-Z0-9_:]*"
+LABEL = r'[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*"'
+VALUE = r"[-+]?(?:[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?|Inf)|NaN"
+HELP_LINE = re.compile(rf"# HELP ({METRIC_NAME}) (?:[^\\\n]|\\[\\n])*")
+TYPE_LINE = re.compile(rf"# TYPE ({METRIC_NAME}) (counter|gauge|histogram|summary|untyped)")
+SAMPLE_LINE = re.compile(rf"({METRIC_NAME})(\{{(?:{LABEL}(?:,{LABEL})*)?\}})? ({VALUE})")
+LABEL_PAIR = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\\n]|\\[\\"n])*)"')
+
+
+def parse(text):
+    """
+    Parses the exposition text and checks its structure.
+
+    Returns:
+        {family name: {"type", "help", "samples": [(name, {label: value}, value)]}}
+    """
+    assert text.endswith("\n")
+    families, current = {}, None
+    for line in text[:-1].split("\n"):
+        if match := HELP_LINE.fullmatch(line):
+            assert match.group(1) not in families, f"family twice: {line}"
+            current = families[match.group(1)] = {"help": line, "type": None, "samples": []}
+        elif match := TYPE_LINE.fullmatch(line):
+            # TYPE follows the HELP of the family, before its samples
+            assert current is families.get(match.group(1)) and current["type"] is None and not current["samples"]
+            current["type"] = match.group(2)
+        else:
+            match = SAMPLE_LINE.fullmatch(line)
+            assert match, f"no valid sample: {line!r}"
+            name, labels, value = match.groups()
+            suffixes = ("_bucket", "_sum", "_count") if current["type"] == "histogram" else ("",)
+            family = next(name[:-len(s)] if s else name for s in suffixes if name.endswith(s))
+            assert families.get(family) is current, f"sample outside of its family: {line}"
+            current["samples"].append((name, dict(LABEL_PAIR.findall(labels or "")), float(value.replace("Inf", "inf"))))
+    return families
+
+
+def check_histogram(family):
+    """
+    Checks that the buckets of every series are cumulative and end with +Inf == count.
+    """
+    series = {}
+    for name, labels, value in family["samples"]:
+        key = tuple(sorted((k, v) for k, v in labels.items() if k != "le"))
+        series.setdefault(key, {"buckets": [], "sum": None, "count": None})
+        if name.endswith("_bucket"):
+            series[key]["buckets"].append((float(labels["le"].replace("Inf", "inf")), value))
+        else:
+            series[key][name.rsplit("_", 1)[1]] = value
+    for values in series.values():
+        bounds = [bound for bound, _ in values["buckets"]]
+        counts = [count for _, count in values["buckets"]]
+        assert bounds == sorted(bounds) and bounds[-1] == math.inf
+        assert counts == sorted(counts) and counts[-1] == values["count"]
+        assert values["sum"] is not None
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(metrics, "registry", [])
+
+
+def test_rendered_metrics_follow_the_format(registry):
+    plain = metrics.Counter("test_plain_total", "A counter without labels.")
+    labelled = metrics.Counter("test_labelled_total", 'Help with a back\\slash\nand a line feed.', ("status",))
+    histogram = metrics.Histogram("test_seconds", "A histogram.", (0.1, 1, 10), ("endpoint",))
+    empty = metrics.Histogram("test_empty_seconds", "Not observed yet.", (1,))
+
+    plain.inc()
+    plain.inc(2)
+    labelled.inc(status='with "quotes"\\ and\nline feed')
+    labelled.inc(status="success")
+    for value in (0.05, 0.5, 5, 50):
+        histogram.observe(value, endpoint="a")
+    histogram.observe(0.5, endpoint="b")
+
+    families = parse(metrics.render_metrics())
+    assert [families[name]["type"] for name in families] == ["counter", "counter", "histogram", "histogram"]
+    assert families["test_plain_total"]["samples"] == [("test_plain_total", {}, 3.0)]
+    assert {labels["status"] for _, labels, _ in families["test_labelled_total"]["samples"]} == \
+        {'with \\"quotes\\"\\\\ and\\nline feed', "success"}
+    check_histogram(families["test_seconds"])
+    check_histogram(families["test_empty_seconds"])
+
+    buckets = [value for name, labels, value in families["test_seconds"]["samples"]
+               if name.endswith("_bucket") and labels["endpoint"] == "a"]
+    assert buckets == [1, 2, 3, 4]
+
+
+def test_special_values():
+    assert metrics.format_value(float("inf")) == "+Inf"
+    assert metrics.format_value(float("-inf")) == "-Inf"
+    assert metrics.format_value(float("nan")) == "NaN"
+    assert metrics.format_value(3) == "3.0"
+
+
+def test_metrics_of_the_api_follow_the_format():
+    families = parse(metrics.render_metrics())
+    assert "fottg_jobs_finished_total" in families
+    for family in families.values():
+        if family["type"] == "histogram":
+            check_histogram(family)
@@ -0,0 +1,124 @@
+from src.benchmarks.generator import generate_school
+from src.solver import model_cache
+from src.solver.model_cache import build_cached_model, cache_directory, encode_variable, school_fingerprint, VARIABLE_STORES
+import os
+import pickle
+import threading
+import pytest
+
+
+class PlantedPayload:
+    """
+    Pickle that creates a file when it is loaded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return (open, (self.path, "w"))
+
+
+def encoded_store(store):
+    """
+    Returns:
+        The encoded variables of a store, the terms of linear expressions in index order.
+    """
+    encoded = {}
+    for key, value in store.items():
+        entry = encode_variable(value)
+        encoded[key] = entry if entry[0] == "var" else (entry[0], sorted(entry[1]), entry[2])
+    return encoded
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "cache"
+    monkeypatch.setattr(model_cache, "MODEL_CACHE_DIR", str(directory))
+    return directory
+
+
+@pytest.mark.parametrize("model_backend", ["integer", "onehot"])
+def test_cached_model_equals_built_model(cache_dir, model_backend):
+    school = generate_school(seed=1, classes=3)
+    built, hit = build_cached_model(school, model_backend)
+    assert not hit
+    loaded, hit = build_cached_model(school, model_backend)
+    assert hit
+
+    assert loaded["model"].Proto() == built["model"].Proto()
+    assert loaded["symmetry"] == built["symmetry"]
+    assert loaded["groups"] == built["groups"]
+    for store in VARIABLE_STORES:
+        assert encoded_store(loaded[store]) == encoded_store(built[store])
+
+
+def test_cache_directory_is_private(cache_dir):
+    school = generate_school(seed=1, classes=3)
+    build_cached_model(school)
+    assert cache_dir.stat().st_mode & 0o777 == 0o700
+    assert all(entry.stat().st_mode & 0o077 == 0 for entry in cache_dir.iterdir())
+
+
+def test_shared_directory_is_not_used(cache_dir):
+    cache_dir.mkdir(mode=0o700)
+    os.chmod(cache_dir, 0o777)
+    assert cache_directory() is None
+
+    school = generate_school(seed=1, classes=3)
+    assert build_cached_model(school)[1] is False
+    assert build_cached_model(school)[1] is False
+    assert list(cache_dir.iterdir()) == []
+
+
+def test_planted_pickle_is_never_loaded(cache_dir, tmp_path):
+    school = generate_school(seed=1, classes=3)
+    cache_dir.mkdir(mode=0o700)
+    marker = tmp_path / "executed"
+    fingerprint = school_fingerprint(school, model_backend="integer", symmetry_breaking=False)
+    with open(cache_dir / f"{fingerprint}.model", "wb") as f:
+        pickle.dump(PlantedPayload(str(marker)), f)
+
+    variables, hit = build_cached_model(school)
+    assert not hit
+    assert not marker.exists()
+    assert variables["model"].Proto().variables
+
+
+@pytest.mark.parametrize("cut", ["proto", "index map"])
+def test_corrupt_entry_is_a_miss(cache_dir, cut):
+    school = generate_school(seed=1, classes=3)
+    build_cached_model(school)
+    path = next(cache_dir.iterdir())
+    metadata, proto = path.read_bytes().split(b"\n", 1)
+    if cut == "proto":
+        # truncated while the proto was written
+        path.write_bytes(metadata + b"\n" + proto[:len(proto) // 2])
+    else:
+        # valid JSON that refers to variables the proto does not have
+        path.write_bytes(metadata.replace(b'"schedule":[', b'"schedule":[[[0],["var",999999]],', 1) + b"\n" + proto)
+
+    variables, hit = build_cached_model(school)
+    assert not hit
+    assert variables["model"].Proto().variables
+    # the rebuilt entry replaces the corrupt one
+    assert build_cached_model(school)[1] is True
+
+
+def test_concurrent_stores_leave_a_valid_entry(cache_dir):
+    school = generate_school(seed=1, classes=3)
+    built, _ = build_cached_model(school)
+    for entry in cache_dir.iterdir():
+        entry.unlink()
+
+    fingerprint = school_fingerprint(school, model_backend="integer", symmetry_breaking=False)
+    threads = [threading.Thread(target=model_cache.store_model, args=(fingerprint, built)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # one entry, no temporary files left behind
+    assert [entry.name for entry in cache_dir.iterdir()] == [f"{fingerprint}.model"]
+    loaded = model_cache.load_model(fingerprint)
+    assert loaded["model"].Proto() == built["model"].Proto()
@@ -0,0 +1,45 @@
+from src.utils import result_cache
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def empty(monkeypatch):
+    monkeypatch.setattr(result_cache, "result_cache", type(result_cache.result_cache)())
+
+
+def solved_result():
+    return {
+        "status": "success",
+        "classes": {"5a": {"Monday": ["Math (Maier)"]}},
+        "teachers": {"Maier": {"Monday": ["Math (5a)"]}},
+        "cached": False,
+        "optimal": True,
+        "statistics": {
+            "model": "integer", "strategy": "monolithic", "objective": 12.0, "best_bound": 12.0,
+            "solver_status": "OPTIMAL", "solutions": 7, "first_solution_time": 0.4, "wall_time": 3.2,
+            "stop_reason": None, "warm_start": True, "num_workers": 4, "time_limit": 60,
+            "timings": {"queue": 5.0, "load": 0.1, "search": 3.0}
+        }
+    }
+
+
+def test_served_result_drops_the_statistics_of_the_earlier_solve():
+    result_cache.store_result("fingerprint", solved_result(), True, {}, None)
+
+    served = result_cache.served_result(result_cache.get_cached_result("fingerprint"), {"queue": 0.01, "load": 0.2})
+    assert served["cached"] is True
+    assert served["classes"] == solved_result()["classes"]
+    assert served["statistics"] == {
+        "model": "integer", "strategy": "monolithic", "objective": 12.0, "best_bound": 12.0,
+        "solver_status": "OPTIMAL", "timings": {"queue": 0.01, "load": 0.2}
+    }
+
+    # the cache keeps the result as it was stored
+    assert result_cache.get_cached_result("fingerprint")["result"] == solved_result()
+
+
+def test_feasible_result_does_not_replace_an_optimal_one():
+    result_cache.store_result("fingerprint", solved_result(), True, {}, None)
+    feasible = dict(solved_result(), optimal=False)
+    result_cache.store_result("fingerprint", feasible, False, {}, None)
+    assert result_cache.get_cached_result("fingerprint")["optimal"] is True
@@ -0,0 +1,138 @@
+from src.utils.scheduler import SolveScheduler, QueueFull
+import threading
+import time
+import pytest
+
+
+class Jobs:
+    """
+    Targets of the tests: every job blocks until it is released and records when it started.
+    """
+
+    def __init__(self):
+        self.started = []
+        self.gates = {}
+        self.lock = threading.Lock()
+
+    def run(self, job_id):
+        with self.lock:
+            gate = self.gates.setdefault(job_id, threading.Event())
+            self.started.append(job_id)
+        gate.wait(10)
+
+    def finish(self, job_id):
+        with self.lock:
+            self.gates.setdefault(job_id, threading.Event()).set()
+
+    def wait_started(self, count):
+        deadline = time.monotonic() + 10
+        while len(self.started) < count:
+            assert time.monotonic() < deadline, f"only {self.started} started"
+            time.sleep(0.01)
+
+
+@pytest.fixture
+def jobs():
+    jobs = Jobs()
+    yield jobs
+    # let the daemon worker threads of the test finish their jobs
+    for job_id in list(jobs.gates) + [f"job{i}" for i in range(10)]:
+        jobs.finish(job_id)
+
+
+def submit(scheduler, jobs, job_id, Uid, key="options"):
+    return scheduler.submit(job_id, Uid, jobs.run, (job_id,), key=key)
+
+
+def test_runs_at_most_max_concurrent_jobs_in_order(jobs):
+    scheduler = SolveScheduler(max_concurrent=2, max_queued=10)
+    for i in range(4):
+        submit(scheduler, jobs, f"job{i}", Uid=i)
+    jobs.wait_started(2)
+    time.sleep(0.1)
+    assert jobs.started == ["job0", "job1"]
+    assert scheduler.queue_info("job3")["queue_position"] == 2
+
+    jobs.finish("job0")
+    jobs.wait_started(3)
+    assert jobs.started[2] == "job2"
+
+
+def test_queued_job_with_same_options_is_reused(jobs):
+    scheduler = SolveScheduler(max_concurrent=1, max_queued=10)
+    submit(scheduler, jobs, "job0", Uid=1)
+    jobs.wait_started(1)
+
+    # job0 runs, so job1 is queued (and supersedes job0)
+    assert submit(scheduler, jobs, "job1", Uid=2) == ("job1", False, None)
+    assert submit(scheduler, jobs, "job2", Uid=2) == ("job1", True, None)
+    assert list(scheduler.queue) == ["job1"]
+
+
+def test_new_options_supersede_queued_and_running_jobs(jobs):
+    stopped = []
+    scheduler = SolveScheduler(max_concurrent=1, max_queued=10, stop=lambda job_id, reason: stopped.append((job_id, reason)))
+    submit(scheduler, jobs, "job0", Uid=1)
+    jobs.wait_started(1)
+
+    # a running job of the user is stopped
+    assert submit(scheduler, jobs, "job1", Uid=1, key="other") == ("job1", False, ("job0", "running"))
+    assert stopped == [("job0", "superseded")]
+    assert scheduler.cancellation("job0") == "superseded"
+
+    # a queued job of the user leaves the queue
+    assert submit(scheduler, jobs, "job2", Uid=1, key="third") == ("job2", False, ("job1", "queued"))
+    assert list(scheduler.queue) == ["job2"]
+
+
+def test_queue_full(jobs):
+    scheduler = SolveScheduler(max_concurrent=1, max_queued=2)
+    submit(scheduler, jobs, "job0", Uid=0)
+    jobs.wait_started(1)
+    submit(scheduler, jobs, "job1", Uid=1)
+    submit(scheduler, jobs, "job2", Uid=2)
+
+    with pytest.raises(QueueFull):
+        submit(scheduler, jobs, "job3", Uid=3)
+    assert "job3" not in scheduler.queue
+
+    # a user replacing the own queued job does not need an additional place
+    assert submit(scheduler, jobs, "job4", Uid=2, key="other")[2] == ("job2", "queued")
+
+
+def test_cancel_checks_the_owner(jobs):
+    scheduler = SolveScheduler(max_concurrent=1, max_queued=10)
+    submit(scheduler, jobs, "job0", Uid=0)
+    jobs.wait_started(1)
+    submit(scheduler, jobs, "job1", Uid=1)
+
+    assert scheduler.cancel("job1", Uid=2) is None
+    assert scheduler.cancel("job1", Uid=1) == "queued"
+    assert scheduler.cancel("job1", Uid=1) is None
+    assert scheduler.cancel("job0", Uid=0) == "running"
+
+
+def test_released_job_is_not_reused(jobs):
+    scheduler = SolveScheduler(max_concurrent=1, max_queued=10)
+    submit(scheduler, jobs, "job0", Uid=1)
+    jobs.wait_started(1)
+    scheduler.release(1, "job0")
+
+    # the user has no active job anymore, nothing is superseded
+    assert submit(scheduler, jobs, "job1", Uid=1) == ("job1", False, None)
+
+
+def fail():
+    raise RuntimeError("job failed")
+
+
+def test_failing_job_does_not_end_the_worker(jobs):
+    scheduler = SolveScheduler(max_concurrent=1, max_queued=10)
+    for i in range(3):
+        scheduler.submit(f"failing{i}", Uid=f"failing{i}", target=fail)
+    submit(scheduler, jobs, "job0", Uid=0)
+
+    # the only worker survives all failures and starts the next job
+    jobs.wait_started(1)
+    assert jobs.started == ["job0"]
+    assert len(scheduler.workers) == 1
@@ -0,0 +1,59 @@
+from src.benchmarks.generator import generate_school
+from src.solver.school import solve_timetable
+from src.utils.solver_pool import SolverPool, SolverCrashed, RemoteTraceback
+import os
+import signal
+import time
+import pytest
+
+
+# jobs of the tests, module level functions so the spawned workers can import them
+
+def kill_worker(delay):
+    time.sleep(delay)
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def square(x):
+    return x * x
+
+
+def fail():
+    raise ValueError("broken school")
+
+
+@pytest.fixture
+def pool():
+    pool = SolverPool(2)
+    yield pool
+    pool.shutdown(wait=False)
+
+
+def test_killed_job_does_not_affect_concurrent_job(pool):
+    school = generate_school(seed=1, classes=3)
+    solving = pool.submit(solve_timetable, school, {}, 10)
+    killed = pool.submit(kill_worker, 1)
+
+    with pytest.raises(SolverCrashed):
+        killed.result(timeout=120)
+    assert not solving.done()
+
+    result = solving.result(timeout=120)["result"]
+    assert result["status"] == "success"
+    assert result["classes"] == school["classes"]
+
+
+def test_dead_worker_is_replaced(pool):
+    with pytest.raises(SolverCrashed):
+        pool.submit(kill_worker, 0).result(timeout=120)
+
+    # both processes take jobs again
+    futures = [pool.submit(square, x) for x in range(4)]
+    assert [future.result(timeout=120) for future in futures] == [0, 1, 4, 9]
+
+
+def test_exception_of_job_is_raised_with_remote_traceback(pool):
+    with pytest.raises(ValueError, match="broken school") as error:
+        pool.submit(fail).result(timeout=120)
+    assert isinstance(error.value.__cause__, RemoteTraceback)
+    assert "fail" in str(error.value.__cause__)
@@ -0,0 +1,33 @@
+from ortools.sat.python import cp_model
+from src.solver.two_phase import minimize_core
+
+
+def conflicting_model(teachers):
+    """
+    Returns:
+        (model, clash_free) where the clash constraints of teachers 0 and 1 contradict each other
+        and those of all other teachers are satisfiable.
+    """
+    model = cp_model.CpModel()
+    clash_free = {t: model.NewBoolVar(f"clash_free_{t}") for t in range(teachers)}
+    slot = model.NewIntVar(0, 3, "slot")
+    model.Add(slot <= 1).OnlyEnforceIf(clash_free[0])
+    model.Add(slot >= 2).OnlyEnforceIf(clash_free[1])
+    for t in range(2, teachers):
+        model.Add(slot != 3).OnlyEnforceIf(clash_free[t])
+    return model, clash_free
+
+
+def test_core_is_reduced_to_the_conflicting_teachers():
+    model, clash_free = conflicting_model(6)
+    assert minimize_core(model, clash_free, set(range(6)), 10) == {0, 1}
+
+
+def test_minimal_core_is_kept():
+    model, clash_free = conflicting_model(2)
+    assert minimize_core(model, clash_free, {0, 1}, 10) == {0, 1}
+
+
+def test_core_is_kept_without_time():
+    model, clash_free = conflicting_model(4)
+    assert minimize_core(model, clash_free, {0, 1, 2, 3}, 0) == {0, 1, 2, 3}